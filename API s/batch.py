@@ -0,0 +1,104 @@
+import os
+import math
+import datetime
+
+from label_registry import UnknownLabelError
+from query_tokenizer import DAY_NAMES, PARTS_OF_DAY, time_of_day
+
+# ✅ Shared pieces of the /batch endpoints: read the items, prepare each one (per-item errors),
+# run one vectorized model call for every item that made it, answer in the original order
+
+MAX_BATCH_ITEMS = int(os.environ.get("BIRD_MAX_BATCH_ITEMS", "5000"))
+
+
+class BatchError(ValueError):
+    """The request as a whole is unusable (answered with 400)."""
+
+
+# ✅ Function: Pull the Item List out of the Request Body
+def read_items(data):
+    items = data.get("items", data.get("queries")) if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise BatchError("Send a non-empty JSON array of queries or feature objects in 'items'.")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise BatchError(f"A batch can hold at most {MAX_BATCH_ITEMS} items, got {len(items)}.")
+    return items
+
+
+def _int_field(item, key, default, low, high):
+    value = item.get(key, default)
+    # Infinity / 1e400 is a float too, and int() of it would raise OverflowError for the whole batch
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not math.isfinite(value) or int(value) != value):
+        raise ValueError(f"'{key}' must be a whole number, got {value!r}")
+    if not low <= value <= high:
+        raise ValueError(f"'{key}' must be between {low} and {high}, got {value}")
+    return int(value)
+
+
+# ✅ Function: Structured Feature Object -> the Same Feature Dict the Query Parsers Return
+def structured_features(item):
+    """Keys: bird_name (or bird), locality, year, month, day_of_week (0-6 or a day name),
+    hour (0-23) or time_of_day (morning/afternoon/evening/night; the hour wins when both are given).
+    Missing dates default to today."""
+    if not isinstance(item, dict):
+        raise ValueError("Each item must be a query string or a feature object")
+    today = datetime.date.today()
+    year = _int_field(item, "year", today.year, 1900, 2100)
+    month = _int_field(item, "month", today.month, 1, 12)
+
+    day_of_week = item.get("day_of_week", today.weekday())
+    if isinstance(day_of_week, str):
+        if day_of_week.capitalize() not in DAY_NAMES:
+            raise ValueError(f"Unknown day_of_week: {day_of_week!r}")
+        day_of_week = DAY_NAMES.index(day_of_week.capitalize())
+    else:
+        day_of_week = _int_field(item, "day_of_week", today.weekday(), 0, 6)
+
+    part_of_day = item.get("time_of_day")
+    if part_of_day is not None and part_of_day not in PARTS_OF_DAY:
+        raise ValueError(f"Unknown time_of_day: {part_of_day!r}")
+    if "hour" in item:
+        hour = _int_field(item, "hour", None, 0, 23)
+    elif part_of_day is not None:
+        hour = PARTS_OF_DAY[part_of_day]
+    else:
+        hour = datetime.datetime.now().hour
+
+    return {
+        "year": year,
+        "month": month,
+        "day_of_week": day_of_week,
+        "day_name": DAY_NAMES[day_of_week],
+        "hour": hour,
+        "time_of_day": time_of_day(hour),  # From the hour, as the query parsers report it
+        "locality": item.get("locality") or "Unknown Location",
+        "bird_name": item.get("bird_name") or item.get("bird") or "Unknown Bird",
+    }
+
+
+# ✅ Function: Prepare Every Item, One Model Call for All of Them, Results in Request Order
+def run(items, prepare, predict, respond):
+    """prepare(item) -> (features, row) or raises ValueError; predict([row, ...]) -> one output
+    per row; respond(features, output) -> result dict for that item."""
+    results = [None] * len(items)
+    prepared = []
+    for index, item in enumerate(items):
+        try:
+            features, row = prepare(item)
+            prepared.append((index, features, row))
+        except UnknownLabelError as e:
+            results[index] = {"index": index, **e.to_dict()}
+        except (ValueError, TypeError, KeyError) as e:
+            results[index] = {"index": index, "error": str(e)}
+
+    if prepared:
+        outputs = predict([row for _, _, row in prepared])
+        for (index, features, _), output in zip(prepared, outputs):
+            results[index] = {"index": index, **respond(features, output)}
+
+    return {
+        "count": len(items),
+        "errors": sum("error" in result for result in results),
+        "results": results,
+    }
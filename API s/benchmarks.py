@@ -0,0 +1,1322 @@
+import os
+import sys
+import time
+import logging
+import multiprocessing
+
+import numpy as np
+
+import model_store
+import flat_forest
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Migration model", "data")
+
+# ✅ Training CSV used to check each model (all of them carry the encoded feature columns)
+MODEL_DATA = {
+    "migration_prediction_model.pkl": "migration_data.csv",
+    "location_prediction_model.pkl": "migration_data.csv",
+    "time_prediction_model.pkl": "time_data.csv",
+}
+
+# ✅ Which key in each bundle holds the estimator(s)
+MODEL_KEYS = {
+    "migration_prediction_model.pkl": ["rf_final"],
+    "location_prediction_model.pkl": ["location_model"],
+    "time_prediction_model.pkl": ["month_model", "hour_model"],
+}
+
+
+# ✅ Function: Resident / Proportional Set Size of This Process in MB (Linux /proc)
+def memory_usage():
+    usage = {"rss_mb": None, "pss_mb": None}
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    usage["rss_mb"] = int(line.split()[1]) / 1024
+        with open("/proc/self/smaps_rollup") as file:
+            for line in file:
+                if line.startswith("Pss:"):
+                    usage["pss_mb"] = int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        import resource
+        usage["rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return usage
+
+
+def _predict_once(model_data, keys):
+    row = np.zeros((1, len(model_data["selected_features"])), dtype=np.float32)
+    for key in keys:
+        model = model_data[key]
+        if hasattr(model, "predict_proba"):
+            model.predict_proba(row)
+        else:
+            model.predict(row)
+
+
+def _rss_worker(names, mmap, barrier, results):
+    before = memory_usage()
+    bundles = [model_store.load_model(name, mmap=mmap) for name in names]
+    for name, model_data in zip(names, bundles):
+        _predict_once(model_data, MODEL_KEYS[name])
+    barrier.wait()  # every worker holds its models at the same time, so PSS shows the sharing
+    results.put({"pid": os.getpid(), "before": before, "after": memory_usage()})
+    barrier.wait()
+
+
+# ✅ Benchmark: Per-Worker Memory Before/After Loading (pickle vs. memory-mapped)
+def bench_rss(workers=4, names=None):
+    names = names or model_store.MODEL_NAMES
+    for name in names:
+        model_store.fetch_model(name)
+        model_store.export_flat(name)
+
+    context = multiprocessing.get_context("spawn")
+    for mmap in (False, True):
+        barrier = context.Barrier(workers)
+        results = context.Queue()
+        processes = [context.Process(target=_rss_worker, args=(names, mmap, barrier, results)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        rows = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        print(f"\n{'mmap' if mmap else 'pickle'} mode, {workers} workers, models: {', '.join(names)}")
+        print(f"{'pid':>8} {'RSS before':>11} {'RSS after':>10} {'PSS after':>10}")
+        for row in rows:
+            pss = row["after"]["pss_mb"]
+            print(f"{row['pid']:>8} {row['before']['rss_mb']:>9.1f}MB {row['after']['rss_mb']:>8.1f}MB "
+                  f"{(f'{pss:.1f}MB' if pss is not None else 'n/a'):>10}")
+        total_pss = sum(row["after"]["pss_mb"] or 0 for row in rows)
+        print(f"total PSS: {total_pss:.1f}MB")
+
+
+# ✅ Function: Feature Matrix for a Model from Its Training CSV
+def load_features(name, selected_features, limit=None):
+    import pandas as pd
+
+    df = pd.read_csv(os.path.join(DATA_DIR, MODEL_DATA[name]))
+    df = df.dropna(subset=selected_features)
+    X = df[selected_features].to_numpy(dtype=np.float32)
+    return X[:limit] if limit else X
+
+
+def latency_stats(timings):
+    timings = np.asarray(timings) * 1e6
+    return {"p50_us": float(np.percentile(timings, 50)), "p99_us": float(np.percentile(timings, 99))}
+
+
+def _time_calls(fn, inputs):
+    timings = []
+    for value in inputs:
+        start = time.perf_counter()
+        fn(value)
+        timings.append(time.perf_counter() - start)
+    return latency_stats(timings)
+
+
+# ✅ Benchmark: Flattened Evaluator vs. sklearn/XGBoost (parity + single-row latency)
+def bench_forest(rows=200, names=None):
+    import pandas as pd
+
+    names = names or model_store.MODEL_NAMES
+    for name in names:
+        model_data = model_store.load_model(name, mmap=False)
+        features = model_data["selected_features"]
+        X = load_features(name, features)
+        for key in MODEL_KEYS[name]:
+            estimator = model_data[key]
+            flat = flat_forest.flatten(estimator)
+            parity = flat_forest.check_parity(estimator, flat, X)
+            method = parity["method"]
+
+            sample = X[np.random.default_rng(0).integers(0, len(X), rows)]
+            frames = [pd.DataFrame([row], columns=features) for row in sample]
+            original = _time_calls(getattr(estimator, method), frames)
+            fast = _time_calls(getattr(flat, method), [row[None, :] for row in sample])
+
+            print(f"\n{name} [{key}] {method}: identical on {parity['rows']} rows = {parity['identical']} "
+                  f"(max diff {parity['max_abs_diff']:.3g})")
+            print(f"  original : p50 {original['p50_us']:8.1f}us  p99 {original['p99_us']:8.1f}us")
+            print(f"  flattened: p50 {fast['p50_us']:8.1f}us  p99 {fast['p99_us']:8.1f}us  "
+                  f"({original['p50_us'] / fast['p50_us']:.1f}x faster at p50)")
+
+
+# ✅ Benchmark: Compact Format vs. Pickle (prediction parity, size, load time, memory)
+def bench_compact(names=None):
+    import compact_forest
+
+    names = names or model_store.MODEL_NAMES
+    for name in names:
+        pickle_path = model_store.fetch_model(name)
+        compact_path = model_store.fetch_compact(name)
+        model_data = compact_forest.load_compact(compact_path)
+        datasets = {key: load_features(name, model_data["selected_features"]) for key in MODEL_KEYS[name]}
+        report = compact_forest.validate_compact(pickle_path, compact_path, datasets)
+
+        print(f"\n{name}: {'✅ valid' if report['valid'] else '❌ predictions or entries differ'}")
+        if report["missing_keys"]:
+            print(f"  missing from the compact bundle: {report['missing_keys']}")
+        for fmt in ("pickle", "compact"):
+            row = report[fmt]
+            print(f"  {fmt:<8} size {row['size_mb']:8.2f}MB  load {row['load_s'] * 1000:8.1f}ms  "
+                  f"peak memory {row['peak_mb']:8.2f}MB")
+        for key, check in report["models"].items():
+            print(f"  {key}: {check}")
+
+
+def _backend_worker(name, backend, rows, batch_rows, results):
+    import feature_assembler
+
+    before = memory_usage()
+    start = time.perf_counter()
+    if backend == "mmap":
+        model_data = model_store.load_model(name, mmap=True)
+    elif backend == "compact":
+        model_data = model_store.load_model(name, mmap=False, model_format="compact")
+    else:
+        model_data = model_store.load_model(name, mmap=False, backend=backend, model_format="pickle")
+    load_s = time.perf_counter() - start
+    after = memory_usage()
+
+    X = load_features(name, model_data["selected_features"])
+    rng = np.random.default_rng(0)
+    sample = [row[None, :] for row in X[rng.integers(0, len(X), rows)]]
+    batches = [X[rng.integers(0, len(X), batch_rows)] for _ in range(5)]
+    models = {}
+    for key in MODEL_KEYS[name]:
+        estimator = model_data[key]
+        method = feature_assembler.predict_proba if hasattr(estimator, "predict_proba") else feature_assembler.predict
+        method(estimator, sample[0])  # First call pays for lazy setup (e.g. onnxruntime sessions)
+        single = _time_calls(lambda row: method(estimator, row), sample)
+        batch = _time_calls(lambda chunk: method(estimator, chunk), batches)
+        models[key] = {"single_p50_us": single["p50_us"], "single_p99_us": single["p99_us"],
+                       "batch_p50_ms": batch["p50_us"] / 1000}
+    results.put({"load_s": load_s, "rss_mb": after["rss_mb"] - before["rss_mb"], "models": models})
+
+
+# ✅ Benchmark: Load Time, Memory and Single-Row / Batch Latency per Serving Backend (fresh process each)
+def bench_backends(rows=300, batch_rows=1000, backends="sklearn,flat,mmap,compact,onnx", names=None):
+    import json
+
+    names = names or model_store.MODEL_NAMES
+    backends = str(backends).split(",")
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        # Exports happen up front, so the load times below are just loads
+        if "mmap" in backends:
+            model_store.export_flat(name)
+        if "compact" in backends:
+            model_store.fetch_compact(name)
+        if "onnx" in backends:
+            onnx_dir = model_store.export_onnx(name)
+            with open(os.path.join(onnx_dir, "parity.json")) as file:
+                parity = json.load(file)
+            print(f"\n{name}: ONNX parity on {parity['rows']} rows: {parity['valid']}")
+            for key, check in parity["models"].items():
+                print(f"  {key}: {check}")
+
+        print(f"\n{name}: {rows} single rows, batches of {batch_rows}")
+        print(f"  {'backend':<8} {'load ms':>8} {'RSS MB':>7}  {'model':<14} {'p50 us':>8} {'p99 us':>8} {'batch ms':>9}")
+        for backend in backends:
+            results = context.Queue()
+            process = context.Process(target=_backend_worker, args=(name, backend, rows, batch_rows, results))
+            process.start()
+            row = results.get()
+            process.join()
+            for i, (key, timings) in enumerate(row["models"].items()):
+                prefix = (f"  {backend:<8} {row['load_s'] * 1000:>8.0f} {row['rss_mb']:>7.1f}" if i == 0
+                          else f"  {'':<8} {'':>8} {'':>7}")
+                print(f"{prefix}  {key:<14} {timings['single_p50_us']:>8.1f} {timings['single_p99_us']:>8.1f} "
+                      f"{timings['batch_p50_ms']:>9.2f}")
+
+
+# ✅ Benchmark: Resumable / Concurrent Downloads against the Local Stand-In Server
+def bench_download(throttle_mb_s=20, names=None):
+    import shutil
+    import tempfile
+    import local_model_server
+
+    names = names or model_store.MODEL_NAMES
+    sources = {name: model_store.fetch_model(name) for name in names}
+    original_store, original_base_url = model_store.STORE_DIR, model_store.MODEL_BASE_URL
+    work_dir = tempfile.mkdtemp(prefix="bird-download-")
+    served_dir = os.path.join(work_dir, "served")
+    os.makedirs(served_dir)
+    for name, path in sources.items():
+        shutil.copyfile(path, os.path.join(served_dir, name))
+
+    def fresh_store(label):
+        model_store.STORE_DIR = os.path.join(work_dir, label)
+        model_store._verified.clear()
+
+    faults = local_model_server.Faults()
+    server, base_url = local_model_server.start_server(served_dir, faults=faults)
+    model_store.MODEL_BASE_URL = base_url
+    try:
+        name = max(names, key=lambda n: os.path.getsize(sources[n]))
+        expected = model_store.file_sha256(sources[name])
+
+        # 1. Connections dropped mid-body: the same call resumes them with Range requests
+        # (the first response only tells the client it can split the file into ranges)
+        fresh_store("resume")
+        faults.cut_after_bytes = [None, 1_000_000, 3_000_000]
+        faults.requests.clear()
+        path = model_store.fetch_model(name)
+        ranges = [r for r, _, _ in faults.requests if r]
+        print(f"\nresume after 2 dropped connections: {len(faults.requests)} requests, ranges {ranges}, "
+              f"digest ok = {model_store.file_sha256(path) == expected}")
+
+        # 2. Process dies mid-download: the partial file is kept and the next start resumes it
+        fresh_store("restart")
+        faults.cut_after_bytes = [2_000_000]
+        faults.requests.clear()
+        try:
+            model_store._download_to_store(name, model_store.model_url(name), retries=0, segments=1)
+        except Exception as e:
+            print(f"first start failed as injected: {type(e).__name__}")
+        part_path, _ = model_store._partial_paths(name)
+        kept = os.path.getsize(part_path)
+        path = model_store.fetch_model(name)
+        print(f"next start resumed from {kept} bytes with {faults.requests[1][0]}, "
+              f"digest ok = {model_store.file_sha256(path) == expected}")
+
+        # 3. Refresh with an unchanged file: If-None-Match -> 304, no body transferred
+        faults.requests.clear()
+        start = time.perf_counter()
+        model_store.refresh_model(name)
+        print(f"refresh unchanged: If-None-Match {faults.requests[-1][1]} -> 304 in "
+              f"{(time.perf_counter() - start) * 1000:.1f}ms")
+
+        # 4. Throttled link: one model after another vs. all at once vs. all at once in ranges
+        faults.bytes_per_second = throttle_mb_s * 1_000_000
+        total_mb = sum(os.path.getsize(p) for p in sources.values()) / 1e6
+        print(f"{total_mb:.1f}MB at {throttle_mb_s}MB/s per connection:")
+        baseline = None
+        for label, concurrent, segments in [("sequential", False, 1), ("concurrent", True, 1),
+                                            ("concurrent + ranges", True, model_store.DOWNLOAD_SEGMENTS)]:
+            fresh_store(label.replace(" ", ""))
+            original_segments, model_store.DOWNLOAD_SEGMENTS = model_store.DOWNLOAD_SEGMENTS, segments
+            start = time.perf_counter()
+            try:
+                if concurrent:
+                    paths = model_store.fetch_models(names)
+                else:
+                    paths = {n: model_store.fetch_model(n) for n in names}
+            finally:
+                model_store.DOWNLOAD_SEGMENTS = original_segments
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            ok = all(model_store.file_sha256(paths[n]) == model_store.file_sha256(sources[n]) for n in names)
+            print(f"  {label:<20} {elapsed:6.2f}s  ({baseline / elapsed:.1f}x)  digests ok = {ok}")
+    finally:
+        server.shutdown()
+        model_store.STORE_DIR, model_store.MODEL_BASE_URL = original_store, original_base_url
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+# ✅ Services with their ports and one query each, for the startup profile
+SERVICES = {
+    "presence.py": (5000, "/predict_presence", "Will I see a bulbul at Tissa Lake tomorrow morning?"),
+    "location.py": (5001, "/predict_location", "Where can I see a kingfisher in March 2025 at 7am?"),
+    "time.py": (5002, "/predict_best_time", "Best time to see a bee eater at Bundala in the morning"),
+}
+
+# Runs a service module in a child process (without its debug reloader) and serves it
+_STARTUP_DRIVER = """
+import sys, time, runpy
+sys.path.insert(0, ".")
+module = runpy.run_path(sys.argv[1], run_name="startup_profile")
+from werkzeug.serving import make_server
+make_server("127.0.0.1", int(sys.argv[2]), module["app"], threaded=True).serve_forever()
+"""
+
+
+def _parse_importtime(path, top=8):
+    """Top-level imports from `python -X importtime` output, slowest first (cumulative ms)."""
+    rows = []
+    with open(path) as file:
+        for line in file:
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if not name[1:].startswith(" "):  # one leading space = imported by the service itself
+                rows.append((name.strip(), int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+
+def _profile_service(script, lazy):
+    import tempfile
+    import subprocess
+    import requests
+
+    port, route, query = SERVICES[script]
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, BIRD_LAZY_IMPORTS="1" if lazy else "0")
+    with tempfile.NamedTemporaryFile("w+", suffix=".importtime") as importtime:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", "-c", _STARTUP_DRIVER, script, str(port)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            stdout=subprocess.DEVNULL, stderr=importtime,
+        )
+        result = {"first_response_s": None, "first_prediction_s": None, "model_load_s": None}
+        try:
+            while time.perf_counter() - start < 120 and result["first_prediction_s"] is None:
+                try:
+                    if result["first_response_s"] is None:
+                        requests.get(f"{base_url}/healthz", timeout=1)
+                        result["first_response_s"] = time.perf_counter() - start
+                    response = requests.post(f"{base_url}{route}", json={"query": query}, timeout=5)
+                    if response.status_code == 200:
+                        result["first_prediction_s"] = time.perf_counter() - start
+                except requests.ConnectionError:
+                    pass
+                time.sleep(0.01)
+            status = requests.get(f"{base_url}/readyz", timeout=5).json()["models"][0]
+            result["model_load_s"] = status["ready_at"] - status["started_at"]
+        finally:
+            process.terminate()
+            process.wait()
+        result["imports"] = _parse_importtime(importtime.name)
+    return result
+
+
+# ✅ Benchmark: Import Time per Module, Model-Load Time and Time to First Response per Service
+def bench_startup(repeats=3, scripts=None):
+    scripts = scripts or list(SERVICES)
+    for script in scripts:
+        port = SERVICES[script][0]
+        summary = {}
+        for lazy in (False, True):
+            runs = [_profile_service(script, lazy) for _ in range(repeats)]
+            median = {key: float(np.median([run[key] for run in runs]))
+                      for key in ("first_response_s", "first_prediction_s", "model_load_s")}
+            summary[lazy] = median
+            print(f"\n{script} (port {port}), {'lazy' if lazy else 'eager'} imports, median of {repeats}:")
+            print(f"  first response (/healthz) {median['first_response_s'] * 1000:7.0f}ms   "
+                  f"first prediction {median['first_prediction_s'] * 1000:7.0f}ms   "
+                  f"model load {median['model_load_s'] * 1000:7.0f}ms")
+            print("  slowest imports: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in runs[-1]["imports"]))
+        for key in ("first_response_s", "first_prediction_s"):
+            print(f"  {key}: {summary[False][key] / summary[True][key]:.2f}x with lazy imports")
+
+
+# ✅ Function: Import a Service Module (time.py would shadow the stdlib module if imported by name)
+def load_service(script, wait=True):
+    """wait: block until the service's model is loaded."""
+    import importlib.util
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script)
+    spec = importlib.util.spec_from_file_location(f"{script[:-3]}_service", path)
+    service = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(service)
+    while wait and not service.model.ready:
+        if service.model.status()["state"] == "failed":
+            raise RuntimeError(service.model.status()["last_error"])
+        time.sleep(0.05)
+    return service
+
+
+def _locations_per_row(service, location_model, label_encoders, selected_features, features, bird_name_encoded):
+    """The previous /predict_location loop: one DataFrame, predict and inverse_transform per point."""
+    import pandas as pd
+
+    results = []
+    for location in service.predefined_locations:
+        input_data = pd.DataFrame([[features["year"], features["month"], features["day_of_week"],
+                                    features["hour"], location["LATITUDE"], 1, location["LONGITUDE"],
+                                    bird_name_encoded]], columns=selected_features)
+        predicted = location_model.predict(input_data)[0]
+        results.append(label_encoders['LOCALITY'].inverse_transform([predicted])[0])
+    return list(set(results))
+
+
+# ✅ Benchmark: /predict_location Per-Row Loop vs. One Batched predict_proba
+def bench_locations(requests=200):
+    service = load_service("location.py")
+    model_data = service.model.get()
+    label_encoders = model_data["label_encoders"]
+    selected_features = model_data["selected_features"]
+    birds = list(label_encoders["COMMON NAME"].classes_)
+    rng = np.random.default_rng(0)
+    queries = [
+        ({"year": 2025, "month": int(rng.integers(1, 13)), "day_of_week": int(rng.integers(0, 7)),
+          "hour": int(rng.integers(0, 24))}, int(rng.integers(0, len(birds))))
+        for _ in range(requests)
+    ]
+    print(f"\n{len(service.predefined_locations)} predefined points, "
+          f"{len(service.candidate_points)} unique, {requests} requests")
+
+    for backend in ("sklearn", "flat"):
+        bundle = model_data if backend == "sklearn" else model_store.flatten_bundle(model_data)
+        location_model = bundle["location_model"]
+        args = (location_model, label_encoders, selected_features)
+        batched_args = (location_model, model_data["label_registry"], selected_features)
+        same = all(
+            set(_locations_per_row(service, *args, features, bird)) ==
+            {locality for locality, _ in service.rank_locations(*batched_args, features, bird)}
+            for features, bird in queries
+        )
+        per_row = _time_calls(lambda q: _locations_per_row(service, *args, *q), queries)
+        batched = _time_calls(lambda q: service.rank_locations(*batched_args, *q), queries)
+        print(f"{backend:>8}: same localities = {same}")
+        print(f"  per-row loop : p50 {per_row['p50_us'] / 1000:7.2f}ms  p99 {per_row['p99_us'] / 1000:7.2f}ms")
+        print(f"  batched      : p50 {batched['p50_us'] / 1000:7.2f}ms  p99 {batched['p99_us'] / 1000:7.2f}ms  "
+              f"({per_row['p50_us'] / batched['p50_us']:.1f}x faster at p50)")
+
+
+def _legacy_date_time(query, today):
+    """The date/hour part of the previous presence / location parsers: ten re.search calls, with the
+    month and day alternations rebuilt from dicts on every call. Its clock search keeps the tokenizer's
+    fix: the old one read the first number as the hour, so "march 2025" meant 20:25 and "31 march" 31."""
+    import re
+    import datetime
+
+    year_match = re.search(r'\b(20[0-9]{2})\b', query)
+    year = int(year_match.group()) if year_match else today.year
+    months_map = {m: i + 1 for i, m in enumerate([
+        "january", "february", "march", "april", "may", "june", "july",
+        "august", "september", "october", "november", "december"])}
+    month_match = re.search(r'\b(' + '|'.join(months_map.keys()) + r')\b', query)
+    month = months_map.get(month_match.group()) if month_match else today.month
+    days_map = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+    day_name_match = re.search(r"\b(" + "|".join(days_map.keys()) + r")\b", query)
+
+    approximate_date_match = re.search(r"(tomorrow|next week|day after tomorrow|in \d+ days)", query)
+    if approximate_date_match:
+        expression = approximate_date_match.group()
+        offsets = {"tomorrow": 1, "day after tomorrow": 2, "next week": 7}
+        days = offsets.get(expression) or int(re.search(r"in (\d+) days", expression).group(1))
+        parsed_date = today + datetime.timedelta(days=days)
+        year, month, day = parsed_date.year, parsed_date.month, parsed_date.day
+    else:
+        day_match = re.search(r"\b([1-9]|[12][0-9]|3[01])\b", query)
+        day = int(day_match.group()) if day_match else None
+    if day_name_match:
+        current_date = datetime.date(year, month, 1)
+        while current_date.weekday() != days_map[day_name_match.group()]:
+            current_date += datetime.timedelta(days=1)
+            day = current_date.day
+    if day is None:
+        if month == today.month and year == today.year:
+            day = today.day
+        else:
+            try:
+                day = min(today.day, (datetime.date(year, month, 1) + datetime.timedelta(days=31)).day)
+            except ValueError:
+                day = 1
+    day_of_week = datetime.date(year, month, day).weekday()
+
+    hour = None
+    for time_match in re.finditer(r'\b([0-9]{1,2}):?([0-9]{2})?\s?(a\.?m\.?|p\.?m\.?|am|pm)?\b', query):
+        hour = int(time_match.group(1))
+        period = time_match.group(3)
+        if period:
+            period = period.replace(".", "").lower()
+            if period == "pm" and hour < 12:
+                hour += 12
+            elif period == "am" and hour == 12:
+                hour = 0
+        if hour <= 23 and (":" in time_match.group() or period or (
+                time_match.group(2) is None and re.search(r'(?:^|\W)at\s+$', query[:time_match.start()]))):
+            break
+        hour = None
+    if hour is None:
+        time_match = re.search(r'\b(morning|afternoon|evening|night)\b', query)
+        hours = {"morning": 6, "afternoon": 11, "evening": 16, "night": 20}
+        hour = hours[time_match.group()] if time_match else datetime.datetime.now().hour
+    return year, month, day_of_week, hour
+
+
+def _legacy_first(query, names, aliases):
+    """The previous bird / locality lookup: substring checks over the names, then the aliases."""
+    found = next((name for name in names if name.lower() in query), None)
+    return found or next((name for alias, name in aliases.items() if alias in query), None)
+
+
+def _legacy_parse(service, query):
+    import datetime
+
+    query = query.lower()
+    today = datetime.date.today()
+    if not hasattr(service, "season_aliases"):
+        year, month, day_of_week, hour = _legacy_date_time(query, today)
+        parsed = {"year": year, "month": month, "day_of_week": day_of_week, "hour": hour,
+                  "bird_name": _legacy_first(query, service.valid_bird_names, service.bird_aliases) or "Unknown Bird"}
+        if hasattr(service, "valid_localities"):
+            parsed["locality"] = _legacy_first(query, service.valid_localities, service.locality_aliases) or "Unknown Location"
+        return parsed
+
+    import re
+    year_match = re.search(r'\b(20[0-9]{2})\b', query)
+    day_name_match = re.search(r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', query)
+    parsed = {
+        "year": int(year_match.group()) if year_match else today.year,
+        "day_of_week": (["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+                        .index(day_name_match.group()) if day_name_match else today.weekday()),
+        "locality": _legacy_first(query, service.valid_localities, service.locality_aliases),
+        "bird_name": _legacy_first(query, service.valid_bird_names, service.bird_aliases),
+    }
+    seasons = [flag for season, flag in service.season_aliases.items() if season in query] or [service.get_current_season()]
+    parsed.update({flag: int(flag in seasons) for flag in service.season_aliases.values()})
+    parsed.update({flag: int(time in query) for time, flag in service.time_period_aliases.items()})
+    return parsed
+
+
+# ✅ Benchmark: Per-Query Parse Cost, Previous Regex Parsers vs. the Compiled Single-Pass Tokenizer
+def bench_parse(queries=5000):
+    rng = np.random.default_rng(4)
+    extras = ["tomorrow", "day after tomorrow", "next week", "in 3 days", "at 6:30 pm", "on 15", "summer", "winter"]
+    sample = [query + (f" {rng.choice(extras)}" if rng.random() < 0.5 else "") for query in _sample_queries(queries, seed=4)]
+    for script, parse in (("presence.py", "extract_query_features_bird_presence"),
+                          ("location.py", "extract_query_features"), ("time.py", "extract_query_features_time")):
+        service = load_service(script, wait=False)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        new = getattr(service, parse)
+        same = all(_legacy_parse(service, query) == {key: new(query)[key] for key in _legacy_parse(service, query)}
+                   for query in sample)
+        before = _time_calls(lambda query: _legacy_parse(service, query), sample)
+        after = _time_calls(new, sample)
+        print(f"\n{script} {parse}: {queries} queries, same features = {same}")
+        print(f"  regex parser : p50 {before['p50_us']:6.1f}us  p99 {before['p99_us']:6.1f}us")
+        print(f"  tokenizer    : p50 {after['p50_us']:6.1f}us  p99 {after['p99_us']:6.1f}us  "
+              f"(p50 speedup {before['p50_us'] / after['p50_us']:.2f}x)")
+
+
+# ✅ Benchmark: Locality Matching Cost as the Vocabulary Grows (substring scans vs. trie regex vs. Aho-Corasick)
+def bench_entities(sizes="10,100,1000,10000", queries=2000):
+    import re
+    import entity_matcher
+    import query_tokenizer
+
+    rng = np.random.default_rng(5)
+    sizes = [int(size) for size in str(sizes).split(",")]
+    # The cleaned export first, then made-up names from its words once the sizes outgrow it
+    vocabulary = dict.fromkeys(name.lower() for name in entity_matcher.load_localities())
+    words = sorted({word for name in vocabulary for word in name.split() if word.isalpha()})
+    while len(vocabulary) < max(sizes):
+        vocabulary.setdefault(" ".join(rng.choice(words, size=rng.integers(2, 5))))
+    vocabulary = list(vocabulary)
+
+    print(f"{'names':>7} {'build AC':>9} {'build re':>9} | {'p50 scans':>10} {'p50 regex':>10} {'p50 AC':>8} {'p99 AC':>8}  found")
+    for size in sizes:
+        names = vocabulary[:size]
+        prefix = "can i see a bulbul at "
+        picks = rng.integers(size, size=queries)
+        sample = [f"{prefix}{names[pick]} on friday in march in the morning?" for pick in picks]
+
+        start = time.perf_counter()
+        matcher = entity_matcher.EntityMatcher()
+        for name in names:
+            matcher.add(name, name, whole_word=True)
+        matcher.build()
+        automaton_build = time.perf_counter() - start
+        start = time.perf_counter()
+        pattern = re.compile(query_tokenizer._trie_regex(dict.fromkeys(names, "")))
+        regex_build = time.perf_counter() - start
+
+        scans = _time_calls(lambda query: [name for name in names if name in query], sample[:max(50, queries // size)])
+        regex = _time_calls(lambda query: [match.group() for match in pattern.finditer(query)], sample)
+        automaton = _time_calls(matcher.find, sample)
+        # Queries where the inserted name, or a longer vocabulary name around it, was matched
+        found = np.mean([any(match.start <= len(prefix) and match.end >= len(prefix) + len(names[pick])
+                             for match in matcher.find(query)) for query, pick in zip(sample, picks)])
+        print(f"{size:>7} {automaton_build:>8.3f}s {regex_build:>8.3f}s | {scans['p50_us']:>8.1f}us "
+              f"{regex['p50_us']:>8.1f}us {automaton['p50_us']:>6.1f}us {automaton['p99_us']:>6.1f}us  {found:.0%}")
+
+
+
+def _misspell(name, rng):
+    """One random typo: a dropped, doubled, swapped or replaced letter."""
+    i = int(rng.integers(len(name) - 1))
+    edit = rng.integers(4)
+    if edit == 0:
+        return name[:i] + name[i + 1:]
+    if edit == 1:
+        return name[:i] + name[i] + name[i:]
+    if edit == 2:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + "aeiou"[int(rng.integers(5))] + name[i + 1:]
+
+
+# ✅ Queries That Name No Bird / No Locality (best_in() must return None for them)
+NO_BIRD_QUERIES = [
+    "which bird is at tissa tomorrow", "which birds are at yala", "what bird lives at bundala",
+    "what birds can i see at kalametiya", "any birds at debarawewa lake on friday", "best time for birding at bundala",
+    "is there a bird near tissa lake", "which bird will be at yala in june", "where do birds go in winter",
+    "what time are birds active", "im tired which bird is at yala",
+]
+NO_LOCALITY_QUERIES = [
+    "will i see a bulbul on friday", "can i see a kingfisher tomorrow morning", "where can i spot a red bird in march",
+    "best time to see a bee eater", "will a blue bird be around next week", "when is the bulbul most active",
+    "what time do kingfishers feed", "is the bee eater here in summer",
+]
+
+
+# ✅ Benchmark: Trigram-Index Fuzzy Lookup vs. difflib.get_close_matches (latency + accuracy by size)
+def bench_fuzzy(sizes="100,1000,5000", queries=500, k=5):
+    from difflib import get_close_matches
+    import entity_matcher
+    import fuzzy_resolver
+    from vocabulary import valid_bird_names, bird_aliases, valid_localities, locality_aliases, locality_vocabulary
+
+    rng = np.random.default_rng(7)
+    sizes = [int(size) for size in str(sizes).split(",")]
+    vocabulary = dict.fromkeys(fuzzy_resolver.normalize(name) for name in entity_matcher.load_localities())
+    words = sorted({word for name in vocabulary for word in name.split() if len(word) > 2})
+    while len(vocabulary) < max(sizes):
+        vocabulary.setdefault(" ".join(rng.choice(words, size=rng.integers(2, 5))))
+    vocabulary = [name for name in vocabulary if len(name) >= fuzzy_resolver.MIN_SEARCH_LENGTH]
+
+    # Queries naming no bird / no locality must not borrow one from a near-miss alias ("which bird" ~ "white bird")
+    birds = fuzzy_resolver.FuzzyResolver(valid_bird_names, bird_aliases)
+    localities = fuzzy_resolver.FuzzyResolver(valid_localities + locality_vocabulary, locality_aliases)
+    invented = [(query, birds.best_in(query)) for query in NO_BIRD_QUERIES if birds.best_in(query)]
+    invented += [(query, localities.best_in(query)) for query in NO_LOCALITY_QUERIES if localities.best_in(query)]
+    assert not invented, f"best_in() finds names the query does not mention: {invented}"
+
+    # The services' own resolvers: the lookups a query with a misspelled (or no) name costs them
+    print(f"scorer: {'rapidfuzz' if fuzzy_resolver.fuzz else 'difflib (rapidfuzz not installed)'}")
+    print(f"{'service resolver':<34} {'queries':>7} {'p50':>8} {'p99':>8}  resolved")
+    for label, resolver, names, template, unnamed in (
+            ("localities", localities, list(dict.fromkeys(valid_localities + locality_vocabulary)),
+             "can i see a bulbul at {} on friday in the morning", NO_LOCALITY_QUERIES),
+            ("birds", birds, list(valid_bird_names),
+             "can i see a {} at tissa lake on friday in the morning", NO_BIRD_QUERIES)):
+        label = f"{label} ({len(names)})"
+        picks = [names[pick] for pick in rng.integers(len(names), size=queries)]
+        typos = [template.format(_misspell(fuzzy_resolver.normalize(name), rng)) for name in picks]
+        misspelled = _time_calls(resolver.best_in, typos)
+        resolved = np.mean([resolver.best_in(typo) == name for typo, name in zip(typos, picks)])
+        no_name = _time_calls(resolver.best_in, unnamed * max(1, queries // len(unnamed)))
+        print(f"  {label + ', one typo':<32} {len(typos):>7} {misspelled['p50_us']:>6.0f}us {misspelled['p99_us']:>6.0f}us  "
+              f"{resolved:.0%}")
+        print(f"  {label + ', no name':<32} {len(unnamed) * max(1, queries // len(unnamed)):>7} {no_name['p50_us']:>6.0f}us "
+              f"{no_name['p99_us']:>6.0f}us")
+
+    print()
+    print(f"{'names':>7} {'build':>8} | {'p50 difflib':>12} {'p50 lookup':>11} {'p99 lookup':>11} "
+          f"{'p50 search':>11} {'p99 search':>11} | {'top-1':>6} {f'top-{k}':>6} {'in query':>8}")
+    for size in sizes:
+        names = vocabulary[:size]
+        picks = [names[pick] for pick in rng.integers(len(names), size=queries)]
+        typos = [_misspell(name, rng) for name in picks]
+        sentences = [f"can i see a bulbul at {typo} on friday in the morning" for typo in typos]
+
+        start = time.perf_counter()
+        resolver = fuzzy_resolver.FuzzyResolver(names)
+        build = time.perf_counter() - start
+        # Correctly spelled names resolve to themselves through best() (the path correct_* take)
+        unresolved = [name for name in picks[:100] if resolver.best(name) != name]
+        assert not unresolved, f"best() misses correctly spelled names: {unresolved[:5]}"
+
+        difflib = _time_calls(lambda typo: get_close_matches(typo, names, n=k, cutoff=0.6), typos[:max(20, queries // 10)])
+        lookup = _time_calls(lambda typo: resolver.lookup(typo, k=k), typos)
+        search = _time_calls(lambda sentence: resolver.search(sentence, k=k), sentences)
+        results = [[match.value for match in resolver.lookup(typo, k=k)] for typo in typos]
+        top1 = np.mean([bool(found) and found[0] == name for found, name in zip(results, picks)])
+        topk = np.mean([name in found for found, name in zip(results, picks)])
+        in_query = np.mean([resolver.best_in(sentence) == name for sentence, name in zip(sentences, picks)])
+        print(f"{len(names):>7} {build * 1000:>6.0f}ms | {difflib['p50_us']:>10.0f}us {lookup['p50_us']:>9.0f}us "
+              f"{lookup['p99_us']:>9.0f}us {search['p50_us']:>9.0f}us {search['p99_us']:>9.0f}us | "
+              f"{top1:>6.0%} {topk:>6.0%} {in_query:>8.0%}")
+
+# ✅ Benchmark: pd.DataFrame per Request vs. Compiled float32 Assembler + Raw-Array Predict
+def bench_features(rows=300, names=None):
+    import pandas as pd
+    import feature_assembler
+
+    names = names or model_store.MODEL_NAMES
+    for name in names:
+        model_data = model_store.load_model(name, mmap=False)
+        features = model_data["selected_features"]
+        sample = load_features(name, features)
+        sample = sample[np.random.default_rng(0).integers(0, len(sample), rows)].astype(np.float64)
+        requests = [dict(zip(features, row)) for row in sample]
+        assembler = feature_assembler.for_features(features)
+
+        def dataframe(values):
+            return pd.DataFrame([[values[f] for f in features]], columns=features)
+
+        print(f"\n{name}: {len(features)} features, {rows} single-row requests")
+        build_df = _time_calls(dataframe, requests)
+        build_np = _time_calls(assembler.assemble, requests)
+        print(f"  build input   DataFrame p50 {build_df['p50_us']:8.1f}us   assembler p50 {build_np['p50_us']:6.1f}us "
+              f"({build_df['p50_us'] / build_np['p50_us']:.0f}x)")
+
+        for key in MODEL_KEYS[name]:
+            estimator = model_data[key]
+            method = "predict_proba" if hasattr(estimator, "predict_proba") else "predict"
+            fast = getattr(feature_assembler, method)
+            same = all(
+                np.array_equal(getattr(estimator, method)(dataframe(values)), fast(estimator, assembler.assemble(values)))
+                for values in requests
+            )
+            current = _time_calls(lambda values: getattr(estimator, method)(dataframe(values)), requests)
+            assembled = _time_calls(lambda values: fast(estimator, assembler.assemble(values)), requests)
+            print(f"  [{key}] {method} identical = {same}")
+            print(f"    DataFrame + {method:<13} p50 {current['p50_us']:8.1f}us  p99 {current['p99_us']:8.1f}us")
+            print(f"    assembler + raw array      p50 {assembled['p50_us']:8.1f}us  p99 {assembled['p99_us']:8.1f}us  "
+                  f"({current['p50_us'] / assembled['p50_us']:.1f}x faster at p50)")
+
+
+# ✅ Benchmark: Month + Hour Latency (two sklearn-API predicts, fused inplace_predict, multi-output model)
+def bench_time(rows=500):
+    import pandas as pd
+    import feature_assembler
+    from xgboost import XGBRegressor
+
+    name = "time_prediction_model.pkl"
+    model_data = model_store.load_model(name, mmap=False)
+    features = model_data["selected_features"]
+    month_model, hour_model = model_data["month_model"], model_data["hour_model"]
+    time_model = model_data.get("time_model")
+    if time_model is None:
+        # Same settings as the notebook's multi-output cell, trained on the service's own features
+        df = pd.read_csv(os.path.join(DATA_DIR, MODEL_DATA[name])).dropna(subset=features + ["Month", "Hour"])
+        print(f"{name} has no time_model, training one on {len(df)} rows (XGBoost >= 2.0)")
+        time_model = XGBRegressor(n_estimators=300, max_depth=8, learning_rate=0.05, subsample=0.8,
+                                  colsample_bytree=0.8, random_state=42, tree_method="hist",
+                                  multi_strategy="multi_output_tree")
+        time_model.fit(df[features].to_numpy(dtype=np.float32), df[["Month", "Hour"]].to_numpy())
+
+    X = load_features(name, features)
+    sample = [row[None, :] for row in X[np.random.default_rng(0).integers(0, len(X), rows)]]
+    frames = [pd.DataFrame(row, columns=features) for row in sample]
+    separate_outputs = [feature_assembler.predict_each([month_model, hour_model], row) for row in sample]
+    same = all(np.array_equal(month_model.predict(frame), months) and np.array_equal(hour_model.predict(frame), hours)
+               for frame, (months, hours) in zip(frames, separate_outputs))
+
+    sklearn_api = _time_calls(lambda frame: (month_model.predict(frame), hour_model.predict(frame)), frames)
+    fused = _time_calls(lambda row: feature_assembler.predict_each([month_model, hour_model], row), sample)
+    multi = _time_calls(lambda row: feature_assembler.predict(time_model, row), sample)
+    print(f"\n{name}: {rows} single-row requests, fused path identical to predict() = {same}")
+    for label, timings in (("month + hour predict(DataFrame)", sklearn_api),
+                           ("month + hour inplace_predict (fused)", fused),
+                           ("multi-output time_model", multi)):
+        print(f"  {label:<38} p50 {timings['p50_us']:8.1f}us  p99 {timings['p99_us']:8.1f}us  "
+              f"({sklearn_api['p50_us'] / timings['p50_us']:.1f}x at p50)")
+
+    outputs = feature_assembler.predict(time_model, X)
+    for column, (target, single) in enumerate((("month", month_model), ("hour", hour_model))):
+        agree = np.mean(np.round(outputs[:, column]) == np.round(feature_assembler.predict(single, X)))
+        print(f"  {target}: multi-output rounds to the same value as {target}_model on {agree:.1%} of rows")
+
+
+# ✅ Benchmark: sklearn LabelEncoder.transform / inverse_transform vs. the Dict Registry
+def bench_labels(requests=2000, names=None):
+    import label_registry
+
+    names = names or model_store.MODEL_NAMES
+    for name in names:
+        model_data = model_store.load_model(name, mmap=False)
+        registry = label_registry.LabelRegistry.from_label_encoders(model_data["label_encoders"])
+        print(f"\n{name}")
+        for column, encoder in model_data["label_encoders"].items():
+            labels = list(encoder.classes_)
+            sample = [labels[i] for i in np.random.default_rng(0).integers(0, len(labels), requests)]
+            codec = registry[column]
+            same = all(encoder.transform([label])[0] == codec.encode(label) for label in sample) and all(
+                encoder.inverse_transform([code])[0] == codec.decode(code) for code in range(len(labels)))
+            transform = _time_calls(lambda label: encoder.transform([label])[0], sample)
+            encode = _time_calls(codec.encode, sample)
+            codes = [codec.encode(label) for label in sample]
+            inverse = _time_calls(lambda code: encoder.inverse_transform([code])[0], codes)
+            decode = _time_calls(codec.decode, codes)
+            print(f"  {column} ({len(labels)} labels) identical = {same}")
+            print(f"    encode  transform p50 {transform['p50_us']:7.1f}us   registry p50 {encode['p50_us']:5.2f}us "
+                  f"({transform['p50_us'] / encode['p50_us']:.0f}x)")
+            print(f"    decode  inverse   p50 {inverse['p50_us']:7.1f}us   registry p50 {decode['p50_us']:5.2f}us "
+                  f"({inverse['p50_us'] / decode['p50_us']:.0f}x)")
+
+
+def _sample_queries(count, seed=0):
+    rng = np.random.default_rng(seed)
+    birds = ["bulbul", "kingfisher", "bee eater", "Red-vented Bulbul", "blue bird"]
+    places = ["Tissa Lake", "bundala", "yala", "Debarawewa Lake", "kalametiya"]
+    months = ["january", "march", "june", "august", "october", "december"]
+    times = ["morning", "afternoon", "evening", "night", "7am", "5 pm"]
+    days = ["monday", "friday", "saturday", "sunday"]
+    return [
+        f"Can I see a {rng.choice(birds)} at {rng.choice(places)} on {rng.choice(days)} "
+        f"in {rng.choice(months)} {rng.integers(2024, 2027)} in the {rng.choice(times)}?"
+        for _ in range(count)
+    ]
+
+
+def _time_queries(count, seed=9):
+    """Queries mixing what the time service reads differently: relative dates, month words, several seasons
+    and parts of day, clock times and none of them."""
+    rng = np.random.default_rng(seed)
+    birds = ["bulbul", "kingfisher", "bee eater", "Red-vented Bulbul", "blue bird", "kingfishr"]
+    places = ["Tissa Lake", "bundala", "yala", "Debarawewa Lake", "kalametiya", "tisa lake"]
+    extras = ["", "tomorrow", "next week", "in 3 days", "on friday", "in march", "in summer", "this winter and spring",
+              "in the morning and evening", "at night", "at 6:30 pm", "on 15", "2025", "in december 2026 on sunday",
+              "tomorrow morning", "day after tomorrow at night in autumn", "mornings in summer"]
+    return [f"can i see a {rng.choice(birds)} at {rng.choice(places)} {rng.choice(extras)} {rng.choice(extras)}"
+            for _ in range(count)]
+
+
+# ✅ Benchmark: N Single Requests vs. One /batch Request per Service (Flask test client)
+def bench_batch(items=1000):
+    queries = _sample_queries(items)
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        client = service.app.test_client()
+
+        start = time.perf_counter()
+        singles = [client.post(route, json={"query": query}).get_json() for query in queries]
+        single_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        response = client.post(f"{route}/batch", json={"items": queries})
+        batch_s = time.perf_counter() - start
+        body = response.get_json()
+
+        # Same answers, item by item, for every key both responses have
+        same = all(
+            all(result[key] == single[key] for key in single if key in result)
+            for single, result in zip(singles, body["results"])
+        )
+        print(f"\n{script} {route}: {items} items, {body['errors']} per-item errors, same answers = {same}")
+        print(f"  {items} single requests {single_s:7.2f}s  ({items / single_s:8.0f} items/s)")
+        print(f"  one batch request    {batch_s:7.2f}s  ({items / batch_s:8.0f} items/s)  "
+              f"{single_s / batch_s:.0f}x throughput")
+
+
+# ✅ Benchmark: Presence Cube Build + Exactness + Lookup vs. Forest Latency (function and endpoint)
+def bench_cube(first_year=2024, last_year=2026, dtype="uint8", samples=20000, requests=500):
+    import feature_assembler
+    import presence_cube
+
+    path, meta = presence_cube.ensure_cube((first_year, last_year), dtype)
+    print(f"\ncube {first_year}-{last_year} {dtype}: shape {meta['shape']}, {meta['size_bytes'] / 1e6:.1f}MB, "
+          f"built in {meta['build_s']}s")
+
+    model_data = model_store.load_model(presence_cube.MODEL_NAME, mmap=False)
+    rf_model = model_data["rf_final"]
+    cube = presence_cube.PresenceCube(path, meta)
+    rng = np.random.default_rng(0)
+    cells = np.stack([rng.integers(0, size, samples) for size in meta["shape"]], axis=1)
+    cells += np.array([first_year, 1, 0, 0, 0, 0])
+    X = np.ascontiguousarray(cells[:, [presence_cube.AXES.index(f) for f in model_data["selected_features"]]],
+                             dtype=np.float32)
+    forest = feature_assembler.predict_proba(rf_model, X)[:, 1]
+    looked_up, inside = cube.lookup_many(cells)
+    print(f"  {samples} random cells: decisions identical = {bool(np.all((forest >= 0.5) == (looked_up >= 0.5)))}, "
+          f"max |p diff| {np.abs(forest - looked_up).max():.4f}, all inside = {bool(inside.all())}")
+
+    picks = cells[:requests].tolist()
+    live = _time_calls(lambda i: feature_assembler.predict_proba(rf_model, X[i:i + 1])[:, 1][0], range(requests))
+    lookup = _time_calls(lambda cell: cube.lookup(*cell), picks)
+    print(f"  forest row : p50 {live['p50_us']:8.1f}us  p99 {live['p99_us']:8.1f}us")
+    print(f"  cube lookup: p50 {lookup['p50_us']:8.1f}us  p99 {lookup['p99_us']:8.1f}us  "
+          f"({live['p99_us'] / lookup['p99_us']:.0f}x faster at p99)")
+
+    presence_cube.CUBE_DTYPE = dtype  # The service attaches the cube of this dtype
+    service = load_service("presence.py")
+    logging.getLogger(service.__name__).setLevel(logging.WARNING)
+    client = service.app.test_client()
+    queries = _sample_queries(requests)
+    bundle = service.model.get()
+    timings = {}
+    for label, attached in (("forest", None), ("cube", bundle["presence_cube"])):
+        bundle["presence_cube"] = attached
+        timings[label] = _time_calls(lambda query: client.post("/predict_presence", json={"query": query}), queries)
+    print(f"  /predict_presence forest: p50 {timings['forest']['p50_us'] / 1000:6.2f}ms  "
+          f"p99 {timings['forest']['p99_us'] / 1000:6.2f}ms")
+    print(f"  /predict_presence cube  : p50 {timings['cube']['p50_us'] / 1000:6.2f}ms  "
+          f"p99 {timings['cube']['p99_us'] / 1000:6.2f}ms")
+
+
+# ✅ Benchmark: Offline Location Index vs. Ranking with the Model (exactness + latency)
+def bench_index(first_year=2024, last_year=2026, requests=500):
+    import location_index
+
+    service = load_service("location.py")
+    logging.getLogger(service.__name__).setLevel(logging.WARNING)
+    path, meta = location_index.build_for_service((first_year, last_year), service)
+    print(f"\nindex {first_year}-{last_year}: {meta['keys']} keys, top {meta['top_k']}, "
+          f"{meta['size_bytes'] / 1e3:.0f}kB, built in {meta['build_s']}s")
+
+    model_data = service.model.get()
+    index = location_index.load_index(model_data, service.model.status()["version"], service.candidate_points)
+    rng = np.random.default_rng(0)
+    queries = [
+        ({"year": int(rng.integers(first_year, last_year + 1)), "month": int(rng.integers(1, 13)),
+          "day_of_week": int(rng.integers(0, 7)), "hour": int(rng.integers(0, 24))}, int(rng.integers(0, 3)))
+        for _ in range(requests)
+    ]
+
+    def ranked_by_model(query):
+        return service.rank_locations(model_data["location_model"], model_data["label_registry"],
+                                      model_data["selected_features"], *query)
+
+    same = all(service.indexed_locations(index, *query) == ranked_by_model(query) for query in queries)
+    model_calls = _time_calls(ranked_by_model, queries)
+    lookups = _time_calls(lambda query: service.indexed_locations(index, *query), queries)
+    print(f"  {requests} random keys: rankings identical = {same}")
+    print(f"  model ranking: p50 {model_calls['p50_us'] / 1000:7.2f}ms  p99 {model_calls['p99_us'] / 1000:7.2f}ms")
+    print(f"  index lookup : p50 {lookups['p50_us'] / 1000:7.3f}ms  p99 {lookups['p99_us'] / 1000:7.3f}ms  "
+          f"({model_calls['p99_us'] / lookups['p99_us']:.0f}x faster at p99)")
+
+    client = service.app.test_client()
+    texts = _sample_queries(requests)
+    timings = {}
+    for label, attached in (("model", None), ("index", index)):
+        model_data["location_index"] = attached
+        timings[label] = _time_calls(lambda query: client.post("/predict_location", json={"query": query}), texts)
+        print(f"  /predict_location {label:<5}: p50 {timings[label]['p50_us'] / 1000:6.2f}ms  "
+              f"p99 {timings[label]['p99_us'] / 1000:6.2f}ms")
+
+
+# ✅ Benchmark: Response Caches on a Skewed Query Stream (hit ratio, same answers, latency)
+def bench_cache(requests=2000, distinct=200):
+    rng = np.random.default_rng(1)
+    pool = _sample_queries(distinct)
+    # Popular queries repeat a lot: Zipf-distributed picks from the pool
+    stream = [pool[(rank - 1) % distinct] for rank in rng.zipf(1.3, requests)]
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        client = service.app.test_client()
+        caches = (service.query_cache, service.feature_cache)
+
+        results = {}
+        for label, maxsize in (("off", 0), ("on", 10000)):
+            for cache in caches:
+                cache.clear()
+                cache.maxsize = maxsize
+            answers = []
+            timings = _time_calls(lambda query: answers.append(client.post(route, json={"query": query}).get_json()),
+                                  stream)
+            results[label] = (timings, answers)
+        stats = {cache.name: cache.stats() for cache in caches}
+        print(f"\n{script} {route}: {requests} requests over {len(set(stream))} distinct queries, "
+              f"same answers = {results['off'][1] == results['on'][1]}")
+        for name, cache_stats in stats.items():
+            print(f"  {name:<18} hits {cache_stats['hits']:5d}  misses {cache_stats['misses']:5d}  "
+                  f"size {cache_stats['size']:4d}  hit ratio {cache_stats['hit_ratio']}")
+        for label, (timings, _) in results.items():
+            print(f"  cache {label:<3}: p50 {timings['p50_us'] / 1000:6.2f}ms  p99 {timings['p99_us'] / 1000:6.2f}ms")
+
+
+
+# ✅ Benchmark: Raw Text vs. Features Parsed Once Upstream (structured_request.py), Caches Off
+HANDOFF_EDGE_QUERIES = [
+    "Can I see a bulbul at Tissa Lake on 31 march?",
+    "Is the Red-vented Bulbul at yala on 25 december 2025 in the evening?",
+    "kingfisher at bundala on 24 june at 7am",
+    "Is the bee eater at kalametiya on 28 august?",
+]
+
+
+def bench_handoff(requests=1000):
+    import structured_request
+
+    parser = structured_request.QueryParser()
+    # Plus numbers that are a day of the month and no hour ("31 march"), which both paths must read alike
+    texts = _sample_queries(requests, seed=6) + HANDOFF_EDGE_QUERIES
+    parse = _time_calls(parser.parse, texts)
+    print(f"upstream parse (action server): p50 {parse['p50_us']:6.1f}us  p99 {parse['p99_us']:6.1f}us")
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        client = service.app.test_client()
+        for cache in (service.query_cache, service.feature_cache):
+            cache.clear()
+            cache.maxsize = 0
+
+        if script == "time.py":
+            # The structured reading must be the text parser's, feature for feature
+            differ = [query for query in _time_queries(requests) + HANDOFF_EDGE_QUERIES
+                      if service.structured_time_features(parser.parse(query)) != service.extract_query_features_time(query)]
+            assert not differ, f"structured time features differ from the text parser's for: {differ[:5]}"
+
+        bodies = [{"query": query, "features": parser.parse(query)} for query in texts]
+        answers = {"text": [], "features": []}
+        answer = lambda response: (response.status_code, response.get_json())  # noqa: E731
+        text = _time_calls(lambda query: answers["text"].append(
+            answer(client.post(route, json={"query": query}))), texts)
+        service_only = _time_calls(lambda body: answers["features"].append(
+            answer(client.post(route, json=body))), bodies)
+        # End to end: the upstream parse plus the request that carries its result
+        end_to_end = _time_calls(lambda query: client.post(route, json={"query": query,
+                                                                         "features": parser.parse(query)}), texts)
+        differ = [query for query, a, b in zip(texts, answers["text"], answers["features"]) if a != b]
+        assert not differ, f"{script}: feature requests answer differently from text for: {differ[:5]}"
+        same = 1 - len(differ) / len(texts)
+        print(f"\n{script} {route}: {len(texts)} requests, same answers {same:.0%}")
+        print(f"  text              : p50 {text['p50_us'] / 1000:6.3f}ms  p99 {text['p99_us'] / 1000:6.3f}ms")
+        print(f"  features (service): p50 {service_only['p50_us'] / 1000:6.3f}ms  "
+              f"p99 {service_only['p99_us'] / 1000:6.3f}ms")
+        print(f"  features + parse  : p50 {end_to_end['p50_us'] / 1000:6.3f}ms  p99 {end_to_end['p99_us'] / 1000:6.3f}ms  "
+              f"(p50 saving {(text['p50_us'] - end_to_end['p50_us']) / 1000:+.3f}ms per request)")
+
+
+# ✅ Benchmark: Free-Text Requests vs. Typed-Field Requests (/fields), Caches Off
+def bench_fields(requests=1000):
+    import datetime
+    import request_schema
+
+    rng = np.random.default_rng(8)
+    parts = ["morning", "afternoon", "evening", "night"]
+    parsers = {"presence.py": "extract_query_features_bird_presence", "location.py": "extract_query_features",
+               "time.py": "extract_query_features_time"}
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        client = service.app.test_client()
+        for cache in (service.query_cache, service.feature_cache):
+            cache.clear()
+            cache.maxsize = 0
+
+        bodies = []
+        for _ in range(requests):
+            date = datetime.date(2025, 1, 1) + datetime.timedelta(days=int(rng.integers(365)))
+            body = {"bird_name": str(rng.choice(service.valid_bird_names)), "date": date.isoformat(),
+                    "time_of_day": str(rng.choice(parts))}
+            if "locality" in service.fields_schema.fields:
+                body["locality"] = str(rng.choice(service.valid_localities))
+            bodies.append(body)
+        texts = [f"Can I see a {body['bird_name']} at {body.get('locality', 'a good spot')} on "
+                 f"{datetime.date.fromisoformat(body['date']):%A %B %Y} in the {body['time_of_day']}?" for body in bodies]
+
+        parsing = _time_calls(getattr(service, parsers[script]), texts)
+        checking = _time_calls(lambda body: request_schema.to_features(service.fields_schema.validate(body)), bodies)
+        text = _time_calls(lambda query: client.post(route, json={"query": query}), texts)
+        fields = _time_calls(lambda body: client.post(route + "/fields", json=body), bodies)
+        print(f"\n{script} {route}: {requests} requests")
+        print(f"  parse text       : p50 {parsing['p50_us']:7.1f}us  p99 {parsing['p99_us']:7.1f}us")
+        print(f"  validate fields  : p50 {checking['p50_us']:7.1f}us  p99 {checking['p99_us']:7.1f}us")
+        print(f"  {route:<26}: p50 {text['p50_us'] / 1000:6.3f}ms  p99 {text['p99_us'] / 1000:6.3f}ms")
+        print(f"  {route + '/fields':<26}: p50 {fields['p50_us'] / 1000:6.3f}ms  p99 {fields['p99_us'] / 1000:6.3f}ms")
+
+
+def serve_threaded(app):
+    """Serve a Flask app on a free localhost port with one thread per request; returns (server, url)."""
+    import threading
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ✅ Benchmark / Concurrency Test: Bursts of Identical Requests from Threads, Single-Flight Off and On
+def bench_singleflight(bursts=20, threads=16):
+    import threading
+    import requests
+
+    queries = _sample_queries(bursts, seed=2)
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        # Without the cube / index every miss runs the model, as for a model version nobody indexed yet
+        bundle = service.model.get()
+        bundle.pop("presence_cube", None), bundle.pop("location_index", None)
+        server, url = serve_threaded(service.app)
+
+        print(f"\n{script} {route}: {bursts} bursts x {threads} identical concurrent requests")
+        for enabled in (False, True):
+            service.flight.enabled = enabled
+            service.flight.reset()
+            timings, consistent, failures = [], True, 0
+            for query in queries:
+                for cache in (service.query_cache, service.feature_cache):
+                    cache.clear()
+                barrier = threading.Barrier(threads)
+                answers = [None] * threads
+
+                def client(i):
+                    barrier.wait()
+                    start = time.perf_counter()
+                    response = requests.post(url + route, json={"query": query}, timeout=60)
+                    timings.append(time.perf_counter() - start)
+                    answers[i] = (response.status_code, response.json())
+
+                workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                consistent &= all(answer == answers[0] for answer in answers)
+                failures += sum(status != 200 for status, _ in answers)
+            stats = service.flight.stats()
+            latency = latency_stats(timings)
+            print(f"  single-flight {'on ' if enabled else 'off'}: {stats['calls']} calls -> "
+                  f"{stats['executions']} model runs (coalescing ratio {stats['coalescing_ratio']}), "
+                  f"same answers per burst = {consistent}, non-200 = {failures}, "
+                  f"p50 {latency['p50_us'] / 1000:6.1f}ms  p99 {latency['p99_us'] / 1000:6.1f}ms")
+        server.shutdown()
+
+
+# ✅ Benchmark: Micro-Batching Load Test (throughput / latency curve per max wait and concurrency)
+def bench_microbatch(requests_per_level=240, levels="1,8,32", waits="0,1,2,5,10"):
+    import threading
+    import requests
+    import micro_batch
+
+    levels = [int(level) for level in str(levels).split(",")]
+    waits = [float(wait) for wait in str(waits).split(",")]  # 0 = micro-batching off
+    queries = _sample_queries(requests_per_level, seed=3)
+    for script, (_, route, _) in SERVICES.items():
+        service = load_service(script)
+        logging.getLogger(service.__name__).setLevel(logging.WARNING)
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        # Every request reaches the model: no cube / index, no caches, no coalescing
+        bundle = service.model.get()
+        bundle.pop("presence_cube", None), bundle.pop("location_index", None)
+        service.query_cache.maxsize = service.feature_cache.maxsize = 0
+        service.flight.enabled = False
+        server, url = serve_threaded(service.app)
+
+        print(f"\n{script} {route}: {requests_per_level} requests per cell")
+        print(f"  {'max wait':>9} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'rows/batch':>10}")
+        for wait in waits:
+            micro_batch.configure(enabled=wait > 0, max_wait_ms=wait, max_rows=64)
+            for level in levels:
+                timings, pending = [], list(queries)
+                lock = threading.Lock()
+
+                def client():
+                    session = requests.Session()
+                    while True:
+                        with lock:
+                            if not pending:
+                                return
+                            query = pending.pop()
+                        start = time.perf_counter()
+                        session.post(url + route, json={"query": query}, timeout=60).raise_for_status()
+                        timings.append(time.perf_counter() - start)
+
+                micro_batch.configure()  # Fresh queues, fresh counters
+                start = time.perf_counter()
+                workers = [threading.Thread(target=client) for _ in range(level)]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+                elapsed = time.perf_counter() - start
+                latency = latency_stats(timings)
+                queues = micro_batch.stats()["queues"]
+                rows = sum(queue["rows"] for queue in queues) / max(sum(queue["batches"] for queue in queues), 1)
+                label = f"{wait:g}ms" if wait > 0 else "off"
+                print(f"  {label:>9} {level:>7} {len(timings) / elapsed:>8.0f} {latency['p50_us'] / 1000:>8.1f} "
+                      f"{latency['p99_us'] / 1000:>8.1f} {rows if queues else 1:>10.1f}")
+        micro_batch.configure(enabled=False)
+        server.shutdown()
+
+
+def _threads_worker(name, workers, threads, seconds, batch_rows, barrier, results):
+    import thread_policy
+    import feature_assembler
+
+    if threads:
+        thread_policy.configure(workers=workers, batch_threads=threads)
+    else:  # Unmanaged: every call may use every core, as with n_jobs=-1 and default OpenMP
+        thread_policy.configure(workers=workers, batch_threads=thread_policy.CPU_COUNT,
+                                single_row_threads=thread_policy.CPU_COUNT)
+    model_data = thread_policy.attach(model_store.load_model(name))
+    X = load_features(name, model_data["selected_features"], limit=8192)
+    calls = [feature_assembler.predict_proba if hasattr(model_data[key], "predict_proba") else feature_assembler.predict
+             for key in MODEL_KEYS[name]]
+    estimators = [model_data[key] for key in MODEL_KEYS[name]]
+    rng = np.random.default_rng(os.getpid())
+
+    barrier.wait()  # All workers compete for the cores at the same time
+    single, batched, calls_made = [], 0, 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        calls_made += 1
+        if calls_made % 8 == 0:  # One batch call per seven single-row requests
+            rows = X[rng.integers(0, len(X), batch_rows)]
+            for call, estimator in zip(calls, estimators):
+                call(estimator, rows)
+            batched += batch_rows
+            continue
+        row = X[rng.integers(0, len(X), 1)]
+        start = time.perf_counter()
+        for call, estimator in zip(calls, estimators):
+            call(estimator, row)
+        single.append(time.perf_counter() - start)
+    results.put({"single": single, "batched_rows": batched})
+
+
+# ✅ Benchmark: Worker x Model-Thread Matrix (single-row p50/p99 and batch rows/s with all workers busy)
+def bench_threads(workers="1,2,4", threads="0,1,2,4", seconds=5, batch_rows=512, names=None):
+    """threads 0 = unmanaged (each call may use every core); run it on a multi-core box."""
+    import thread_policy
+
+    names = names or model_store.MODEL_NAMES
+    worker_counts = [int(count) for count in str(workers).split(",")]
+    thread_counts = [int(count) for count in str(threads).split(",")]
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        model_store.fetch_model(name)
+        print(f"\n{name} ({'+'.join(MODEL_KEYS[name])}), {thread_policy.CPU_COUNT} cores, {seconds}s per cell")
+        print(f"  {'workers':>7} {'threads':>9} {'total':>6} {'p50 ms':>8} {'p99 ms':>8} "
+              f"{'single/s':>9} {'batch rows/s':>13}")
+        for worker_count in worker_counts:
+            for thread_count in thread_counts:
+                barrier = context.Barrier(worker_count)
+                results = context.Queue()
+                processes = [context.Process(target=_threads_worker, args=(
+                    name, worker_count, thread_count, seconds, batch_rows, barrier, results))
+                    for _ in range(worker_count)]
+                for process in processes:
+                    process.start()
+                rows = [results.get() for _ in processes]
+                for process in processes:
+                    process.join()
+
+                single = [timing for row in rows for timing in row["single"]]
+                latency = latency_stats(single)
+                per_worker = thread_count or thread_policy.CPU_COUNT
+                label = str(thread_count) if thread_count else "unmanaged"
+                print(f"  {worker_count:>7} {label:>9} {worker_count * per_worker:>6} "
+                      f"{latency['p50_us'] / 1000:>8.2f} {latency['p99_us'] / 1000:>8.2f} "
+                      f"{len(single) / seconds:>9.0f} {sum(row['batched_rows'] for row in rows) / seconds:>13.0f}")
+
+
+BENCHMARKS = {
+    "rss": bench_rss,
+    "forest": bench_forest,
+    "compact": bench_compact,
+    "backends": bench_backends,
+    "download": bench_download,
+    "startup": bench_startup,
+    "locations": bench_locations,
+    "features": bench_features,
+    "parse": bench_parse,
+    "entities": bench_entities,
+    "fuzzy": bench_fuzzy,
+    "time": bench_time,
+    "labels": bench_labels,
+    "batch": bench_batch,
+    "cube": bench_cube,
+    "index": bench_index,
+    "cache": bench_cache,
+    "handoff": bench_handoff,
+    "fields": bench_fields,
+    "singleflight": bench_singleflight,
+    "microbatch": bench_microbatch,
+    "threads": bench_threads,
+}
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks.py <benchmark> [args...]
+    logging.basicConfig(level=logging.WARNING)
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Usage: python benchmarks.py [{'|'.join(BENCHMARKS)}] [args...]")
+        sys.exit(1)
+    start = time.perf_counter()
+    BENCHMARKS[sys.argv[1]](*(int(arg) if arg.isdigit() else arg for arg in sys.argv[2:]))
+    print(f"\n⏱️ Finished in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,296 @@
+import os
+import io
+import time
+import pickle
+import tracemalloc
+
+import numpy as np
+
+import flat_forest
+
+# ✅ Compact model format: one .npz per bundle, read with np.load(allow_pickle=False).
+# - feature ids as uint8, child indices as int16 (int32 for trees over 32k nodes), relative to the tree root
+# - thresholds as float32 rounded towards -inf: for float32 inputs `x <= t32` gives exactly the
+#   same split as sklearn's `x <= t64`, so tree walks are unchanged
+# - forest leaves as sparse class distributions: uint8/uint16 class ids + uint16 quantized fractions
+# - XGBoost leaves keep their float32 values, so boosters stay bit-for-bit identical
+# - entries with no compact encoding (the time bundle's feature_selector) are pickled unchanged into one
+#   uint8 array, as the ONNX export keeps them in its bundle.pkl
+
+FORMAT_VERSION = 1
+PROBABILITY_SCALE = 65535
+
+
+def _index_dtype(max_nodes):
+    return np.int16 if max_nodes < np.iinfo(np.int16).max else np.int32
+
+
+def _class_dtype(n_classes):
+    return np.uint8 if n_classes <= 256 else np.uint16
+
+
+# ✅ Function: Round float64 Thresholds Down to float32 without Changing Any Split
+def _floor_float32(threshold):
+    t32 = threshold.astype(np.float32)
+    too_big = t32.astype(np.float64) > threshold
+    t32[too_big] = np.nextafter(t32[too_big], np.float32(-np.inf))
+    return t32
+
+
+def _local_tree_arrays(flat):
+    """Per-tree local child indices; leaves store their local leaf number in `right`."""
+    roots = np.asarray(flat.roots, dtype=np.int64)
+    ends = np.append(roots[1:], len(flat.left))
+    left = np.asarray(flat.left, dtype=np.int64)
+    right = np.asarray(flat.right, dtype=np.int64)
+    tree_of_node = np.repeat(np.arange(len(roots)), ends - roots)
+    is_leaf = left < 0
+
+    local_left = np.where(is_leaf, -1, left - roots[tree_of_node])
+    local_right = np.where(is_leaf, 0, right - roots[tree_of_node])
+
+    leaf_counts = np.bincount(tree_of_node[is_leaf], minlength=len(roots))
+    leaf_roots = np.concatenate([[0], np.cumsum(leaf_counts)[:-1]])
+    leaf_numbers = np.cumsum(is_leaf) - 1 - leaf_roots[tree_of_node]
+    local_right[is_leaf] = leaf_numbers[is_leaf]
+
+    dtype = _index_dtype(int((ends - roots).max()))
+    return {
+        "roots": roots.astype(np.int32),
+        "leaf_roots": leaf_roots.astype(np.int32),
+        "left": local_left.astype(dtype),
+        "right": local_right.astype(dtype),
+        "is_leaf": is_leaf,
+    }
+
+
+def _walk_local(compact, X, go_left):
+    n_rows = X.shape[0]
+    roots = compact.roots.astype(np.intp)[:, None]
+    local = np.zeros((len(compact.roots), n_rows), dtype=np.intp)
+    row_index = np.broadcast_to(np.arange(n_rows), local.shape)
+    while True:
+        nodes = roots + local
+        left = compact.left[nodes]
+        internal = left >= 0
+        if not internal.any():
+            # Leaves keep their local leaf number in `right`
+            return compact.leaf_roots.astype(np.intp)[:, None] + compact.right[nodes]
+        x = X[row_index, compact.feature[nodes]]
+        local = np.where(internal, np.where(go_left(x, nodes), left, compact.right[nodes]), local)
+
+
+class CompactForest:
+    kind = "forest"
+
+    def __init__(self, arrays, classes):
+        self.__dict__.update(arrays)
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def from_flat(cls, flat):
+        tree = _local_tree_arrays(flat)
+        value = np.asarray(flat.value)[tree["is_leaf"]]
+        leaf, cls_ids = np.nonzero(value)
+        quantized = np.rint(value[leaf, cls_ids] * PROBABILITY_SCALE).astype(np.uint16)
+        leaf_ptr = np.concatenate([[0], np.cumsum(np.bincount(leaf, minlength=len(value)))])
+        arrays = {
+            "feature": np.asarray(flat.feature).astype(np.uint8),
+            "threshold": _floor_float32(np.asarray(flat.threshold)),
+            "left": tree["left"],
+            "right": tree["right"],
+            "roots": tree["roots"],
+            "leaf_roots": tree["leaf_roots"],
+            "leaf_ptr": leaf_ptr.astype(np.int32),
+            "leaf_class": cls_ids.astype(_class_dtype(flat.n_classes_)),
+            "leaf_prob": quantized,
+        }
+        return cls(arrays, flat.classes_)
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        leaves = _walk_local(self, X, lambda x, nodes: x <= self.threshold[nodes])
+
+        # Scatter the sparse leaf distributions of every (tree, row) into one (row, class) sum
+        starts = self.leaf_ptr[leaves].ravel()
+        lengths = self.leaf_ptr[leaves + 1].ravel() - starts
+        entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = np.repeat(np.tile(np.arange(n_rows), len(self.roots)), lengths)
+        flat_index = rows * self.n_classes_ + self.leaf_class[entries]
+        proba = np.bincount(flat_index, weights=self.leaf_prob[entries], minlength=n_rows * self.n_classes_)
+        return proba.reshape(n_rows, self.n_classes_) / (PROBABILITY_SCALE * self.n_estimators)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class CompactBooster:
+    kind = "booster"
+
+    def __init__(self, arrays, base_score):
+        self.__dict__.update(arrays)
+        self.base_score = np.float32(base_score)
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def from_flat(cls, flat):
+        tree = _local_tree_arrays(flat)
+        arrays = {
+            "feature": np.asarray(flat.feature).astype(np.uint8),
+            "threshold": np.asarray(flat.threshold, dtype=np.float32),
+            "left": tree["left"],
+            "right": tree["right"],
+            "roots": tree["roots"],
+            "leaf_roots": tree["leaf_roots"],
+            "default_left": np.asarray(flat.default_left, dtype=np.uint8),
+            "leaf_value": np.asarray(flat.value, dtype=np.float32)[tree["is_leaf"]],
+        }
+        return cls(arrays, flat.base_score)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+
+        def go_left(x, nodes):
+            return np.where(np.isnan(x), self.default_left[nodes].astype(bool), x < self.threshold[nodes])
+
+        values = self.leaf_value[_walk_local(self, X, go_left)]
+        values[0] += self.base_score
+        return np.cumsum(values, axis=0, dtype=np.float32)[-1]
+
+
+class CompactLabelEncoder:
+    """Minimal LabelEncoder (transform / inverse_transform) rebuilt from classes_."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def transform(self, y):
+        y = np.asarray(y)
+        index = np.searchsorted(self.classes_, y)
+        index = np.clip(index, 0, len(self.classes_) - 1)
+        unknown = self.classes_[index] != y
+        if unknown.any():
+            raise ValueError(f"y contains previously unseen labels: {y[unknown].tolist()}")
+        return index
+
+    def inverse_transform(self, y):
+        return self.classes_[np.asarray(y, dtype=np.intp)]
+
+
+# ✅ Function: Save a Model Bundle in the Compact Format
+def save_compact(model_data, path, compress=True):
+    arrays = {"format_version": np.array(FORMAT_VERSION)}
+    keys, pickled = [], {}
+    for key, value in model_data.items():
+        if key == "selected_features":
+            arrays["selected_features"] = np.asarray(value, dtype=str)
+        elif key == "label_encoders":
+            for column, encoder in value.items():
+                classes = np.asarray(encoder.classes_)
+                arrays[f"label_encoders/{column}"] = classes.astype(str) if classes.dtype == object else classes
+        elif hasattr(value, "get_booster") and flat_forest.num_targets(value) > 1:
+            continue  # The optional fused time_model; compact bundles serve month_model/hour_model
+        else:
+            flat = value if hasattr(value, "kind") else flat_forest.flatten(value)
+            if flat is None or flat.kind == "ovr":
+                pickled[key] = value
+                continue
+            compact = CompactForest.from_flat(flat) if flat.kind == "forest" else CompactBooster.from_flat(flat)
+            keys.append(key)
+            arrays[f"{key}/kind"] = np.array(compact.kind)
+            if compact.kind == "forest":
+                classes = compact.classes_
+                arrays[f"{key}/classes"] = classes.astype(str) if classes.dtype == object else classes
+            else:
+                arrays[f"{key}/base_score"] = np.array(compact.base_score)
+            for name, array in vars(compact).items():
+                if isinstance(array, np.ndarray) and name not in ("classes_",):
+                    arrays[f"{key}/{name}"] = array
+    arrays["models"] = np.asarray(keys, dtype=str)
+    if pickled:
+        arrays["pickled"] = np.frombuffer(pickle.dumps(pickled, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+
+    buffer = io.BytesIO()
+    (np.savez_compressed if compress else np.savez)(buffer, **arrays)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(buffer.getvalue())
+    os.replace(tmp_path, path)
+    return path
+
+
+# ✅ Function: Load a Compact Bundle (same dict layout as the pickled bundles)
+def load_compact(path):
+    with np.load(path, allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    if int(arrays.pop("format_version")) != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compact model format in {path}")
+
+    model_data = {"selected_features": arrays.pop("selected_features").tolist(), "label_encoders": {}}
+    for key in arrays.pop("models").tolist():
+        fields = {name.split("/", 1)[1]: arrays.pop(name) for name in list(arrays) if name.startswith(f"{key}/")}
+        kind = str(fields.pop("kind"))
+        if kind == "forest":
+            model_data[key] = CompactForest(fields, fields.pop("classes"))
+        else:
+            model_data[key] = CompactBooster(fields, fields.pop("base_score"))
+    for name in list(arrays):
+        if name.startswith("label_encoders/"):
+            model_data["label_encoders"][name.split("/", 1)[1]] = CompactLabelEncoder(arrays.pop(name))
+    if "pickled" in arrays:
+        model_data.update(pickle.loads(arrays.pop("pickled").tobytes()))
+    return model_data
+
+
+# ✅ Function: Prove the Compact Bundle Predicts the Same as the Pickle, and Measure It
+def validate_compact(pickle_path, compact_path, datasets):
+    """datasets: {model key: feature matrix from the training CSV}"""
+    import joblib
+
+    def measure(load):
+        tracemalloc.start()
+        start = time.perf_counter()
+        loaded = load()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return loaded, elapsed, peak
+
+    original, pickle_load_s, pickle_peak = measure(lambda: joblib.load(pickle_path))
+    compact, compact_load_s, compact_peak = measure(lambda: load_compact(compact_path))
+
+    report = {
+        "pickle": {"size_mb": os.path.getsize(pickle_path) / 1e6, "load_s": pickle_load_s, "peak_mb": pickle_peak / 1e6},
+        "compact": {"size_mb": os.path.getsize(compact_path) / 1e6, "load_s": compact_load_s, "peak_mb": compact_peak / 1e6},
+        "models": {},
+    }
+    for key, X in datasets.items():
+        X = np.asarray(X, dtype=np.float32)
+        expected = original[key].predict(X)
+        actual = compact[key].predict(X)
+        check = {"rows": len(X), "identical_predictions": bool(np.array_equal(expected, actual))}
+        if hasattr(original[key], "predict_proba"):
+            p_expected = original[key].predict_proba(X)
+            p_actual = compact[key].predict_proba(X)
+            check["max_probability_diff"] = float(np.abs(p_expected - p_actual).max())
+            if p_expected.shape[1] == 2:
+                # The presence service answers with probability >= 0.5
+                check["identical_decisions"] = bool(np.array_equal(p_expected[:, 1] >= 0.5, p_actual[:, 1] >= 0.5))
+        else:
+            check["max_abs_diff"] = float(np.abs(expected - actual).max())
+            check["identical_rounded"] = bool(np.array_equal(np.round(expected), np.round(actual)))
+        report["models"][key] = check
+    for column, encoder in original["label_encoders"].items():
+        report["models"][f"label_encoders/{column}"] = {
+            "identical_classes": bool(np.array_equal(encoder.classes_, compact["label_encoders"][column].classes_))
+        }
+    # Every entry survives except the fused time_model, which compact bundles leave out
+    report["missing_keys"] = sorted(key for key in original if key not in compact and key != "time_model")
+    report["valid"] = not report["missing_keys"] and all(
+        check.get("identical_predictions", True) and check.get("identical_classes", True)
+        for check in report["models"].values()
+    )
+    return report
@@ -0,0 +1,127 @@
+import os
+import csv
+from collections import namedtuple
+
+# ✅ Aho-Corasick automaton over the bird / locality vocabulary (names, aliases and the locality list in
+# `Migration model/cleaned_unique_localities.csv`), built once at startup. find() reads the text one
+# character at a time, so a query costs the same whether the vocabulary has ten names or ten thousand.
+# Overlapping matches resolve to the leftmost, then the longest ("tissa lake north" over "tissa").
+
+LOCALITIES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Migration model",
+                              "cleaned_unique_localities.csv")
+
+Entity = namedtuple("Entity", ["start", "end", "value"])
+
+
+def _is_letter(char):
+    return char.isalnum() and not char.isdecimal()  # What the tokenizer's regex calls a letter
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+# ✅ Function: Locality Names from the Cleaned eBird Export (one quoted row; whitespace runs collapsed)
+def load_localities(path=LOCALITIES_CSV):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as file:
+        names = (" ".join(name.split()) for row in csv.reader(file) for name in row)
+        return list(dict.fromkeys(name for name in names if name))
+
+
+class EntityMatcher:
+    """Phrases are lowercased text; a match must start at a word start and, for phrases added with
+    whole_word=True, end at a word end (the others may run into the next word, like "bulbuls")."""
+
+    def __init__(self):
+        self._edges = [{}]     # state -> {char: child state}
+        self._fail = [0]       # state -> longest proper suffix that is also a trie state
+        self._depth = [0]      # characters from the root
+        self._value = [None]   # value of the phrase ending at the state (None: no phrase ends here)
+        self._whole_word = [False]
+        self._report = [0]     # nearest state on the fail chain (the state itself included) ending a phrase
+        self._next = None      # state -> {char: next state}, failure links resolved as they are first taken
+        self._alphabet = set()
+
+    def __len__(self):
+        return sum(value is not None for value in self._value)
+
+    def add(self, phrase, value, whole_word=False):
+        """Adds `phrase`; the first value added for a phrase wins. Returns whether it was new."""
+        if self._next is not None:
+            raise RuntimeError("EntityMatcher.add() after build()")
+        if not phrase:
+            return False
+        state = 0
+        self._alphabet.update(phrase)
+        for char in phrase:
+            child = self._edges[state].get(char)
+            if child is None:
+                child = len(self._edges)
+                self._edges[state][char] = child
+                self._edges.append({})
+                self._fail.append(0)
+                self._depth.append(self._depth[state] + 1)
+                self._value.append(None)
+                self._whole_word.append(False)
+                self._report.append(0)
+            state = child
+        if self._value[state] is not None:
+            return False
+        self._value[state], self._whole_word[state] = value, whole_word
+        return True
+
+    def build(self):
+        """Failure links, breadth first (a state's suffix is always shallower than the state)."""
+        queue = list(self._edges[0].values())
+        for state in queue:
+            self._report[state] = state if self._value[state] is not None else self._report[self._fail[state]]
+            for char, child in self._edges[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._edges[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._edges[fallback].get(char, 0)
+                queue.append(child)
+        self._next = [dict(edges) for edges in self._edges]
+        return self
+
+    def _step(self, state, char):
+        """Follows failure links for a vocabulary character with no edge from `state`, and remembers the
+        result (the table stays within states x alphabet; other characters always lead to the root)."""
+        target = state
+        child = self._edges[target].get(char)
+        while child is None and target:
+            target = self._fail[target]
+            child = self._edges[target].get(char)
+        self._next[state][char] = child or 0  # Same value from any thread
+        return child or 0
+
+    # ✅ Every Vocabulary Phrase in the Text (non-overlapping, leftmost-longest, in text order)
+    def find(self, text):
+        transitions, fail, report, depth, alphabet = self._next, self._fail, self._report, self._depth, self._alphabet
+        candidates = []  # (start, -end, state): sorts leftmost first, then longest first
+        state = 0
+        for end, char in enumerate(text, 1):
+            following = transitions[state].get(char)
+            if following is None:
+                following = self._step(state, char) if char in alphabet else 0
+            state = following
+            found = report[state]
+            while found:
+                candidates.append((end - depth[found], -end, found))
+                found = report[fail[found]]
+        if not candidates:
+            return []
+
+        candidates.sort()
+        chosen, covered = [], 0
+        for start, end, found in candidates:
+            end = -end
+            if start < covered or (start and _is_letter(text[start - 1])):
+                continue
+            if self._whole_word[found] and end < len(text) and _is_word_char(text[end]):
+                continue  # A shorter phrase at the same start may still fit
+            chosen.append(Entity(start, end, self._value[found]))
+            covered = end
+        return chosen
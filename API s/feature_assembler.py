@@ -0,0 +1,132 @@
+import threading
+import functools
+import warnings
+
+import lazy_imports
+import thread_policy
+
+np = lazy_imports.lazy_import("numpy")
+
+# ✅ Model inputs as one float32 NumPy buffer per thread instead of a new pd.DataFrame per request.
+# The column order is compiled once from the bundle's `selected_features`.
+
+
+class FeatureAssembler:
+    """Writes named feature values into a reused (rows, n_features) float32 buffer."""
+
+    def __init__(self, selected_features):
+        self.selected_features = list(selected_features)
+        self.columns = {name: i for i, name in enumerate(self.selected_features)}
+        self._local = threading.local()
+
+    def _buffer(self, rows):
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or buffer.shape[0] < rows:
+            buffer = np.empty((max(rows, 1), len(self.selected_features)), dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:rows]
+
+    # ✅ Fill the Buffer from {feature name: scalar or per-row array}
+    def assemble(self, values, rows=1):
+        """The returned array is only valid until this thread's next call; copy it to keep it."""
+        missing = [name for name in self.selected_features if name not in values]
+        if missing:
+            raise KeyError(f"Missing model features: {missing}")
+        X = self._buffer(rows)
+        for name, column in self.columns.items():
+            X[:, column] = values[name]
+        return X
+
+    def assemble_rows(self, rows):
+        """Same as assemble() for a list of {feature name: value} dicts, one per row."""
+        return self.assemble({name: [row[name] for row in rows] for name in self.selected_features}, rows=len(rows))
+
+
+@functools.lru_cache(maxsize=16)
+def _assembler(selected_features):
+    return FeatureAssembler(selected_features)
+
+
+# ✅ Function: One Compiled Assembler per Feature List (shared by every request for that model)
+def for_features(selected_features):
+    return _assembler(tuple(selected_features))
+
+
+def _is_sklearn_forest(estimator):
+    return hasattr(estimator, "estimators_") and all(hasattr(e, "tree_") for e in estimator.estimators_)
+
+
+# ✅ Function: predict_proba on a Raw float32 Array (no DataFrame, no feature-name checks)
+def predict_proba(estimator, X):
+    if hasattr(estimator, "kind"):  # flat_forest / compact_forest models take arrays already
+        return estimator.predict_proba(X)
+    threads = thread_policy.threads_for(len(X))
+    if _is_sklearn_forest(estimator) and getattr(estimator, "n_outputs_", 1) == 1:
+        # Same tree-by-tree sum RandomForestClassifier.predict_proba does, minus input validation
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        trees = estimator.estimators_
+        if threads == 1:
+            proba = _sum_tree_proba(trees, X, estimator.n_classes_)
+        else:
+            # Batch calls split the trees across the shared pool (tree predict releases the GIL)
+            chunks = [trees[i::threads] for i in range(min(threads, len(trees)))]
+            parts = thread_policy.pool().map(lambda chunk: _sum_tree_proba(chunk, X, estimator.n_classes_), chunks)
+            proba = sum(parts)
+        proba /= len(trees)
+        return proba
+    with warnings.catch_warnings(), thread_policy.joblib_threads(threads):
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return estimator.predict_proba(X)
+
+
+def _sum_tree_proba(trees, X, n_classes):
+    proba = np.zeros((X.shape[0], n_classes), dtype=np.float64)
+    for tree in trees:
+        proba += tree.predict_proba(X, check_input=False)
+    return proba
+
+
+def _distinct_rows(X):
+    unique, inverse = np.unique(X, axis=0, return_inverse=True)
+    return unique, inverse.reshape(-1)
+
+
+# ✅ Function: Score a Batch with Each Distinct Row Computed Once (bulk requests repeat a lot)
+def predict_proba_distinct(estimator, X):
+    unique, inverse = _distinct_rows(X)
+    if len(unique) == len(X):
+        return predict_proba(estimator, X)
+    return predict_proba(estimator, unique)[inverse]
+
+
+def predict_distinct(estimator, X):
+    unique, inverse = _distinct_rows(X)
+    if len(unique) == len(X):
+        return predict(estimator, X)
+    return predict(estimator, unique)[inverse]
+
+
+# ✅ Function: predict for Several Models on the Same Rows (the input array is prepared once)
+def predict_each(estimators, X, distinct=False):
+    """distinct: score each distinct row once, as predict_distinct() does."""
+    if distinct:
+        unique, inverse = _distinct_rows(X)
+        if len(unique) < len(X):
+            return [output[inverse] for output in predict_each(estimators, unique)]
+    X = np.ascontiguousarray(X, dtype=np.float32)  # inplace_predict reads it without another copy
+    return [predict(estimator, X) for estimator in estimators]
+
+
+# ✅ Function: predict on a Raw float32 Array (XGBoost goes straight to inplace_predict)
+def predict(estimator, X):
+    if hasattr(estimator, "kind"):
+        return estimator.predict(X)
+    threads = thread_policy.threads_for(len(X))
+    if hasattr(estimator, "get_booster"):
+        # nthread comes from the booster: one thread for single rows, the batch budget otherwise
+        return thread_policy.booster(estimator, threads).inplace_predict(X, validate_features=False)
+    if hasattr(estimator, "predict_proba") and hasattr(estimator, "classes_"):
+        return estimator.classes_.take(np.argmax(predict_proba(estimator, X), axis=1), axis=0)
+    with warnings.catch_warnings(), thread_policy.joblib_threads(threads):
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return estimator.predict(X)
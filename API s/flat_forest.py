@@ -0,0 +1,277 @@
+import os
+import json
+
+import numpy as np
+
+# ✅ Tree ensembles stored as plain NumPy node arrays (all trees back to back).
+# Saved uncompressed as .npy files and loaded with mmap_mode='r', so every worker of
+# every service shares one copy of the nodes through the OS page cache.
+
+FOREST_ARRAYS = ["feature", "threshold", "left", "right", "value", "roots"]
+BOOSTER_ARRAYS = ["feature", "threshold", "left", "right", "default_left", "value", "roots"]
+
+
+def _sklearn_values_are_fractions():
+    # scikit-learn >= 1.4 stores class fractions in tree_.value, older versions store counts
+    import sklearn
+    major, minor = (int(part) for part in sklearn.__version__.split(".")[:2])
+    return (major, minor) >= (1, 4)
+
+
+# ✅ Function: Walk Every Tree for Every Row at Once
+def _walk(flat, X, go_left):
+    """Returns leaf node ids with shape (n_trees, n_rows)."""
+    n_rows = X.shape[0]
+    nodes = np.repeat(np.asarray(flat.roots, dtype=np.intp)[:, None], n_rows, axis=1)
+    row_index = np.broadcast_to(np.arange(n_rows), nodes.shape)
+    while True:
+        left = flat.left[nodes]
+        internal = left >= 0
+        if not internal.any():
+            return nodes
+        x = X[row_index, flat.feature[nodes]]
+        nodes = np.where(internal, np.where(go_left(x, nodes), left, flat.right[nodes]), nodes)
+
+
+class FlatForest:
+    """Drop-in stand-in for a fitted RandomForestClassifier (predict / predict_proba)."""
+
+    kind = "forest"
+
+    def __init__(self, arrays, classes):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes_ = np.asarray(classes)
+        self.n_classes_ = len(self.classes_)
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        fractions = _sklearn_values_are_fractions()
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left < 0
+            value = tree.value[:, 0, :forest.n_classes_].astype(np.float64)
+            if not fractions:
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+            values.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+        arrays = {
+            "feature": np.concatenate(features),
+            "threshold": np.concatenate(thresholds),
+            "left": np.concatenate(lefts),
+            "right": np.concatenate(rights),
+            "value": np.concatenate(values),
+            "roots": np.asarray(roots, dtype=np.int32),
+        }
+        return cls(arrays, forest.classes_)
+
+    def _leaves(self, X):
+        # sklearn compares float32 inputs against float64 thresholds with `<=`
+        X = np.asarray(X, dtype=np.float32)
+        return _walk(self, X, lambda x, nodes: x <= self.threshold[nodes])
+
+    def predict_proba(self, X):
+        leaves = self._leaves(X)
+        # cumsum adds tree by tree, the same order RandomForestClassifier.predict_proba
+        # accumulates in, so the result is bit-for-bit identical
+        proba = np.cumsum(self.value[leaves], axis=0)[-1]
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def meta(self):
+        return {"classes": self.classes_.tolist()}
+
+
+class FlatBooster:
+    """Drop-in stand-in for a fitted XGBRegressor (predict) built from its JSON model dump."""
+
+    kind = "booster"
+
+    def __init__(self, arrays, base_score):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.default_left = arrays["default_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.base_score = np.float32(base_score)
+        self.n_estimators = len(self.roots)
+
+    @classmethod
+    def from_xgboost(cls, model):
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        dump = json.loads(booster.save_raw("json"))
+        learner = dump["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "reg:squarederror":
+            raise ValueError(f"Unsupported XGBoost objective for flattening: {objective}")
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+
+        features, thresholds, lefts, rights, defaults, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        for tree in learner["gradient_booster"]["model"]["trees"]:
+            left = np.asarray(tree["left_children"], dtype=np.int32)
+            right = np.asarray(tree["right_children"], dtype=np.int32)
+            is_leaf = left < 0
+            split_conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+            features.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32))
+            thresholds.append(split_conditions)
+            lefts.append(np.where(is_leaf, -1, left + offset).astype(np.int32))
+            rights.append(np.where(is_leaf, -1, right + offset).astype(np.int32))
+            defaults.append(np.asarray(tree["default_left"], dtype=np.uint8))
+            # Leaf outputs live in split_conditions for leaf nodes
+            values.append(np.where(is_leaf, split_conditions, 0).astype(np.float32))
+            roots.append(offset)
+            offset += len(left)
+        arrays = {
+            "feature": np.concatenate(features),
+            "threshold": np.concatenate(thresholds),
+            "left": np.concatenate(lefts),
+            "right": np.concatenate(rights),
+            "default_left": np.concatenate(defaults),
+            "value": np.concatenate(values),
+            "roots": np.asarray(roots, dtype=np.int32),
+        }
+        return cls(arrays, base_score)
+
+    def _leaves(self, X):
+        X = np.asarray(X, dtype=np.float32)
+
+        # XGBoost goes left on `x < split`, missing values follow default_left
+        def go_left(x, nodes):
+            return np.where(np.isnan(x), self.default_left[nodes].astype(bool), x < self.threshold[nodes])
+
+        return _walk(self, X, go_left)
+
+    def predict(self, X):
+        leaves = self._leaves(X)
+        values = self.value[leaves]
+        values[0] += self.base_score
+        return np.cumsum(values, axis=0, dtype=np.float32)[-1]
+
+    def meta(self):
+        return {"base_score": float(self.base_score)}
+
+
+class FlatOneVsRest:
+    """Drop-in stand-in for a OneVsRestClassifier whose per-class estimators are random forests."""
+
+    kind = "ovr"
+
+    def __init__(self, forests, classes, y_type):
+        self.forests = forests
+        self.classes_ = np.asarray(classes)
+        self.y_type = y_type  # "binary", "multiclass" or "multilabel-indicator"
+        self.multilabel_ = y_type.startswith("multilabel")
+
+    @classmethod
+    def from_sklearn(cls, ovr):
+        forests = [FlatForest.from_sklearn(estimator) for estimator in ovr.estimators_]
+        return cls(forests, ovr.classes_, ovr.label_binarizer_.y_type_)
+
+    def _scores(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return np.array([forest.predict_proba(X)[:, 1] for forest in self.forests]).T
+
+    def predict_proba(self, X):
+        Y = self._scores(X)
+        if len(self.forests) == 1:
+            Y = np.concatenate(((1 - Y), Y), axis=1)
+        if not self.multilabel_:
+            Y /= np.sum(Y, axis=1)[:, np.newaxis]
+        return Y
+
+    def predict(self, X):
+        scores = self._scores(X)
+        if self.y_type == "multiclass":
+            return self.classes_[np.argmax(scores, axis=1)]
+        indicator = (scores > 0.5).astype(int)
+        if self.multilabel_:
+            return indicator
+        return self.classes_[indicator[:, 0]]
+
+    def meta(self):
+        return {"classes": self.classes_.tolist(), "y_type": self.y_type, "n_forests": len(self.forests)}
+
+
+# ✅ Function: Convert a Fitted Estimator (None if it is not a supported ensemble)
+def flatten(estimator):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.multiclass import OneVsRestClassifier
+
+    if isinstance(estimator, RandomForestClassifier) and estimator.n_outputs_ == 1:
+        return FlatForest.from_sklearn(estimator)
+    if isinstance(estimator, OneVsRestClassifier):
+        if all(isinstance(e, RandomForestClassifier) and e.n_outputs_ == 1 for e in estimator.estimators_):
+            return FlatOneVsRest.from_sklearn(estimator)
+        return None
+    if hasattr(estimator, "get_booster"):
+        if num_targets(estimator) > 1:  # Multi-output boosters (the fused month+hour model) stay as they are
+            return None
+        return FlatBooster.from_xgboost(estimator)
+    return None
+
+
+def num_targets(estimator):
+    config = json.loads(estimator.get_booster().save_config())
+    return int(config["learner"]["learner_model_param"].get("num_target", "1"))
+
+
+# ✅ Function: Check a Flattened Model Gives Exactly the Same Outputs as the Original
+def check_parity(estimator, flat, X):
+    X = np.asarray(X, dtype=np.float32)
+    method = "predict_proba" if hasattr(estimator, "predict_proba") else "predict"
+    expected = getattr(estimator, method)(X)
+    actual = getattr(flat, method)(X)
+    return {
+        "method": method,
+        "rows": len(X),
+        "identical": bool(np.array_equal(expected, actual)),
+        "max_abs_diff": float(np.max(np.abs(np.asarray(expected, dtype=np.float64) - actual))) if len(X) else 0.0,
+    }
+
+
+# ✅ Function: Save Node Arrays Uncompressed (one .npy per array)
+def save(flat, directory, key):
+    os.makedirs(directory, exist_ok=True)
+    if flat.kind == "ovr":
+        for i, forest in enumerate(flat.forests):
+            save(forest, directory, f"{key}.{i}")
+    else:
+        names = FOREST_ARRAYS if flat.kind == "forest" else BOOSTER_ARRAYS
+        for name in names:
+            np.save(os.path.join(directory, f"{key}.{name}.npy"), np.ascontiguousarray(getattr(flat, name)))
+    with open(os.path.join(directory, f"{key}.json"), "w") as file:
+        json.dump({"kind": flat.kind, **flat.meta()}, file)
+
+
+# ✅ Function: Load Node Arrays Memory-Mapped (read-only, shared between processes)
+def load(directory, key, mmap_mode="r"):
+    with open(os.path.join(directory, f"{key}.json")) as file:
+        meta = json.load(file)
+    if meta["kind"] == "ovr":
+        forests = [load(directory, f"{key}.{i}", mmap_mode) for i in range(meta["n_forests"])]
+        return FlatOneVsRest(forests, meta["classes"], meta["y_type"])
+    names = FOREST_ARRAYS if meta["kind"] == "forest" else BOOSTER_ARRAYS
+    arrays = {name: np.load(os.path.join(directory, f"{key}.{name}.npy"), mmap_mode=mmap_mode) for name in names}
+    if meta["kind"] == "forest":
+        return FlatForest(arrays, meta["classes"])
+    return FlatBooster(arrays, meta["base_score"])
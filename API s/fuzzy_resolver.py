@@ -0,0 +1,140 @@
+import re
+import heapq
+from itertools import chain
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # difflib scores the shortlist instead (same 0-100 scale, several times slower)
+    fuzz = None
+
+# ✅ Typo-tolerant bird / locality lookup. Every name and alias is split into character trigrams once
+# at startup, and an inverted index (trigram -> names) turns a misspelled input into a short list of
+# names sharing the most trigrams with it. Only that shortlist is scored (rapidfuzz when installed),
+# so a lookup stays well under a millisecond with thousands of names.
+
+Match = namedtuple("Match", ["value", "score"])
+
+SHORTLIST = 20      # Names scored per lookup, taken in order of shared trigrams
+MIN_SEARCH_LENGTH = 5  # Shorter names ("Nov", "Sw" in the eBird export) are only found by exact matching
+WORD_CUTOFF = 75       # In a query, every word of a name must be spelled about this well by some query word
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize(text):
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split())
+
+
+def trigrams(text):
+    """Trigrams of each word padded with a space on both sides: "tissa" -> " ti", "tis", ..., "sa "."""
+    return {word[i:i + 3] for word in (f" {word} " for word in text.split()) for i in range(len(word) - 2)}
+
+
+def _ratio(a, b):
+    return fuzz.ratio(a, b) if fuzz else 100 * SequenceMatcher(None, a, b).ratio()
+
+
+def _whole_ratio(text, name):
+    """How well `text` as a whole spells `name` (token order and extra words matter less)."""
+    if fuzz:
+        return fuzz.WRatio(text, name)
+    return 100 * max(SequenceMatcher(None, text, name).ratio(),
+                     SequenceMatcher(None, " ".join(sorted(text.split())), " ".join(sorted(name.split()))).ratio())
+
+
+def _partial_ratio(name, text):
+    """How well `name` is spelled somewhere inside `text`."""
+    if fuzz:
+        return fuzz.partial_ratio(name, text)
+    if len(name) >= len(text):
+        return _ratio(name, text)
+    starts = [0] + [i + 1 for i, char in enumerate(text) if char == " "]  # Windows starting at a word
+    return max(_ratio(name, text[start:start + len(name)]) for start in starts)
+
+
+def _word_spelled(word, candidate):
+    if _ratio(word, candidate) >= WORD_CUTOFF:
+        return True
+    # A typo that ate a space: "southernprovince" spells both words (but "tired" does not spell "red")
+    return len(candidate) >= len(word) + 3 and (candidate.startswith(word) or candidate.endswith(word))
+
+
+def _words_spelled(phrase, words):
+    """Each word of `phrase` is close to some query word ("tisa" ~ "tissa"); keeps "which bird" from
+    reading as the alias "white bird" on the strength of "bird" alone."""
+    return all(any(_word_spelled(word, candidate) for candidate in words) for word in phrase.split())
+
+
+class FuzzyResolver:
+    """Built once from canonical names and an alias -> name dict; read-only (thread-safe) afterwards."""
+
+    def __init__(self, names=(), aliases=None):
+        self.phrases, self.values, self._grams = [], [], []
+        seen = set()
+        for phrase, value in chain(((name, name) for name in names), (aliases or {}).items()):
+            phrase = normalize(phrase)
+            if phrase and phrase not in seen:
+                seen.add(phrase)
+                self.phrases.append(phrase)
+                self.values.append(value)
+                self._grams.append(trigrams(phrase))
+        index = {}
+        for i, grams in enumerate(self._grams):
+            for gram in grams:
+                index.setdefault(gram, []).append(i)
+        self._index = {gram: tuple(ids) for gram, ids in index.items()}
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _shared(self, grams):
+        return Counter(chain.from_iterable(self._index.get(gram, ()) for gram in grams))
+
+    def _top(self, scored, k, cutoff):
+        """scored: (name id, score, order tuple). The best order per value (a name and its aliases count
+        once), highest first."""
+        best = {}
+        for i, score, order in scored:
+            value = self.values[i]
+            if score >= cutoff and (value not in best or order > best[value][1]):
+                best[value] = (score, order)
+        top = heapq.nlargest(k, best.items(), key=lambda item: item[1][1])
+        return [Match(value, round(score, 1)) for value, (score, _) in top]
+
+    # ✅ Names the Whole Input Could Be a Misspelling Of ("tisa lak" -> Tissa Lake)
+    def lookup(self, text, k=5, cutoff=70):
+        text = normalize(text)
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared = self._shared(grams)
+        # Dice coefficient over trigram sets picks the shortlist
+        shortlist = heapq.nlargest(SHORTLIST, shared, key=lambda i: shared[i] / (len(grams) + len(self._grams[i])))
+        scores = ((i, _whole_ratio(text, self.phrases[i])) for i in shortlist)
+        # An exact spelling wins a tie with a reordering of its words ("yala jetwing" / "jetwing yala")
+        return self._top(((i, score, (score, self.phrases[i] == text, shared[i])) for i, score in scores), k, cutoff)
+
+    # ✅ Names Spelled (Possibly Misspelled) Somewhere in a Free-Text Query
+    def search(self, query, k=5, cutoff=80, min_overlap=0.5):
+        """A name is a candidate when at least `min_overlap` of its trigrams occur in the query, and a match
+        when it scores `cutoff` and every one of its words is spelled (closely) by a query word. Matches are
+        ordered by score x shared trigrams, so "bundala nationl park" is Bundala National Park, not the
+        "bundala" spelled exactly inside it."""
+        query = normalize(query)
+        words = set(query.split())
+        shared = self._shared(trigrams(query))
+        overlap = {i: count / len(self._grams[i]) for i, count in shared.items()
+                   if count / len(self._grams[i]) >= min_overlap and len(self.phrases[i]) >= MIN_SEARCH_LENGTH}
+        shortlist = heapq.nlargest(SHORTLIST, overlap, key=overlap.get)
+        scores = ((i, _partial_ratio(self.phrases[i], query)) for i in shortlist)
+        return self._top(((i, score, (score * shared[i],)) for i, score in scores
+                          if score >= cutoff and _words_spelled(self.phrases[i], words)), k, cutoff)
+
+    def best(self, text, cutoff=70):
+        matches = self.lookup(text, k=1, cutoff=cutoff)
+        return matches[0].value if matches else None
+
+    def best_in(self, query, cutoff=80):
+        matches = self.search(query, k=1, cutoff=cutoff)
+        return matches[0].value if matches else None
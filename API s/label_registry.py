@@ -0,0 +1,82 @@
+from difflib import get_close_matches
+
+import lazy_imports
+
+np = lazy_imports.lazy_import("numpy")
+
+# ✅ Label encoding as plain dict / array lookups, built once per model load from each
+# LabelEncoder.classes_ (sklearn's transform validates and searchsorts even for one label)
+
+
+class UnknownLabelError(ValueError):
+    """A label the model was not trained on (the services answer 400 with suggestions)."""
+
+    def __init__(self, column, label, suggestions=()):
+        self.column = column
+        self.label = label
+        self.suggestions = list(suggestions)
+        message = f"Unknown {column} value: {label!r}"
+        if self.suggestions:
+            message += f" (did you mean {', '.join(repr(s) for s in self.suggestions)}?)"
+        super().__init__(message)
+
+    def to_dict(self):
+        return {"error": str(self), "column": self.column, "label": self.label, "suggestions": self.suggestions}
+
+
+class LabelCodec:
+    """Both directions for one encoded column: label -> code (dict) and code -> label (array)."""
+
+    def __init__(self, column, classes):
+        self.column = column
+        self.classes_ = np.asarray(classes)
+        self.labels = [str(label) for label in self.classes_.tolist()]
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def encode(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            raise UnknownLabelError(self.column, label, get_close_matches(str(label), self.labels, n=3, cutoff=0.6))
+        return code
+
+    def encode_many(self, labels):
+        return np.fromiter((self.encode(label) for label in labels), dtype=np.int64)
+
+    def decode(self, code):
+        return self.labels[code]
+
+    def decode_many(self, codes):
+        return self.classes_.take(np.asarray(codes, dtype=np.intp))
+
+    def __contains__(self, label):
+        return label in self.codes
+
+    def __len__(self):
+        return len(self.labels)
+
+
+class LabelRegistry:
+    """All codecs of one model bundle, keyed by column name ('LOCALITY', 'COMMON NAME')."""
+
+    def __init__(self, codecs):
+        self.codecs = codecs
+
+    @classmethod
+    def from_label_encoders(cls, label_encoders):
+        return cls({column: LabelCodec(column, encoder.classes_) for column, encoder in label_encoders.items()})
+
+    def __getitem__(self, column):
+        return self.codecs[column]
+
+    def encode(self, column, label):
+        return self.codecs[column].encode(label)
+
+    def decode(self, column, code):
+        return self.codecs[column].decode(code)
+
+
+# ✅ Function: Attach a Registry to a Loaded Bundle (model_data["label_registry"])
+def attach(model_data):
+    if "label_encoders" in model_data and "label_registry" not in model_data:
+        model_data["label_registry"] = LabelRegistry.from_label_encoders(model_data["label_encoders"])
+    return model_data
@@ -0,0 +1,46 @@
+import os
+import time
+import types
+import logging
+import importlib
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ✅ BIRD_LAZY_IMPORTS=1 defers heavy modules (pandas, joblib, ...) until first use, so a service
+# binds its port sooner; the background model loader then pulls them in off the request path
+LAZY = os.environ.get("BIRD_LAZY_IMPORTS", "0") == "1"
+
+# ✅ Seconds spent importing each deferred module, filled in on first use
+timings = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module stand-in that imports the real module on first attribute access (thread-safe)."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_lock = threading.Lock()
+        self._lazy_module = None
+
+    def _load(self):
+        with self._lazy_lock:
+            if self._lazy_module is None:
+                start = time.perf_counter()
+                self._lazy_module = importlib.import_module(self.__name__)
+                timings[self.__name__] = time.perf_counter() - start
+                logger.info(f"📦 Imported {self.__name__} on first use in {timings[self.__name__] * 1000:.0f}ms")
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+# ✅ Function: Import a Module Now, or Return a Lazy Stand-In in Lazy-Import Mode
+def lazy_import(name, lazy=None):
+    if not (LAZY if lazy is None else lazy):
+        return importlib.import_module(name)
+    return LazyModule(name)
@@ -0,0 +1,141 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+# ✅ Stand-in for raw.githubusercontent.com: serves a local models folder over HTTP with
+# ETag / If-None-Match / Range support, plus optional throttling and injected faults
+class ModelRequestHandler(SimpleHTTPRequestHandler):
+    chunk_size = 64 * 1024
+
+    def __init__(self, *args, faults=None, **kwargs):
+        self.faults = faults
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _etag(self, path):
+        stat = os.stat(path)
+        return f'"{hashlib.sha1(f"{stat.st_size}-{stat.st_mtime_ns}".encode()).hexdigest()}"'
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+        faults = self.faults
+        if faults:
+            faults.record(self.headers)
+            status = faults.take_status()
+            if status:
+                self.send_error(status)
+                return
+
+        size = os.path.getsize(path)
+        etag = self._etag(path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        partial = bool(match) and (if_range is None or if_range == etag)
+        if partial:
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return
+
+        self.send_response(206 if partial else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if partial:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        cut_after = faults.take_cut() if faults else None
+        rate = faults.bytes_per_second if faults else None
+        sent = 0
+        with open(path, "rb") as file:
+            file.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    chunk = file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    if cut_after is not None and sent + len(chunk) > cut_after:
+                        # Simulate a dropped connection halfway through the body
+                        self.wfile.write(chunk[:max(cut_after - sent, 0)])
+                        self.wfile.flush()
+                        self.close_connection = True
+                        return
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    remaining -= len(chunk)
+                    if rate:
+                        time.sleep(len(chunk) / rate)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client stopped reading (e.g. it only wanted the headers)
+                self.close_connection = True
+
+
+class Faults:
+    """Fault injection for ModelRequestHandler (shared by every request of one server)."""
+
+    def __init__(self, bytes_per_second=None, cut_after_bytes=(), statuses=()):
+        self.bytes_per_second = bytes_per_second  # throttle every response body
+        self.cut_after_bytes = list(cut_after_bytes)  # drop the next responses after N body bytes (None = don't)
+        self.statuses = list(statuses)  # answer the next requests with these error codes
+        self.requests = []  # (Range, If-None-Match, If-Range) of every request, for checks
+        self._lock = threading.Lock()
+
+    def record(self, headers):
+        with self._lock:
+            self.requests.append((headers.get("Range"), headers.get("If-None-Match"), headers.get("If-Range")))
+
+    def take_status(self):
+        with self._lock:
+            return self.statuses.pop(0) if self.statuses else None
+
+    def take_cut(self):
+        with self._lock:
+            return self.cut_after_bytes.pop(0) if self.cut_after_bytes else None
+
+
+# ✅ Function: Start the Server in a Background Thread (port=0 picks a free port)
+def start_server(directory, host="127.0.0.1", port=0, faults=None):
+    handler = functools.partial(ModelRequestHandler, directory=os.path.abspath(directory), faults=faults)
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, base_url
+
+
+if __name__ == "__main__":
+    # Usage: python local_model_server.py <models dir> [port] [throttle bytes/s]
+    #        BIRD_MODEL_BASE_URL=http://127.0.0.1:8765 python presence.py
+    models_dir = sys.argv[1] if len(sys.argv) > 1 else "."
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    throttle = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    server, base_url = start_server(models_dir, port=port, faults=Faults(bytes_per_second=throttle))
+    print(f"📡 Serving {models_dir} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
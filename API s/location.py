@@ -1,80 +1,29 @@
 from flask import Flask, request, jsonify
-import joblib
-import pandas as pd
-import numpy as np
-import re
-import datetime
-from difflib import get_close_matches
-import requests
-import io
 from flask_cors import CORS
 import logging
 
+import batch
+import lazy_imports
+import feature_assembler
+import fuzzy_resolver
+import location_index
+import micro_batch
+import query_tokenizer
+import request_schema
+import response_cache
+import single_flight
+import thread_policy
+from label_registry import UnknownLabelError
+from vocabulary import valid_bird_names, bird_aliases
+
+np = lazy_imports.lazy_import("numpy")
+
 app = Flask(__name__)
 CORS(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load trained model from GitHub
-# MODEL_URL = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/location_prediction_model.pkl"
-# response = requests.get(MODEL_URL)
-# response.raise_for_status()
-# model_data = joblib.load(io.BytesIO(response.content))
-
-# location_model = model_data['location_model']
-# selected_features = model_data['selected_features']
-# label_encoders = model_data['label_encoders']
-
-
-import requests
-import joblib
-import io
-import os
-
-# ✅ Model URL
-MODEL_URL = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/location_prediction_model.pkl"
-
-# ✅ Define a local model path
-MODEL_PATH = "location_prediction_model.pkl"
-
-# ✅ Function: Download Large Model in Chunks
-def download_model(url, save_path, chunk_size=1024 * 1024):  # 1MB chunks
-    if os.path.exists(save_path):  # ✅ Skip download if file exists
-        print(f"📁 Using cached model: {save_path}")
-        return save_path
-
-    print("📥 Downloading model. Please wait...")
-    
-    with requests.get(url, stream=True) as response:
-        response.raise_for_status()  # ✅ Check for errors
-        total_size = int(response.headers.get("content-length", 0))  # ✅ Get file size
-        downloaded = 0
-        
-        with open(save_path, "wb") as file:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    file.write(chunk)
-                    downloaded += len(chunk)
-                    print(f"🔄 Downloaded: {downloaded / total_size:.2%}", end="\r")  # ✅ Show progress
-
-    print("\n✅ Model downloaded successfully.")
-    return save_path
-
-# ✅ Download model if not cached
-model_file_path = download_model(MODEL_URL, MODEL_PATH)
-
-# ✅ Load Model
-with open(model_file_path, "rb") as model_file:
-    model_data = joblib.load(model_file)
-
-location_model = model_data['location_model']
-selected_features = model_data['selected_features']
-label_encoders = model_data['label_encoders']
-
-print("✅ Model loaded successfully!")
-
-
 # Predefined Latitude & Longitude Values
 predefined_locations = [
     {"LATITUDE": 6.0463438, "LONGITUDE": 80.8541554},
@@ -86,187 +35,166 @@ predefined_locations = [
     {"LATITUDE": 6.1930548, "LONGITUDE": 81.2218203}
 ]
 
-# Bird Name Handling
-bird_aliases = {
-    "blue tailed bird": "Blue-tailed Bee-eater",
-    "blue bird": "Blue-tailed Bee-eater",
-    "bee eater": "Blue-tailed Bee-eater",
-    "red bird": "Red-vented Bulbul",
-    "bulbul": "Red-vented Bulbul",
-    "white bird": "White-throated Kingfisher",
-    "kingfisher": "White-throated Kingfisher"
-}
+# ✅ Each (latitude, longitude) only once, in first-seen order
+candidate_points = list(dict.fromkeys((loc["LATITUDE"], loc["LONGITUDE"]) for loc in predefined_locations))
+candidate_latitudes = [latitude for latitude, _ in candidate_points]
+candidate_longitudes = [longitude for _, longitude in candidate_points]
 
-valid_bird_names = ["Blue-tailed Bee-eater", "Red-vented Bulbul", "White-throated Kingfisher"]
+# ✅ Load Model in the Background (the app serves /healthz and /readyz while it loads).
+# The offline location index for this model version and these points is attached on every load.
+import model_loader
+
+MODEL_NAME = "location_prediction_model.pkl"
+
+model = model_loader.BackgroundModel(
+    MODEL_NAME, prepare=lambda data, version: location_index.attach(data, version, candidate_points)).start()
+model_loader.register_health_routes(app, model)
+model_loader.register_admin_routes(app, model)
+
+# ✅ Response Caches (the parser reads the clock for the date and the hour, so query entries expire hourly)
+query_cache = response_cache.ResponseCache("location-query")
+feature_cache = response_cache.ResponseCache("location-features")
+flight = single_flight.SingleFlight("location-model")
+response_cache.register_cache_routes(app, query_cache, feature_cache, flight)
+micro_batch.register_stats_route(app)
+thread_policy.register_settings_route(app)
+
+# ✅ Typo-Tolerant Lookup (trigram index over the names and aliases in vocabulary.py)
+bird_resolver = fuzzy_resolver.FuzzyResolver(valid_bird_names, bird_aliases)
 
 def correct_bird_name(name):
-    name = name.lower()
-    if name in bird_aliases:
-        return bird_aliases[name]
-    matches = get_close_matches(name, [b.lower() for b in valid_bird_names], n=1, cutoff=0.3)
-    return next((b for b in valid_bird_names if b.lower() == matches[0]), "Unknown Bird")
-
-def day_name_to_int(day_name):
-    days_map = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
-    }
-    return days_map.get(day_name.lower(), None)
-
-def time_of_day_to_hour(time_str):
-    time_ranges = {"morning": (6, 10), "afternoon": (11, 15), "evening": (16, 19), "night": (20, 23)}
-    return time_ranges.get(time_str.lower(), None)
-
-def parse_approximate_date(expression):
-    today = datetime.date.today()
-    date_mappings = {
-        "tomorrow": today + datetime.timedelta(days=1),
-        "day after tomorrow": today + datetime.timedelta(days=2),
-        "next week": today + datetime.timedelta(weeks=1)
-        
-    }
-    if expression in date_mappings:
-        return date_mappings[expression]
-    match = re.search(r"in (\d+) days", expression)
-    if match:
-        return today + datetime.timedelta(days=int(match.group(1)))
-    return None  
+    return bird_resolver.best(name) or "Unknown Bird"
+
+# ✅ Query Tokenizer (compiled once from the names and aliases in vocabulary.py)
+tokenizer = query_tokenizer.QueryTokenizer(valid_bird_names, bird_aliases)
 
 # Extract query features
 def extract_query_features(query):
-    query = query.lower()
-    today = datetime.date.today()
-    
-    # ✅ Extract Year (Defaults to Current Year)
-    year_match = re.search(r'\b(20[0-9]{2})\b', query)
-    year = int(year_match.group()) if year_match else today.year
-
-    # ✅ Extract Month (Defaults to Current Month)
-    months_map = {m: i+1 for i, m in enumerate([
-        "january", "february", "march", "april", "may", "june", "july", 
-        "august", "september", "october", "november", "december"
-    ])}
-    month_match = re.search(r'\b(' + '|'.join(months_map.keys()) + r')\b', query)
-    month = months_map.get(month_match.group()) if month_match else today.month
-
-    # ✅ Extract Day Name (If Provided)
-    days_map = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
+    tokens = tokenizer.tokenize(query)
+    return {
+        **query_tokenizer.date_time_features(tokens),
+        # Nothing spelled exactly: the closest name misspelled in the query, if one is close enough
+        "bird_name": query_tokenizer.best(tokens, "bird") or bird_resolver.best_in(query) or "Unknown Bird",
     }
-    day_name_match = re.search(r"\b(" + "|".join(days_map.keys()) + r")\b", query)
-    day_name = day_name_match.group().capitalize() if day_name_match else None
-
-    # ✅ Extract Approximate Date (e.g., "tomorrow", "next week")
-    approximate_date_match = re.search(r"(tomorrow|next week|day after tomorrow|in \d+ days)", query)
-    if approximate_date_match:
-        parsed_date = parse_approximate_date(approximate_date_match.group())
-        if parsed_date:
-            year, month, day = parsed_date.year, parsed_date.month, parsed_date.day
-        else:
-            day = today.day
+
+# ✅ Function: Predict Every Candidate Point of Every Query in One Call, Ranked by Probability
+def rank_locations_batch(location_model, label_registry, selected_features, queries, micro_batched=False):
+    """queries: [(features, bird_name_encoded), ...] -> one ranked [(locality, probability)] per query.
+    micro_batched: send the rows through the "location_model" queue (single requests)."""
+    n_queries, n_points = len(queries), len(candidate_points)
+
+    def per_query(values):
+        return np.repeat(values, n_points)
+
+    input_data = feature_assembler.for_features(selected_features).assemble({
+        "Year": per_query([features["year"] for features, _ in queries]),
+        "Month": per_query([features["month"] for features, _ in queries]),
+        "Day_of_Week": per_query([features["day_of_week"] for features, _ in queries]),
+        "Hour": per_query([features["hour"] for features, _ in queries]),
+        "LATITUDE": np.tile(candidate_latitudes, n_queries), "OBSERVATION": 1,
+        "LONGITUDE": np.tile(candidate_longitudes, n_queries),
+        "COMMON NAME_ENCODED": per_query([bird_name_encoded for _, bird_name_encoded in queries]),
+    }, rows=n_queries * n_points)
+
+    # predict() is the argmax of predict_proba, so one predict_proba call gives both
+    if micro_batched:
+        probabilities = micro_batch.submit("location_model", "predict_proba", location_model, input_data).result()
     else:
-        # ✅ Extract Specific Day (If Mentioned)
-            # ✅ Extract Specific Day (If Mentioned)
-        day_match = re.search(r"\b([1-9]|[12][0-9]|3[01])\b", query)
-        day = int(day_match.group()) if day_match else None
-
-        # ✅ If a Day Name (Friday, etc.) Exists, Align with the Correct Date
-    if day_name:
-        current_date = datetime.date(year, month, 1)  # Start from the 1st of the month
-        while current_date.weekday() != days_map[day_name.lower()]:
-            current_date += datetime.timedelta(days=1)  # Move to the next day
-            day = current_date.day  # ✅ Assign the correct day based on the weekday name
-
-        # ✅ If no specific day is found, default to today’s date
-            # ✅ If no specific day is found, default to TODAY’s date
-    if day is None:
-        today = datetime.date.today()  # ✅ Get today’s date
-        if month == today.month and year == today.year:
-            day = today.day  # ✅ Keep today's actual date
-        else:
-            # ✅ If the user entered a different month/year, use today’s day but in that month/year
-            try:
-                day = min(today.day, (datetime.date(year, month, 1) + datetime.timedelta(days=31)).day)
-            except ValueError:
-                day = 1  # ✅ Handle invalid cases (e.g., February 30)
+        probabilities = feature_assembler.predict_proba_distinct(location_model, input_data)
+    best = probabilities.argmax(axis=1)
+    best_probability = probabilities[range(len(best)), best]
+    predicted_localities = label_registry['LOCALITY'].decode_many(location_model.classes_[best])
 
-    # ✅ Get Correct Day Name
-    day_of_week = datetime.date(year, month, day).weekday()
-    day_name = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][day_of_week]
+    ranked_per_query = []
+    for start in range(0, n_queries * n_points, n_points):
+        ranked = {}
+        for locality, probability in zip(predicted_localities[start:start + n_points],
+                                         best_probability[start:start + n_points]):
+            ranked[locality] = max(ranked.get(locality, 0.0), float(probability))
+        ranked_per_query.append(sorted(ranked.items(), key=lambda item: -item[1]))
+    return ranked_per_query
 
 
+def rank_locations(location_model, label_registry, selected_features, features, bird_name_encoded):
+    return rank_locations_batch(location_model, label_registry, selected_features,
+                                [(features, bird_name_encoded)], micro_batched=True)[0]
 
-    # ✅ Convert to Day of the Week (Numeric)
-    if day:
-        day_of_week = datetime.date(year, month, day).weekday()
-    else:
-        day_of_week = today.weekday()
-        day_name = today.strftime("%A")  # Default to today’s name if missing
-
-    current_hour = datetime.datetime.now().hour 
-
-    time_match = re.search(r'\b([0-9]{1,2}):?([0-9]{2})?\s?(a\.?m\.?|p\.?m\.?|am|pm)?\b', query)
-    if time_match:
-        hour = int(time_match.group(1))
-        period = time_match.group(3)  # AM/PM format
-        if period:
-            period = period.replace(".", "").lower()  # Normalize "a.m." -> "am"
-            if period == "pm" and hour < 12:
-                hour += 12
-            elif period == "am" and hour == 12:
-                hour = 0  # Midnight case
-    else:
-        time_match = re.search(r'\b(morning|afternoon|evening|night)\b', query)
-        hour_range = time_of_day_to_hour(time_match.group()) if time_match else None
-        hour = hour_range[0] if hour_range else current_hour  # Default to system hour if missing
-
-    # ✅ Determine Time of Day
-    if 6 <= hour <= 10:
-        time_of_day = "morning"
-    elif 11 <= hour <= 15:
-        time_of_day = "afternoon"
-    elif 16 <= hour <= 19:
-        time_of_day = "evening"
-    elif 20 <= hour <= 23 or hour == 0:
-        time_of_day = "night"
-    else:
-        time_of_day = "unspecified"
-        
-    bird_name = None
-    for bird in valid_bird_names:
-        if bird.lower() in query:
-            bird_name = bird
-            break
-    
-    # ✅ Handle Bird Aliases (blue bird -> Blue-tailed Bee-eater)
-    if not bird_name:
-        for alias, correct_name in bird_aliases.items():
-            if alias in query:
-                bird_name = correct_name
-                break
-            
+
+def indexed_locations(index, features, bird_name_encoded):
+    """The precomputed ranking, or None when there is no index or the key is outside it."""
+    if index is None:
+        return None
+    return index.lookup(bird_name_encoded, features["year"], features["month"],
+                        features["day_of_week"], features["hour"])
+
+
+# ✅ Function: Response Body for One Query
+def location_response(features, ranked_locations):
+    unique_locations = [locality for locality, _ in ranked_locations]
     return {
-        "year": year,
-        "month": month,
-        "day_of_week": day_of_week,  # ✅ Still keeping the number
-        "day_name": day_name,  # ✅ Now storing the actual day name
-        "hour": hour,
-        "time_of_day": time_of_day,
-        
-        "bird_name": bird_name if bird_name else "Unknown Bird"
+        "Response for you": f"The {features['bird_name']} can be seen "
+                            f"on {features['day_name']}, {features['month']}/{features['year']} "
+                            f"in the {features['time_of_day']} at these locations in Hambanthota District: "
+                            f"{', '.join(unique_locations)}.",
+        "locations": [
+            {"locality": locality, "probability": round(probability, 4)}
+            for locality, probability in ranked_locations
+        ],
     }
 
+
+# ✅ Function: Index Lookup or Model Ranking -> Response Body
+def locations_prediction(model_data, features, bird_name_encoded):
+    # ✅ Read the Offline Index; the Model Ranks Anything It Doesn't Cover
+    ranked_locations = indexed_locations(model_data.get('location_index'), features, bird_name_encoded)
+    if ranked_locations is None:
+        ranked_locations = rank_locations(model_data['location_model'], model_data['label_registry'],
+                                          model_data['selected_features'], features, bird_name_encoded)
+    return location_response(features, ranked_locations)
+
+
+# ✅ Function: Feature Cache, Else One Model Call Shared by Identical Concurrent Requests
+def cached_locations_prediction(model_data, features):
+    # ✅ Other Phrasings of the Same Features Share One Entry
+    feature_key = (model_data['model_version'], response_cache.canonical(features))
+    response = feature_cache.get(feature_key)
+    if response is not None:
+        return response
+
+    bird_name_encoded = model_data['label_registry'].encode('COMMON NAME', features["bird_name"])
+
+    # ✅ The Leader Fills the Feature Cache
+    return flight.do(feature_key, lambda: feature_cache.put(
+        feature_key, locations_prediction(model_data, features, bird_name_encoded)))
+
+
 # API Endpoint for Birdwatching Prediction
 @app.route('/predict_location', methods=['POST'])
+@model_loader.require_model(model)
 def predict_best_locations():
     
     try:
+        model_data = model.get()
+
         data = request.get_json()
         query = data.get("query", "").strip()
         logger.info(f"🔍 Received Query: {query}")
-        
-        features = extract_query_features(query)
+
+        if "features" in data:
+            # ✅ Features Parsed Upstream (structured_request.py) -> No Query Parsing Here
+            query_key = None
+            try:
+                features = batch.structured_features(data["features"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            # ✅ Same Query Text Since the Last Full Hour -> Cached Response
+            query_key = (model_data['model_version'], query.lower())
+            response = query_cache.get(query_key)
+            if response is not None:
+                return jsonify(response), 200
+
+            features = extract_query_features(query)
         
         if features["bird_name"] == "Unknown Bird":
                 return jsonify({
@@ -274,36 +202,96 @@ def predict_best_locations():
                     "valid_bird_names": valid_bird_names
                 })
         
-        bird_name_encoded = label_encoders['COMMON NAME'].transform([features["bird_name"]])[0]
-        
-        results = []
-        
-        for location in predefined_locations:
-            
-            input_data = pd.DataFrame([[features["year"], features["month"], features["day_of_week"],
-                                        features["hour"], location["LATITUDE"], 1, location["LONGITUDE"],
-                                        bird_name_encoded]],
-                                    columns=selected_features)
-            
-            predicted_location_encoded = location_model.predict(input_data)[0]
-            predicted_location = label_encoders['LOCALITY'].inverse_transform([predicted_location_encoded])[0]
-            results.append(predicted_location)
-        
-        unique_locations = list(set(results))
-        
-    
-        response = {
-                "Response for you": f"The {features['bird_name']} can be seen "
-               f"on {features['day_name']}, {features['month']}/{features['year']} "
-               f"in the {features['time_of_day']} at these locations in Hambanthota District: {', '.join(unique_locations)}."
-                }
-        
+        response = cached_locations_prediction(model_data, features)
+        if query_key:
+            query_cache.put(query_key, response, expires_at=response_cache.next_hour())
+
         return jsonify(response), 200
     
+    except UnknownLabelError as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify(e.to_dict()), 400
+
     except Exception as e:
         logger.error(f"❌ Error in Prediction: {e}")
         return jsonify({"error": "Prediction error occurred"}), 500
 
 
+# ✅ Form Schema (typed fields, compiled once; see request_schema.py)
+fields_schema = request_schema.form_schema(valid_bird_names)
+
+
+# ✅ API Route: Field Types and Choices (the form fills its inputs from these)
+@app.route('/predict_location/fields', methods=['GET'])
+def location_fields_schema():
+    return jsonify(fields_schema.describe()), 200
+
+
+# ✅ API Route: Locations from Typed Fields (the web form; no query parsing)
+@app.route('/predict_location/fields', methods=['POST'])
+@model_loader.require_model(model)
+def predict_best_locations_fields():
+    try:
+        features = request_schema.to_features(fields_schema.validate(request.get_json(silent=True)))
+        return jsonify(cached_locations_prediction(model.get(), features)), 200
+
+    except (request_schema.SchemaError, UnknownLabelError) as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify(e.to_dict()), 400
+
+    except Exception as e:
+        logger.error(f"❌ Error in Prediction: {e}")
+        return jsonify({"error": "Prediction error occurred"}), 500
+
+
+# ✅ Function: Check & Encode One Batch Item (a query string or a feature object)
+def prepare_location_item(item, label_registry):
+    if isinstance(item, str):
+        if not item.strip():
+            raise ValueError("No query provided")
+        features = extract_query_features(item.strip())
+    else:
+        features = batch.structured_features(item)
+    if features["bird_name"] == "Unknown Bird":
+        raise ValueError("The query you entered didn't contain a bird species.")
+    return features, (features, label_registry.encode('COMMON NAME', features["bird_name"]))
+
+
+# API Endpoint for Batches: every candidate point of every item in one predict_proba call
+@app.route('/predict_location/batch', methods=['POST'])
+@model_loader.require_model(model)
+def predict_best_locations_batch():
+    try:
+        model_data = model.get()
+        location_model = model_data['location_model']
+        selected_features = model_data['selected_features']
+        label_registry = model_data['label_registry']
+
+        items = batch.read_items(request.get_json(silent=True))
+        logger.info(f"🔍 Received Batch of {len(items)} Items")
+
+        index = model_data.get('location_index')
+
+        def predict_rows(queries):
+            ranked = [indexed_locations(index, features, bird_name_encoded) for features, bird_name_encoded in queries]
+            missing = [i for i, locations in enumerate(ranked) if locations is None]
+            if missing:
+                computed = rank_locations_batch(location_model, label_registry, selected_features,
+                                                [queries[i] for i in missing])
+                for i, locations in zip(missing, computed):
+                    ranked[i] = locations
+            return ranked
+
+        return jsonify(batch.run(items, lambda item: prepare_location_item(item, label_registry),
+                                 predict_rows, location_response)), 200
+
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+        logger.error(f"❌ Error in Batch Prediction: {e}")
+        return jsonify({"error": "Prediction error occurred"}), 500
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5001, debug=True)
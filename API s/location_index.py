@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import contextlib
+import importlib.util
+
+import lazy_imports
+import model_store
+
+np = lazy_imports.lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# ✅ /predict_location only depends on (bird, year, month, day_of_week, hour), so the ranked
+# localities can be computed offline. The index is a table sorted by packed key:
+#   key          uint32  ((((bird * years + year) * 12 + month) * 7 + day_of_week) * 24 + hour
+#   code         int16[k]  LOCALITY codes, best first (-1 = unused slot)
+#   probability  float64[k]
+# It is stored under the model version's sha256 and also records a digest of the candidate
+# points, so a new model or a changed point list never serves a stale ranking.
+
+MODEL_NAME = "location_prediction_model.pkl"
+TOP_K = 5
+CHUNK_KEYS = 2000
+
+
+def index_paths(version):
+    base = os.path.join(model_store.STORE_DIR, "indexes", f"{version}.location")
+    return f"{base}.npy", f"{base}.json"
+
+
+def points_digest(points):
+    return hashlib.sha256(json.dumps([list(point) for point in points]).encode()).hexdigest()
+
+
+def _pack(bird, year, month, day_of_week, hour, first_year, n_years):
+    return (((bird * n_years + (year - first_year)) * 12 + (month - 1)) * 7 + day_of_week) * 24 + hour
+
+
+def _table_dtype(k):
+    return np.dtype([("key", "<u4"), ("code", "<i2", (k,)), ("probability", "<f8", (k,))])
+
+
+# ✅ Function: Rank Every Key with the Service's Own rank_locations_batch (so answers match exactly)
+def build_index(model_data, rank_batch, path, years, top_k=TOP_K):
+    """rank_batch(queries) -> [[(locality, probability), ...], ...] as in location.rank_locations_batch."""
+    first_year, last_year = years
+    n_years = last_year - first_year + 1
+    registry = model_data["label_registry"]
+    birds = registry["COMMON NAME"].labels
+    localities = registry["LOCALITY"]
+
+    keys = [
+        (bird, year, month, day_of_week, hour)
+        for bird in range(len(birds))
+        for year in range(first_year, last_year + 1)
+        for month in range(1, 13)
+        for day_of_week in range(7)
+        for hour in range(24)
+    ]
+    table = np.zeros(len(keys), dtype=_table_dtype(top_k))
+    table["code"] = -1
+
+    start = time.perf_counter()
+    for chunk_start in range(0, len(keys), CHUNK_KEYS):
+        chunk = keys[chunk_start:chunk_start + CHUNK_KEYS]
+        queries = [
+            ({"year": year, "month": month, "day_of_week": day_of_week, "hour": hour}, bird)
+            for bird, year, month, day_of_week, hour in chunk
+        ]
+        for row, (key, ranked) in enumerate(zip(chunk, rank_batch(queries)), start=chunk_start):
+            table["key"][row] = _pack(*key, first_year, n_years)
+            ranked = ranked[:top_k]
+            table["code"][row, :len(ranked)] = [localities.encode(locality) for locality, _ in ranked]
+            table["probability"][row, :len(ranked)] = [probability for _, probability in ranked]
+        logger.info(f"🗂️ Location index {chunk_start + len(chunk)}/{len(keys)} keys")
+    table.sort(order="key")
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    try:
+        np.save(tmp_path, table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    return {
+        "first_year": first_year, "last_year": last_year, "birds": birds, "top_k": top_k,
+        "keys": len(keys), "build_s": round(time.perf_counter() - start, 2), "size_bytes": os.path.getsize(path),
+    }
+
+
+class LocationIndex:
+    """Memory-mapped sorted table; lookup() returns the ranked localities or None (use the model)."""
+
+    def __init__(self, path, meta, localities):
+        self.meta = meta
+        self.table = np.load(path, mmap_mode="r")
+        self.keys = self.table["key"]
+        self.first_year = meta["first_year"]
+        self.n_years = meta["last_year"] - meta["first_year"] + 1
+        self.n_birds = len(meta["birds"])
+        self.localities = localities
+
+    def lookup(self, bird_name_encoded, year, month, day_of_week, hour):
+        if not (0 <= bird_name_encoded < self.n_birds and 0 <= year - self.first_year < self.n_years
+                and 1 <= month <= 12 and 0 <= day_of_week <= 6 and 0 <= hour <= 23):
+            return None
+        key = _pack(bird_name_encoded, year, month, day_of_week, hour, self.first_year, self.n_years)
+        row = int(np.searchsorted(self.keys, key))
+        if row == len(self.keys) or self.keys[row] != key:
+            return None
+        entry = self.table[row]
+        return [
+            (self.localities.decode(int(code)), float(probability))
+            for code, probability in zip(entry["code"], entry["probability"]) if code >= 0
+        ]
+
+
+# ✅ Function: Load the Index for This Model Version, if It Is Still Valid for These Points
+def load_index(model_data, version, points):
+    path, meta_path = index_paths(version)
+    if not version or not os.path.exists(path):
+        return None
+    with open(meta_path) as file:
+        meta = json.load(file)
+    if meta.get("model_sha256") != version or meta.get("points_sha256") != points_digest(points):
+        logger.warning(f"⚠️ Ignoring stale location index {os.path.basename(path)}")
+        return None
+    if meta["birds"] != model_data["label_registry"]["COMMON NAME"].labels:
+        logger.warning(f"⚠️ Ignoring location index {os.path.basename(path)}: bird labels changed")
+        return None
+    logger.info(f"🗂️ Using location index {os.path.basename(path)} ({meta['first_year']}-{meta['last_year']})")
+    return LocationIndex(path, meta, model_data["label_registry"]["LOCALITY"])
+
+
+# ✅ Function: Hook for BackgroundModel — attach the matching index to a freshly loaded bundle
+def attach(model_data, version, points):
+    model_data["location_index"] = load_index(model_data, version, points)
+    return model_data
+
+
+# ✅ Function: Build the Index from the Location Service's Current Model and Candidate Points
+def build_for_service(years, service=None):
+    if service is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "location.py")
+        spec = importlib.util.spec_from_file_location("location_service", path)
+        service = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(service)
+    while not service.model.ready:
+        if service.model.status()["state"] == "failed":
+            raise RuntimeError(service.model.status()["last_error"])
+        time.sleep(0.05)
+
+    version = service.model.status()["version"]
+    model_data = service.model.get()
+    index_path, meta_path = index_paths(version)
+
+    def rank_batch(queries):
+        return service.rank_locations_batch(model_data["location_model"], model_data["label_registry"],
+                                            model_data["selected_features"], queries)
+
+    meta = build_index(model_data, rank_batch, index_path, years)
+    meta.update({
+        "model": MODEL_NAME, "model_sha256": version,
+        "points_sha256": points_digest(service.candidate_points), "built_at": time.time(),
+    })
+    model_store._write_json_atomic(meta_path, meta)
+    logger.info(f"✅ Location index built in {meta['build_s']}s ({meta['size_bytes'] / 1e3:.0f}kB): {index_path}")
+    return index_path, meta
+
+
+if __name__ == "__main__":
+    # Usage: python location_index.py <first year> <last year>
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) != 3:
+        print("Usage: python location_index.py <first year> <last year>")
+        sys.exit(1)
+    _, index_meta = build_for_service((int(sys.argv[1]), int(sys.argv[2])))
+    print(json.dumps(index_meta, indent=2))
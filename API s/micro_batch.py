@@ -0,0 +1,180 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+from flask import jsonify
+
+import lazy_imports
+import feature_assembler
+
+np = lazy_imports.lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# ✅ Opt-in micro-batching: under a threaded server every request thread would call the model on its
+# own row. With BIRD_MICRO_BATCH=1 the rows go to one queue per model ("rf_final", "location_model",
+# "month_model", "hour_model", or "time_model" for the fused month+hour model). A worker collects
+# them for up to BIRD_MICRO_BATCH_WAIT_MS or BIRD_MICRO_BATCH_MAX_ROWS rows, runs one model call and
+# hands every thread its own rows back.
+# Tree models score rows independently, so the answers are the same as with one call per request.
+
+ENABLED = os.environ.get("BIRD_MICRO_BATCH", "0") == "1"
+MAX_WAIT_MS = float(os.environ.get("BIRD_MICRO_BATCH_WAIT_MS", "2"))
+MAX_ROWS = int(os.environ.get("BIRD_MICRO_BATCH_MAX_ROWS", "64"))
+
+METHODS = {
+    "predict_proba": feature_assembler.predict_proba_distinct,
+    "predict": feature_assembler.predict_distinct,
+}
+
+
+class _Item:
+    __slots__ = ("estimator", "X", "future")
+
+    def __init__(self, estimator, X):
+        self.estimator = estimator
+        self.X = X
+        self.future = Future()
+
+
+class MicroBatcher:
+    """One queue + worker thread for one model role and method."""
+
+    def __init__(self, name, method, max_rows=None, max_wait_ms=None):
+        self.name = name
+        self.method = method
+        self.max_rows = max_rows or MAX_ROWS
+        self.max_wait = (MAX_WAIT_MS if max_wait_ms is None else max_wait_ms) / 1000
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"requests": 0, "rows": 0, "batches": 0, "max_batch_rows": 0}
+        self._thread = threading.Thread(target=self._loop, name=f"micro-batch-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, estimator, X):
+        """A Future for the rows, or None once stop() was called (nothing is queued then)."""
+        item = _Item(estimator, X)
+        with self._lock:
+            if self._closed:
+                return None
+            self._queue.put(item)
+        return item.future
+
+    def stop(self):
+        """Rows already queued are still answered (they are all ahead of the stop marker); later
+        submits are refused."""
+        with self._lock:
+            self._closed = True
+            self._queue.put(None)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        items, rows = [first], len(first.X)
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_rows:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Finish this batch, stop on the next round
+                break
+            items.append(item)
+            rows += len(item.X)
+        return items
+
+    def _loop(self):
+        predict = METHODS[self.method]
+        while True:
+            items = self._collect()
+            if items is None:
+                return
+            # Requests that raced a hot reload can hold different estimators: one call per estimator
+            groups = {}
+            for item in items:
+                groups.setdefault(id(item.estimator), []).append(item)
+            for group in groups.values():
+                try:
+                    X = group[0].X if len(group) == 1 else np.concatenate([item.X for item in group])
+                    output = predict(group[0].estimator, X)
+                except Exception as e:
+                    for item in group:
+                        item.future.set_exception(e)
+                    continue
+                start = 0
+                for item in group:
+                    item.future.set_result(output[start:start + len(item.X)])
+                    start += len(item.X)
+            with self._lock:
+                rows = sum(len(item.X) for item in items)
+                self._stats["requests"] += len(items)
+                self._stats["rows"] += rows
+                self._stats["batches"] += 1
+                self._stats["max_batch_rows"] = max(self._stats["max_batch_rows"], rows)
+
+    def stats(self):
+        with self._lock:
+            stats = {"queue": self.name, "method": self.method, "max_rows": self.max_rows,
+                     "max_wait_ms": self.max_wait * 1000, **self._stats}
+        stats["mean_batch_rows"] = round(stats["rows"] / stats["batches"], 2) if stats["batches"] else None
+        return stats
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def _batcher(name, method):
+    with _batchers_lock:
+        batcher = _batchers.get((name, method))
+        if batcher is None:
+            batcher = _batchers[(name, method)] = MicroBatcher(name, method)
+        return batcher
+
+
+# ✅ Function: Queue Rows for a Model (a Future; computed right away when micro-batching is off)
+def submit(name, method, estimator, X):
+    """name: the model's queue ("rf_final", ...); method: "predict_proba" or "predict"."""
+    while ENABLED:
+        future = _batcher(name, method).submit(estimator, X)
+        if future is not None:
+            return future
+        # configure() stopped that queue between the lookup and the put: take its replacement
+    future = Future()
+    future.set_result(getattr(feature_assembler, method)(estimator, X))
+    return future
+
+
+# ✅ Function: Switch Micro-Batching On/Off or Change Its Limits (running workers answer what they
+# have queued, then exit; new rows go to fresh workers)
+def configure(enabled=None, max_wait_ms=None, max_rows=None):
+    global ENABLED, MAX_WAIT_MS, MAX_ROWS
+    with _batchers_lock:
+        ENABLED = ENABLED if enabled is None else enabled
+        MAX_WAIT_MS = MAX_WAIT_MS if max_wait_ms is None else max_wait_ms
+        MAX_ROWS = MAX_ROWS if max_rows is None else max_rows
+        for batcher in _batchers.values():
+            batcher.stop()
+        _batchers.clear()
+
+
+def stats():
+    with _batchers_lock:
+        batchers = list(_batchers.values())
+    return {"enabled": ENABLED, "queues": [batcher.stats() for batcher in batchers]}
+
+
+# ✅ Function: Add /batching/stats (requests, rows and batch sizes per model queue)
+def register_stats_route(app):
+    @app.route("/batching/stats", methods=["GET"])
+    def batching_stats():
+        return jsonify(stats()), 200
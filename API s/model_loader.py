@@ -0,0 +1,334 @@
+import os
+import time
+import random
+import logging
+import threading
+import functools
+import contextlib
+
+from flask import jsonify, request
+
+import model_store
+import lazy_imports
+import label_registry
+import thread_policy
+
+np = lazy_imports.lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+
+# ✅ Poll the store for a new model version every N seconds (0 = no file watcher)
+WATCH_INTERVAL = float(os.environ.get("BIRD_MODEL_WATCH", "0"))
+
+# ✅ Admin routes need this token in X-Admin-Token; without one they only answer localhost
+ADMIN_TOKEN = os.environ.get("BIRD_ADMIN_TOKEN")
+
+WARMUP_ROWS = (1, 8)
+
+
+class ModelNotReady(RuntimeError):
+    pass
+
+
+class ReloadInProgress(RuntimeError):
+    pass
+
+
+# ✅ Function: Run a Few Inferences so the First Real Request Doesn't Pay for Lazy Setup
+def warm_up(model_data):
+    import feature_assembler
+
+    features = model_data["selected_features"]
+    for key, estimator in model_data.items():
+        if not hasattr(estimator, "predict"):
+            continue
+        for rows in WARMUP_ROWS:
+            X = np.zeros((rows, len(features)), dtype=np.float32)
+            if hasattr(estimator, "predict_proba"):
+                feature_assembler.predict_proba(estimator, X)
+            else:
+                feature_assembler.predict(estimator, X)
+
+
+class BackgroundModel:
+    """Loads a model bundle from the model store in a background thread, retrying with backoff."""
+
+    def __init__(self, name, max_attempts=None, initial_backoff=1.0, max_backoff=60.0, prepare=None):
+        self.name = name
+        self.prepare = prepare  # Optional prepare(model_data, version) run on every load/reload before serving
+        self.max_attempts = max_attempts  # None = keep retrying
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._data = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._watcher = None
+        self._in_flight = 0
+        self._reloading = False
+        self._metrics = {
+            "requests": 0,
+            "reloads": 0,
+            "failed_reloads": 0,
+            "last_reload": None,
+        }
+        self._status = {
+            "model": name,
+            "state": "starting",
+            "attempts": 0,
+            "last_error": None,
+            "downloaded_bytes": 0,
+            "total_bytes": None,
+            "started_at": time.time(),
+            "ready_at": None,
+            "version": None,
+        }
+
+    # ✅ Start Loading without Blocking the Flask App
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True)
+                self._thread.start()
+        return self
+
+    def _progress(self, downloaded, total):
+        with self._lock:
+            self._status["downloaded_bytes"] = downloaded
+            self._status["total_bytes"] = total
+
+    def _run(self):
+        backoff = self.initial_backoff
+        while True:
+            with self._lock:
+                self._status["state"] = "loading"
+                self._status["attempts"] += 1
+                attempt = self._status["attempts"]
+            try:
+                version = model_store.current_version(self.name)
+                data = model_store.load_model(self.name, progress=self._progress)
+                version = version or model_store.current_version(self.name)
+                data = self._prepare(data, version)
+                warm_up(data)  # Before it is published, as on reload, so no request pays for lazy setup
+            except Exception as e:
+                logger.error(f"❌ Loading {self.name} failed (attempt {attempt}): {e}")
+                with self._lock:
+                    self._status["last_error"] = str(e)
+                    if self.max_attempts is not None and attempt >= self.max_attempts:
+                        self._status["state"] = "failed"
+                        return
+                    self._status["state"] = "retrying"
+                # Exponential backoff with jitter so restarted workers don't retry in lockstep
+                time.sleep(backoff * random.uniform(0.5, 1.5))
+                backoff = min(backoff * 2, self.max_backoff)
+                continue
+
+            with self._lock:
+                self._data = data
+                self._status["state"] = "ready"
+                self._status["last_error"] = None
+                self._status["ready_at"] = time.time()
+                self._status["version"] = version
+            logger.info(f"✅ {self.name} ready after {self._status['ready_at'] - self._status['started_at']:.1f}s")
+            if WATCH_INTERVAL > 0:
+                self.watch(WATCH_INTERVAL)
+            return
+
+    def _prepare(self, data, version):
+        data = label_registry.attach(data)
+        data = thread_policy.attach(data)  # Model-internal thread counts for this process
+        data["model_version"] = version  # Part of every response cache key
+        if self.prepare is not None:
+            data = self.prepare(data, version)
+        return data
+
+    @property
+    def ready(self):
+        return self._data is not None
+
+    def get(self):
+        # Callers keep the returned bundle for the whole request, so a swap never changes
+        # the model under a request that is already running
+        data = self._data
+        if data is None:
+            raise ModelNotReady(f"{self.name} is not loaded yet")
+        with self._lock:
+            self._metrics["requests"] += 1
+            if self._reloading:
+                self._metrics["last_reload"]["requests_during_reload"] += 1
+        return data
+
+    @contextlib.contextmanager
+    def in_flight(self):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    # ✅ Load a New Version Next to the Old One, Warm It, then Swap the Reference
+    def reload(self, refresh=False, source_path=None):
+        """refresh: download the model again; source_path: import a local .pkl first."""
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgress(f"{self.name} is already reloading")
+        try:
+            started = time.perf_counter()
+            with self._lock:
+                self._reloading = True
+                self._metrics["last_reload"] = reload = {
+                    "from_version": self._status["version"],
+                    "to_version": None,
+                    "started_at": time.time(),
+                    "load_s": None,
+                    "warm_s": None,
+                    "swap_latency_ms": None,
+                    "in_flight_at_swap": None,
+                    "requests_during_reload": 0,
+                    "error": None,
+                }
+            try:
+                if source_path:
+                    model_store.import_model(self.name, source_path)
+                elif refresh:
+                    model_store.refresh_model(self.name)
+                version = model_store.current_version(self.name)
+                data = self._prepare(model_store.load_model(self.name), version)
+                loaded = time.perf_counter()
+                warm_up(data)
+                warmed = time.perf_counter()
+            except Exception as e:
+                logger.error(f"❌ Reloading {self.name} failed, still serving the old version: {e}")
+                with self._lock:
+                    self._reloading = False
+                    self._metrics["failed_reloads"] += 1
+                    reload["error"] = str(e)
+                raise
+
+            swap_start = time.perf_counter()
+            with self._lock:
+                self._data = data
+                swap_latency = time.perf_counter() - swap_start
+                self._reloading = False
+                self._status["version"] = version
+                self._status["state"] = "ready"
+                self._metrics["reloads"] += 1
+                reload.update({
+                    "to_version": version,
+                    "load_s": round(loaded - started, 3),
+                    "warm_s": round(warmed - loaded, 3),
+                    "swap_latency_ms": round(swap_latency * 1000, 4),
+                    "in_flight_at_swap": self._in_flight,
+                })
+            logger.info(f"🔄 {self.name} swapped {str(reload['from_version'])[:12]} -> {str(version)[:12]} "
+                        f"(load {reload['load_s']}s, {reload['requests_during_reload']} requests served meanwhile)")
+            return dict(reload)
+        finally:
+            self._reload_lock.release()
+
+    # ✅ File Watcher: Reload when the Store Points at a New Version (e.g. after `model_store.py import`)
+    def watch(self, interval=5.0):
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    version = model_store.current_version(self.name)
+                    if self.ready and version and version != self._status["version"]:
+                        logger.info(f"👀 New version of {self.name} in the store: {version[:12]}")
+                        self.reload()
+                except ReloadInProgress:
+                    pass
+                except Exception as e:
+                    logger.error(f"❌ Model watcher for {self.name}: {e}")
+
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=poll, name=f"watch-{self.name}", daemon=True)
+                self._watcher.start()
+        return self
+
+    def status(self):
+        with self._lock:
+            status = dict(self._status)
+            status["metrics"] = {**self._metrics, "in_flight": self._in_flight}
+            if self._metrics["last_reload"]:
+                status["metrics"]["last_reload"] = dict(self._metrics["last_reload"])
+        status["uptime_s"] = round(time.time() - status["started_at"], 3)
+        return status
+
+
+# ✅ Function: Add /healthz (process is alive) and /readyz (models loaded) Routes
+def register_health_routes(app, *models):
+    @app.route("/healthz", methods=["GET"])
+    def healthz():
+        return jsonify({"status": "ok", "models": [model.status() for model in models]}), 200
+
+    @app.route("/readyz", methods=["GET"])
+    def readyz():
+        ready = all(model.ready for model in models)
+        body = {"ready": ready, "models": [model.status() for model in models]}
+        return jsonify(body), 200 if ready else 503
+
+
+# ✅ Decorator: Return 503 from a Prediction Route until Its Model Is Loaded
+def require_model(*models):
+    def decorator(route):
+        @functools.wraps(route)
+        def wrapper(*args, **kwargs):
+            for model in models:
+                if not model.ready:
+                    status = model.status()
+                    response = jsonify({
+                        "error": "The prediction model is still loading. Please try again shortly.",
+                        "model": status,
+                    })
+                    response.headers["Retry-After"] = "5"
+                    return response, 503
+            with contextlib.ExitStack() as stack:
+                for model in models:
+                    stack.enter_context(model.in_flight())
+                return route(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _admin_allowed():
+    if ADMIN_TOKEN:
+        return request.headers.get("X-Admin-Token") == ADMIN_TOKEN
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+
+# ✅ Function: Add /admin/reload (hot swap without a restart) and /admin/models (metrics) Routes
+def register_admin_routes(app, *models):
+    by_name = {model.name: model for model in models}
+
+    @app.route("/admin/models", methods=["GET"])
+    def admin_models():
+        if not _admin_allowed():
+            return jsonify({"error": "Forbidden"}), 403
+        return jsonify({"models": [model.status() for model in models]}), 200
+
+    @app.route("/admin/reload", methods=["POST"])
+    def admin_reload():
+        if not _admin_allowed():
+            return jsonify({"error": "Forbidden"}), 403
+        data = request.get_json(silent=True) or {}
+        # A path is unpickled as given, so it is never trusted on the localhost check alone (a local
+        # reverse proxy makes every caller localhost): it needs BIRD_ADMIN_TOKEN to be set and sent
+        if data.get("path") is not None and not ADMIN_TOKEN:
+            return jsonify({"error": "Reloading from a path requires BIRD_ADMIN_TOKEN"}), 403
+        name = data.get("model", models[0].name)
+        if name not in by_name:
+            return jsonify({"error": f"Unknown model: {name}", "models": list(by_name)}), 404
+        model = by_name[name]
+        if not model.ready:
+            return jsonify({"error": f"{name} is still loading"}), 409
+        try:
+            reload = model.reload(refresh=bool(data.get("refresh")), source_path=data.get("path"))
+        except ReloadInProgress as e:
+            return jsonify({"error": str(e)}), 409
+        except Exception as e:
+            return jsonify({"error": f"Reload failed, still serving the old version: {e}"}), 500
+        return jsonify({"model": name, "reload": reload}), 200
@@ -0,0 +1,700 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+import functools
+import contextlib
+
+import requests
+
+import lazy_imports
+
+# ✅ joblib (and numpy with it) is only needed once a model is actually loaded
+joblib = lazy_imports.lazy_import("joblib")
+
+try:
+    import fcntl
+except ImportError:  # Windows: atomic renames still keep the store consistent
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ✅ Where the models live on GitHub (override to point at a mirror or a local stand-in server)
+MODEL_BASE_URL = os.environ.get(
+    "BIRD_MODEL_BASE_URL",
+    "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models",
+)
+
+# ✅ One store on local disk shared by every service and every worker process
+STORE_DIR = os.environ.get(
+    "BIRD_MODEL_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "model_store"),
+)
+
+MODEL_NAMES = [
+    "migration_prediction_model.pkl",
+    "location_prediction_model.pkl",
+    "time_prediction_model.pkl",
+]
+
+# ✅ Optional pinned digests, e.g. BIRD_MODEL_SHA256_location_prediction_model.pkl=<hex>
+def pinned_sha256(name):
+    return os.environ.get(f"BIRD_MODEL_SHA256_{name}")
+
+
+def model_url(name):
+    return f"{MODEL_BASE_URL.rstrip('/')}/{name}"
+
+
+def _objects_dir():
+    return os.path.join(STORE_DIR, "objects")
+
+
+def _refs_dir():
+    return os.path.join(STORE_DIR, "refs")
+
+
+def object_path(sha256):
+    return os.path.join(_objects_dir(), sha256[:2], sha256)
+
+
+def _ref_path(name):
+    return os.path.join(_refs_dir(), f"{name}.json")
+
+
+# ✅ Function: Hash a File in Chunks
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ✅ Function: Write JSON Atomically (temp file + rename)
+def _write_json_atomic(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(payload, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+
+def read_ref(name):
+    try:
+        with open(_ref_path(name)) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+# ✅ Cross-process lock so only one worker downloads a given model
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def _store_lock(name):
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(name, threading.Lock())
+    with thread_lock:
+        lock_dir = os.path.join(STORE_DIR, "locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{name}.lock"), "a+") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+# ✅ Already-verified objects in this process (path -> (size, mtime))
+_verified = {}
+
+
+def verify_object(sha256):
+    path = object_path(sha256)
+    if not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    if _verified.get(path) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    if file_sha256(path) != sha256:
+        logger.error(f"❌ Integrity check failed for {path}, discarding it.")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        return False
+    _verified[path] = (stat.st_size, stat.st_mtime_ns)
+    return True
+
+
+DOWNLOAD_RETRIES = int(os.environ.get("BIRD_MODEL_DOWNLOAD_RETRIES", "5"))
+
+# ✅ Large files are split into this many byte ranges fetched in parallel (1 = one stream)
+DOWNLOAD_SEGMENTS = int(os.environ.get("BIRD_MODEL_DOWNLOAD_SEGMENTS", "4"))
+SEGMENT_MIN_BYTES = 16 * 1024 * 1024
+
+_RESUMABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+_RETRY_STATUSES = {429, 500, 502, 503, 504}  # The server is busy or restarting: try again, keeping the partial bytes
+
+
+class _VersionChanged(Exception):
+    """The file on the server changed while we were resuming a partial download."""
+
+
+class _Stopped(Exception):
+    """Another byte range failed, so this one gave up instead of downloading bytes that would be discarded."""
+
+
+def _partial_paths(name):
+    # Stable names (not mkstemp) so an interrupted download can be resumed by the next attempt
+    partial_dir = os.path.join(STORE_DIR, "partial")
+    return os.path.join(partial_dir, f"{name}.part"), os.path.join(partial_dir, f"{name}.part.json")
+
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _discard_partial(name):
+    part_path, _ = _partial_paths(name)
+    for path in glob.glob(glob.escape(part_path) + "*"):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+class _Progress:
+    def __init__(self, callback):
+        self.callback = callback
+        self.done = 0
+        self.total = None
+        self._lock = threading.Lock()
+
+    def reset(self, done, total):
+        with self._lock:
+            self.done, self.total = done, total
+
+    def add(self, count):
+        with self._lock:
+            self.done += count
+            if self.callback:
+                self.callback(self.done, self.total)
+
+
+def _resumable(error):
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in _RETRY_STATUSES
+    return isinstance(error, _RESUMABLE_ERRORS)
+
+
+def _with_retries(name, retries, fn):
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except requests.RequestException as e:
+            if not _resumable(e):
+                raise
+            attempt += 1
+            if attempt > retries:
+                raise
+            logger.warning(f"⚠️ Download of {name} interrupted ({e}), retry {attempt}/{retries}")
+            time.sleep(min(0.5 * 2 ** (attempt - 1), 10))
+
+
+def _write_body(response, path, append, chunk_size, progress, stop=None):
+    with open(path, "ab" if append else "wb") as file:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if stop is not None and stop.is_set():
+                raise _Stopped()
+            if chunk:
+                file.write(chunk)
+                progress.add(len(chunk))
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _range_validator(meta):
+    """If-Range value proving a partial file is still the server's version: a strong ETag, else the
+    Last-Modified date (weak ETags are not allowed in If-Range); None when the server sent neither."""
+    etag = meta.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return meta.get("last_modified")
+
+
+def _download_single(name, url, etag, chunk_size, progress, segments):
+    """One streamed GET (resumed with Range). Returns "not-modified", "done" or the segment plan."""
+    part_path, meta_path = _partial_paths(name)
+    meta = _read_json(meta_path)
+    offset = _size(part_path)
+    if offset and _range_validator(meta) is None:
+        _discard_partial(name)  # Nothing to check the partial bytes against: start again from byte 0
+        offset = 0
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        headers["If-Range"] = _range_validator(meta)
+    elif etag:
+        headers["If-None-Match"] = etag
+
+    logger.info(f"📥 Downloading {name} from {url}" + (f" (resuming at {offset} bytes)" if offset else ""))
+    with requests.get(url, headers=headers, stream=True, timeout=60) as response:
+        if response.status_code == 304:
+            return "not-modified"
+        if response.status_code == 416:
+            _discard_partial(name)
+            raise requests.exceptions.ChunkedEncodingError("Stale partial download discarded")
+        response.raise_for_status()
+        length = int(response.headers.get("content-length", 0)) or None
+        server_etag = response.headers.get("ETag")
+        validators = {"etag": server_etag, "last_modified": response.headers.get("Last-Modified")}
+
+        if (not offset and segments > 1 and _range_validator(validators) and length and length >= SEGMENT_MIN_BYTES
+                and response.headers.get("Accept-Ranges") == "bytes"):
+            step = -(-length // segments)
+            plan = {"url": url, **validators, "size": length,
+                    "segments": [[start, min(start + step, length) - 1] for start in range(0, length, step)]}
+            _write_json_atomic(meta_path, plan)
+            return plan
+
+        resumed = response.status_code == 206 and response.headers.get(
+            "Content-Range", "").startswith(f"bytes {offset}-")
+        if not resumed:
+            offset = 0  # The server sent the whole file (changed version or no Range support)
+        _write_json_atomic(meta_path, {"url": url, **validators})
+        progress.reset(offset, offset + length if length else None)
+        _write_body(response, part_path, resumed, chunk_size, progress)
+    if length and _size(part_path) != offset + length:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"Connection closed at {_size(part_path)} of {offset + length} bytes")
+    return "done"
+
+
+def _download_segment(name, plan, index, chunk_size, progress, stop):
+    part_path, _ = _partial_paths(name)
+    path = f"{part_path}.{index}"
+    start, end = plan["segments"][index]
+    offset = start + _size(path)
+    if offset > end:
+        return
+    if stop.is_set():
+        raise _Stopped()
+    headers = {"Range": f"bytes={offset}-{end}", "If-Range": _range_validator(plan)}
+    with requests.get(plan["url"], headers=headers, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        if response.status_code != 206 or not response.headers.get("Content-Range", "").startswith(
+                f"bytes {offset}-"):
+            raise _VersionChanged(f"{name} changed on the server during the download")
+        _write_body(response, path, True, chunk_size, progress, stop)
+    if _size(path) != end - start + 1:
+        raise requests.exceptions.ChunkedEncodingError(
+            f"Segment {index} closed at {_size(path)} of {end - start + 1} bytes")
+
+
+def _download_segments(name, plan, chunk_size, progress, retries):
+    from concurrent.futures import ThreadPoolExecutor
+
+    part_path, _ = _partial_paths(name)
+    count = len(plan["segments"])
+    progress.reset(sum(_size(f"{part_path}.{i}") for i in range(count)), plan["size"])
+    logger.info(f"📥 Downloading {name} from {plan['url']} in {count} parallel ranges")
+    stop = threading.Event()
+
+    def fetch(index):
+        try:
+            _with_retries(name, retries, functools.partial(_download_segment, name, plan, index, chunk_size,
+                                                           progress, stop))
+        except Exception:
+            stop.set()  # The other ranges stop at their next chunk (a changed version discards them anyway)
+            raise
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        futures = [pool.submit(fetch, i) for i in range(count)]
+    errors = [future.exception() for future in futures if future.exception() is not None]
+    failures = [error for error in errors if not isinstance(error, _Stopped)]
+    if failures:
+        raise next((error for error in failures if isinstance(error, _VersionChanged)), failures[0])
+
+    with open(part_path, "wb") as file:
+        for i in range(count):
+            with open(f"{part_path}.{i}", "rb") as segment:
+                for chunk in iter(lambda: segment.read(1024 * 1024), b""):
+                    file.write(chunk)
+        file.flush()
+        os.fsync(file.fileno())
+    for i in range(count):
+        os.remove(f"{part_path}.{i}")
+
+
+# ✅ Function: Download into the Store (resumable, parallel byte ranges, verified, atomic rename)
+def _download_to_store(name, url, chunk_size=256 * 1024, progress=None, etag=None, retries=None, segments=None):
+    """Returns (sha256, path, etag), or None when `etag` is still current (304 Not Modified)."""
+    retries = DOWNLOAD_RETRIES if retries is None else retries
+    segments = DOWNLOAD_SEGMENTS if segments is None else segments
+    part_path, meta_path = _partial_paths(name)
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+
+    meta = _read_json(meta_path)
+    if meta.get("url") != url or _range_validator(meta) is None:
+        # Only resume bytes we can prove belong to the same file version
+        _discard_partial(name)
+        meta = {}
+
+    tracker = _Progress(progress)
+    try:
+        if not meta.get("segments"):
+            meta = _with_retries(name, retries, lambda: _download_single(
+                name, url, etag, chunk_size, tracker, segments))
+            if meta == "not-modified":
+                logger.info(f"📁 {name} is unchanged on the server")
+                return None
+        if isinstance(meta, dict):
+            _download_segments(name, meta, chunk_size, tracker, retries)
+    except _VersionChanged as e:
+        logger.warning(f"⚠️ {e}, starting over")
+        _discard_partial(name)
+        return _download_to_store(name, url, chunk_size, progress, etag, retries, segments)
+
+    sha256 = file_sha256(part_path)
+    expected = pinned_sha256(name)
+    if expected and expected.lower() != sha256:
+        _discard_partial(name)
+        raise ValueError(f"SHA-256 mismatch for {name}: expected {expected}, got {sha256}")
+
+    server_etag = _read_json(meta_path).get("etag")
+    final_path = object_path(sha256)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(part_path, final_path)
+    _discard_partial(name)
+    return sha256, final_path, server_etag
+
+
+# ✅ Function: Get a Verified Local Path for a Model (no network when already stored)
+def fetch_model(name, url=None, progress=None):
+    url = url or model_url(name)
+
+    ref = read_ref(name)
+    if ref and verify_object(ref["sha256"]):
+        logger.info(f"📁 Using stored model {name} ({ref['sha256'][:12]})")
+        return object_path(ref["sha256"])
+
+    with _store_lock(name):
+        # Another process may have finished the download while we waited for the lock
+        ref = read_ref(name)
+        if ref and verify_object(ref["sha256"]):
+            return object_path(ref["sha256"])
+
+        return _download_and_ref(name, url, progress)
+
+
+def _download_and_ref(name, url, progress=None, etag=None):
+    start = time.perf_counter()
+    result = _download_to_store(name, url, progress=progress, etag=etag)
+    if result is None:
+        return object_path(read_ref(name)["sha256"])
+    sha256, path, etag = result
+    _write_json_atomic(_ref_path(name), {
+        "name": name,
+        "url": url,
+        "sha256": sha256,
+        "etag": etag,
+        "size": os.path.getsize(path),
+        "stored_at": time.time(),
+    })
+    stat = os.stat(path)
+    _verified[path] = (stat.st_size, stat.st_mtime_ns)
+    logger.info(f"✅ Stored {name} as {sha256[:12]} in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+# ✅ Function: Check the Server for a Newer Model (If-None-Match skips the body when unchanged)
+def refresh_model(name, url=None, progress=None):
+    url = url or model_url(name)
+    with _store_lock(name):
+        ref = read_ref(name)
+        etag = ref.get("etag") if ref and ref.get("url") == url and verify_object(ref["sha256"]) else None
+        return _download_and_ref(name, url, progress, etag=etag)
+
+
+# ✅ Function: Fetch Several Models at Once (one thread per model, each with its own lock)
+def fetch_models(names=None, max_workers=None, progress=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    names = names or MODEL_NAMES
+    with ThreadPoolExecutor(max_workers=max_workers or len(names)) as pool:
+        futures = {
+            name: pool.submit(fetch_model, name, None, progress and functools.partial(progress, name))
+            for name in names
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+# ✅ Function: Digest of the Model Version the Store Currently Points At (None if not stored)
+def current_version(name):
+    ref = read_ref(name)
+    return ref["sha256"] if ref else None
+
+
+# ✅ Memory-mapped mode: forests/boosters as raw node arrays shared by all workers
+MMAP_MODE = os.environ.get("BIRD_MODEL_MMAP", "0") == "1"
+
+
+def _flat_dir(sha256):
+    return os.path.join(STORE_DIR, "flat", sha256)
+
+
+# ✅ Function: Export a Stored Model Bundle to the Memory-Mappable Layout
+def export_flat(name, url=None, progress=None):
+    import shutil
+    import flat_forest
+
+    path = fetch_model(name, url, progress)
+    sha256 = read_ref(name)["sha256"]
+    final_dir = _flat_dir(sha256)
+    if os.path.exists(os.path.join(final_dir, "bundle.pkl")):
+        return final_dir
+
+    with _store_lock(name):
+        if os.path.exists(os.path.join(final_dir, "bundle.pkl")):
+            return final_dir
+        with open(path, "rb") as model_file:
+            model_data = joblib.load(model_file)
+
+        os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(final_dir), prefix=f"{sha256}.")
+        try:
+            bundle = {}
+            for key, value in model_data.items():
+                flat = flat_forest.flatten(value)
+                if flat is None:
+                    bundle[key] = value
+                else:
+                    flat_forest.save(flat, tmp_dir, key)
+                    bundle[key] = {"__flat__": key}
+            joblib.dump(bundle, os.path.join(tmp_dir, "bundle.pkl"), compress=0)
+            os.replace(tmp_dir, final_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"✅ Exported {name} to memory-mappable arrays in {final_dir}")
+        return final_dir
+
+
+def _load_flat(name, url=None, progress=None):
+    import flat_forest
+
+    flat_dir = export_flat(name, url, progress)
+    bundle = joblib.load(os.path.join(flat_dir, "bundle.pkl"), mmap_mode="r")
+    for key, value in bundle.items():
+        if isinstance(value, dict) and "__flat__" in value:
+            bundle[key] = flat_forest.load(flat_dir, value["__flat__"], mmap_mode="r")
+    return bundle
+
+
+# ✅ Inference backend: "sklearn" (pickled estimators), "flat" (flat_forest array evaluator) or
+# "onnx" (onnx_forest exports run by onnxruntime on CPU)
+BACKEND = os.environ.get("BIRD_MODEL_BACKEND", "sklearn")
+
+
+# ✅ Function: Swap Every Supported Estimator in a Bundle for Its Flattened Version
+def flatten_bundle(model_data):
+    import flat_forest
+
+    bundle = dict(model_data)
+    for key, value in model_data.items():
+        flat = flat_forest.flatten(value)
+        if flat is not None:
+            bundle[key] = flat
+    return bundle
+
+
+def _onnx_dir(sha256):
+    return os.path.join(STORE_DIR, "onnx", sha256)
+
+
+# ✅ Function: Export a Stored Model Bundle to ONNX (refused if it predicts differently on the CSVs)
+def export_onnx(name, url=None, progress=None):
+    import shutil
+    import onnx_forest
+
+    path = fetch_model(name, url, progress)
+    sha256 = read_ref(name)["sha256"]
+    final_dir = _onnx_dir(sha256)
+    if os.path.exists(os.path.join(final_dir, "bundle.pkl")):
+        return final_dir
+
+    with _store_lock(name):
+        if os.path.exists(os.path.join(final_dir, "bundle.pkl")):
+            return final_dir
+        with open(path, "rb") as model_file:
+            model_data = joblib.load(model_file)
+
+        os.makedirs(os.path.dirname(final_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(final_dir), prefix=f"{sha256}.")
+        try:
+            bundle, exported = {}, {}
+            for key, value in model_data.items():
+                if not onnx_forest.convertible(value):
+                    bundle[key] = value
+                    continue
+                onnx_forest.save(value, tmp_dir, key, model_data["selected_features"])
+                exported[key] = onnx_forest.load(tmp_dir, key)
+                bundle[key] = {"__onnx__": key}
+
+            X = onnx_forest.parity_rows(name, model_data["selected_features"])
+            if X is None:
+                logger.warning(f"⚠️ No training CSV for {name}, exporting to ONNX without a parity check")
+                report = {"rows": 0, "models": {}, "valid": None}
+            else:
+                report = onnx_forest.check_parity(model_data, exported, X)
+            with open(os.path.join(tmp_dir, "parity.json"), "w") as file:
+                json.dump(report, file, indent=2)
+            if report["valid"] is False:
+                raise ValueError(f"ONNX export of {name} predicts differently: {report['models']}")
+
+            joblib.dump(bundle, os.path.join(tmp_dir, "bundle.pkl"), compress=0)
+            os.replace(tmp_dir, final_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"✅ Exported {name} to ONNX in {final_dir} (parity on {report['rows']} rows)")
+        return final_dir
+
+
+def _load_onnx(name, url=None, progress=None):
+    import onnx_forest
+
+    onnx_dir = export_onnx(name, url, progress)
+    bundle = joblib.load(os.path.join(onnx_dir, "bundle.pkl"))
+    for key, value in bundle.items():
+        if isinstance(value, dict) and "__onnx__" in value:
+            bundle[key] = onnx_forest.load(onnx_dir, value["__onnx__"])
+    return bundle
+
+
+# ✅ Artifact format: "pickle" (the .pkl bundles) or "compact" (compact_forest .npz, much smaller)
+MODEL_FORMAT = os.environ.get("BIRD_MODEL_FORMAT", "pickle")
+
+
+def compact_name(name):
+    return name[:-len(".pkl")] + ".npz" if name.endswith(".pkl") else name
+
+
+# ✅ Function: Get the Compact Artifact (published .npz, or converted locally from the pickle)
+def fetch_compact(name, url=None, progress=None):
+    import compact_forest
+
+    npz_name = compact_name(name)
+    pickle_ref = read_ref(name)
+    have_pickle = bool(pickle_ref) and verify_object(pickle_ref["sha256"])
+    ref = read_ref(npz_name)
+    if ref and verify_object(ref["sha256"]):
+        # A locally converted artifact is only valid for the pickle it came from
+        if not have_pickle or ref.get("source_sha256") in (None, pickle_ref["sha256"]):
+            return object_path(ref["sha256"])
+
+    if not have_pickle:
+        try:
+            return fetch_model(npz_name, url and compact_name(url), progress)
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+
+    logger.info(f"🗜️ Converting {name} to the compact format locally")
+    path = fetch_model(name, url, progress)
+    with open(path, "rb") as model_file:
+        model_data = joblib.load(model_file)
+    os.makedirs(STORE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=STORE_DIR, suffix=".npz")
+    os.close(fd)
+    try:
+        compact_forest.save_compact(model_data, tmp_path)
+        return import_model(npz_name, tmp_path, source_sha256=read_ref(name)["sha256"])
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+
+
+# ✅ Function: Load a Model Bundle (dict with the estimator, encoders and features)
+def load_model(name, url=None, mmap=None, progress=None, backend=None, model_format=None):
+    if MMAP_MODE if mmap is None else mmap:
+        return _load_flat(name, url, progress)
+    if (model_format or MODEL_FORMAT) == "compact":
+        import compact_forest
+        return compact_forest.load_compact(fetch_compact(name, url, progress))
+    if (backend or BACKEND) == "onnx":
+        return _load_onnx(name, url, progress)
+    path = fetch_model(name, url, progress)
+    with open(path, "rb") as model_file:
+        model_data = joblib.load(model_file)
+    if (backend or BACKEND) == "flat":
+        model_data = flatten_bundle(model_data)
+    return model_data
+
+
+# ✅ Function: Add a Local File to the Store (e.g. a freshly trained model)
+def import_model(name, source_path, **extra):
+    sha256 = file_sha256(source_path)
+    final_path = object_path(sha256)
+    with _store_lock(name):
+        if not os.path.exists(final_path):
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(final_path), suffix=".part")
+            with os.fdopen(fd, "wb") as dst, open(source_path, "rb") as src:
+                for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, final_path)
+        _write_json_atomic(_ref_path(name), {
+            "name": name,
+            "url": model_url(name),
+            "sha256": sha256,
+            "size": os.path.getsize(final_path),
+            "stored_at": time.time(),
+            **extra,
+        })
+    return final_path
+
+
+if __name__ == "__main__":
+    # Usage: python model_store.py [export-mmap|export-compact|export-onnx|refresh] [model names...]
+    #        python model_store.py import <model name> <path to .pkl>
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    if args[:1] == ["import"]:
+        print(f"{args[1]}: {import_model(args[1], args[2])}")
+        sys.exit(0)
+    commands = {"export-mmap": export_flat, "export-compact": fetch_compact, "export-onnx": export_onnx,
+                "refresh": refresh_model}
+    if not args or args[0] not in commands:
+        for model_name, path in fetch_models(args or None).items():
+            print(f"{model_name}: {path}")
+        sys.exit(0)
+    command = commands[args[0]]
+    for model_name in args[1:] or MODEL_NAMES:
+        print(f"{model_name}: {command(model_name)}")
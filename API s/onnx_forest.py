@@ -0,0 +1,180 @@
+import os
+import copy
+import json
+import logging
+import threading
+
+import numpy as np
+
+import thread_policy
+
+logger = logging.getLogger(__name__)
+
+# ✅ ONNX serving backend (BIRD_MODEL_BACKEND=onnx): every forest / booster in a bundle is exported to
+# one .onnx file (skl2onnx for sklearn, onnxmltools for XGBoost) and run with onnxruntime on CPU.
+# The input is the same float32 row the services assemble from `selected_features`, which is stored
+# next to the models and inside each file's metadata. Forest split thresholds are rounded down to
+# float32 before conversion (as in compact_forest), so `x <= t` makes the same decisions as sklearn.
+
+INPUT_NAME = "features"
+TARGET_OPSET = {"": 15, "ai.onnx.ml": 3}
+
+# ✅ Training CSVs in `Migration model/data` that every export is checked against
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Migration model", "data")
+PARITY_DATA = {
+    "migration_prediction_model.pkl": "migration_data.csv",
+    "location_prediction_model.pkl": "migration_data.csv",
+    "time_prediction_model.pkl": "time_data.csv",
+}
+
+
+def _forests(estimator):
+    if hasattr(estimator, "estimators_") and all(hasattr(e, "tree_") for e in estimator.estimators_):
+        return [estimator]
+    if hasattr(estimator, "estimators_"):  # OneVsRestClassifier over forests
+        return [e for e in estimator.estimators_ if hasattr(e, "estimators_")]
+    return []
+
+
+# ✅ Function: Which Bundle Entries Can Be Served from ONNX
+def convertible(estimator):
+    if hasattr(estimator, "get_booster"):
+        import flat_forest
+        return flat_forest.num_targets(estimator) == 1
+    return bool(_forests(estimator))
+
+
+def _float32_splits(estimator):
+    """Copy of a forest whose float64 thresholds are rounded down to float32 without changing a split."""
+    from compact_forest import _floor_float32
+
+    estimator = copy.deepcopy(estimator)
+    for forest in _forests(estimator):
+        for tree in forest.estimators_:
+            threshold = tree.tree_.threshold  # A view of the tree's node array
+            threshold[:] = _floor_float32(threshold)
+    return estimator
+
+
+# ✅ Function: Convert One Fitted Estimator to an ONNX ModelProto
+def to_onnx(estimator, selected_features):
+    from skl2onnx.common.data_types import FloatTensorType
+
+    initial_types = [(INPUT_NAME, FloatTensorType([None, len(selected_features)]))]
+    if hasattr(estimator, "get_booster"):
+        import onnxmltools
+        model = onnxmltools.convert_xgboost(estimator, initial_types=initial_types, target_opset=TARGET_OPSET[""])
+    else:
+        import skl2onnx
+        estimator = _float32_splits(estimator)
+        model = skl2onnx.convert_sklearn(estimator, initial_types=initial_types, target_opset=TARGET_OPSET,
+                                         options={type(estimator): {"zipmap": False}})
+    entry = model.metadata_props.add()
+    entry.key, entry.value = "selected_features", json.dumps(list(selected_features))
+    return model
+
+
+class OnnxModel:
+    """An exported estimator run by onnxruntime; takes the services' float32 arrays directly."""
+
+    kind = "onnx"
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.meta = meta
+        self.selected_features = meta["selected_features"]
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _session(self, rows):
+        """One session per thread count (single-row / batch, see thread_policy), created on first use."""
+        import onnxruntime
+
+        threads = thread_policy.threads_for(rows)
+        with self._lock:
+            session = self._sessions.get(threads)
+            if session is None:
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = threads
+                options.inter_op_num_threads = 1
+                session = onnxruntime.InferenceSession(self.path, sess_options=options,
+                                                       providers=["CPUExecutionProvider"])
+                self._sessions[threads] = session
+            return session
+
+    def _run(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return self._session(len(X)).run(None, {INPUT_NAME: X})
+
+
+class OnnxClassifier(OnnxModel):
+    def __init__(self, path, meta):
+        super().__init__(path, meta)
+        self.classes_ = np.asarray(meta["classes"])
+
+    def predict_proba(self, X):
+        return self._run(X)[1].astype(np.float64)  # Outputs: [label, probabilities]
+
+    def predict(self, X):
+        # Same argmax sklearn takes, so ties resolve to the same class
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class OnnxRegressor(OnnxModel):
+    def predict(self, X):
+        return self._run(X)[0].reshape(-1)
+
+
+# ✅ Function: Export One Estimator (.onnx + .json with its classes and feature order)
+def save(estimator, directory, key, selected_features):
+    model = to_onnx(estimator, selected_features)
+    with open(os.path.join(directory, f"{key}.onnx"), "wb") as file:
+        file.write(model.SerializeToString())
+    meta = {"selected_features": list(selected_features), "input": INPUT_NAME}
+    if hasattr(estimator, "predict_proba"):
+        meta["classes"] = np.asarray(estimator.classes_).tolist()
+    with open(os.path.join(directory, f"{key}.json"), "w") as file:
+        json.dump(meta, file)
+
+
+def load(directory, key):
+    with open(os.path.join(directory, f"{key}.json")) as file:
+        meta = json.load(file)
+    path = os.path.join(directory, f"{key}.onnx")
+    return OnnxClassifier(path, meta) if "classes" in meta else OnnxRegressor(path, meta)
+
+
+# ✅ Function: Feature Rows from the Model's Training CSV (None when the data folder isn't deployed)
+def parity_rows(name, selected_features):
+    path = os.path.join(DATA_DIR, PARITY_DATA.get(name, ""))
+    if name not in PARITY_DATA or not os.path.exists(path):
+        return None
+    import pandas as pd
+
+    df = pd.read_csv(path, usecols=selected_features).dropna(subset=selected_features)
+    return df[selected_features].to_numpy(dtype=np.float32)
+
+
+# ✅ Function: Compare Every Exported Model with the Original on the Same Rows
+def check_parity(original, exported, X):
+    report = {"rows": len(X), "models": {}}
+    for key, model in exported.items():
+        expected, actual = original[key].predict(X), model.predict(X)
+        check = {}
+        if hasattr(model, "predict_proba"):
+            check["identical_predictions"] = bool(np.array_equal(expected, actual))
+            p_expected, p_actual = original[key].predict_proba(X), model.predict_proba(X)
+            check["max_probability_diff"] = float(np.abs(p_expected - p_actual).max())
+            if p_expected.shape[1] == 2:
+                # The presence service answers with probability >= 0.5
+                check["identical_decisions"] = bool(np.array_equal(p_expected[:, 1] >= 0.5, p_actual[:, 1] >= 0.5))
+        else:
+            check["max_abs_diff"] = float(np.abs(expected - actual).max())
+            # The time service rounds to a whole month / hour
+            check["identical_predictions"] = bool(np.array_equal(np.round(expected), np.round(actual)))
+        report["models"][key] = check
+    report["valid"] = all(
+        check["identical_predictions"] and check.get("identical_decisions", True)
+        for check in report["models"].values()
+    )
+    return report
@@ -1,15 +1,20 @@
-import joblib
-import pandas as pd
-import numpy as np
-import re
-import datetime
 import logging
 from flask import Flask, request, jsonify
-from difflib import get_close_matches
-from rapidfuzz import process
-from dateutil import parser
 from flask_cors import CORS
 
+import batch
+import feature_assembler
+import fuzzy_resolver
+import presence_cube
+import query_tokenizer
+import request_schema
+import micro_batch
+import response_cache
+import single_flight
+import thread_policy
+from label_registry import UnknownLabelError
+from vocabulary import valid_localities, valid_bird_names, bird_aliases, locality_aliases, locality_vocabulary
+
 # ✅ Initialize Flask App
 app = Flask(__name__)
 CORS(app)
@@ -18,259 +23,137 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ✅ Load Model from GitHub
-import requests
-import io
+# ✅ Load Model in the Background (the app serves /healthz and /readyz while it loads)
+import model_loader
 
-MODEL_URL = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/migration_prediction_model.pkl"
+MODEL_NAME = "migration_prediction_model.pkl"
 
-try:
-    response = requests.get(MODEL_URL)
-    response.raise_for_status()  
-    model_data = joblib.load(io.BytesIO(response.content))
-    rf_model = model_data['rf_final']
-    label_encoders = model_data['label_encoders']
-    selected_features = model_data['selected_features']
-    logger.info("✅ Model loaded successfully from GitHub.")
-except Exception as e:
-    logger.error(f"❌ Error loading model: {e}")
-    raise RuntimeError("Failed to load the prediction model.")
-
-# ✅ Valid Localities & Bird Names
-valid_localities = [
-    "Buckingham Place Hotel Tangalle", "Bundala NP General", "Bundala National Park",
-    "Kalametiya", "Tissa Lake", "Yala National Park General", "Debarawewa Lake"
-]
-
-valid_bird_names = ["Blue-tailed Bee-eater", "Red-vented Bulbul", "White-throated Kingfisher"]
-
-bird_aliases = {
-    "blue tailed bird": "Blue-tailed Bee-eater",
-    "blue bird": "Blue-tailed Bee-eater",
-    "bee eater": "Blue-tailed Bee-eater",
-    "red bird": "Red-vented Bulbul",
-    "bulbul": "Red-vented Bulbul",
-    "white bird": "White-throated Kingfisher",
-    "kingfisher": "White-throated Kingfisher"
-}
+# The precomputed presence cube for this model version (if one was built) is attached on every load
+model = model_loader.BackgroundModel(MODEL_NAME, prepare=presence_cube.attach).start()
+model_loader.register_health_routes(app, model)
+model_loader.register_admin_routes(app, model)
+
+# ✅ Response Caches (the parser reads the clock for the date and the hour, so query entries expire hourly)
+query_cache = response_cache.ResponseCache("presence-query")
+feature_cache = response_cache.ResponseCache("presence-features")
+flight = single_flight.SingleFlight("presence-model")
+response_cache.register_cache_routes(app, query_cache, feature_cache, flight)
+micro_batch.register_stats_route(app)
+thread_policy.register_settings_route(app)
+
+# ✅ Typo-Tolerant Lookups (trigram index over the names, aliases and locality vocabulary in vocabulary.py)
+bird_resolver = fuzzy_resolver.FuzzyResolver(valid_bird_names, bird_aliases)
+locality_resolver = fuzzy_resolver.FuzzyResolver(valid_localities + locality_vocabulary, locality_aliases)
 
 # ✅ Function: Correct Bird Name
 def correct_bird_name(name):
-    name = name.lower()
-    if name in bird_aliases:
-        return bird_aliases[name]
-    matches = get_close_matches(name, [b.lower() for b in valid_bird_names], n=1, cutoff=0.3)
-    return next((b for b in valid_bird_names if b.lower() == matches[0]), "Unknown Bird")
+    return bird_resolver.best(name) or "Unknown Bird"
 
 # ✅ Function: Correct Locality
 def correct_locality(user_input):
-    user_input = user_input.lower()
-    for loc in valid_localities:
-        if user_input == loc.lower():
-            return loc
-        if user_input in loc.lower():
-            return loc  
-    manual_mappings = {
-        "bundala": "Bundala NP General",
-        "yala": "Yala National Park General",
-        "tissa": "Tissa Lake",
-        "debara": "Debarawewa Lake",
-        "kalametiya": "Kalametiya Bird Sanctuary"
-    }
-    return manual_mappings.get(user_input, "Unknown Location")
+    return locality_resolver.best(user_input) or "Unknown Location"
 
-# ✅ Function: Convert Day Name to Integer
-def day_name_to_int(day_name):
-    days_map = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
-    }
-    return days_map.get(day_name.lower(), None)
-
-# ✅ Function: Convert Time of Day to Hour
-def time_of_day_to_hour(time_str):
-    time_ranges = {"morning": (6, 10), "afternoon": (11, 15), "evening": (16, 19), "night": (20, 23)}
-    return time_ranges.get(time_str.lower(), None)
-
-# ✅ Function: Parse Approximate Date
-def parse_approximate_date(expression):
-    today = datetime.date.today()
-    date_mappings = {
-        "tomorrow": today + datetime.timedelta(days=1),
-        "day after tomorrow": today + datetime.timedelta(days=2),
-        "next week": today + datetime.timedelta(weeks=1)
-        
-    }
-    if expression in date_mappings:
-        return date_mappings[expression]
-    match = re.search(r"in (\d+) days", expression)
-    if match:
-        return today + datetime.timedelta(days=int(match.group(1)))
-    return None  
+# ✅ Query Tokenizer (compiled once from the names, aliases and locality vocabulary in vocabulary.py)
+tokenizer = query_tokenizer.QueryTokenizer(valid_bird_names, bird_aliases, valid_localities, locality_aliases,
+                                           locality_vocabulary=locality_vocabulary)
 
 # ✅ Function: Extract Features from Query
 def extract_query_features_bird_presence(query):
-    query = query.lower()
-    today = datetime.date.today()
-    
-    # ✅ Extract Year (Defaults to Current Year)
-    year_match = re.search(r'\b(20[0-9]{2})\b', query)
-    year = int(year_match.group()) if year_match else today.year
-
-    # ✅ Extract Month (Defaults to Current Month)
-    months_map = {m: i+1 for i, m in enumerate([
-        "january", "february", "march", "april", "may", "june", "july", 
-        "august", "september", "october", "november", "december"
-    ])}
-    month_match = re.search(r'\b(' + '|'.join(months_map.keys()) + r')\b', query)
-    month = months_map.get(month_match.group()) if month_match else today.month
-
-    # ✅ Extract Day Name (If Provided)
-    days_map = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
+    tokens = tokenizer.tokenize(query)
+    return {
+        **query_tokenizer.date_time_features(tokens),
+        # Nothing spelled exactly: the closest name misspelled in the query, if one is close enough
+        "locality": (query_tokenizer.best(tokens, "locality") or locality_resolver.best_in(query)
+                     or "Unknown Location"),
+        "bird_name": query_tokenizer.best(tokens, "bird") or bird_resolver.best_in(query) or "Unknown Bird",
     }
-    day_name_match = re.search(r"\b(" + "|".join(days_map.keys()) + r")\b", query)
-    day_name = day_name_match.group().capitalize() if day_name_match else None
-
-    # ✅ Extract Approximate Date (e.g., "tomorrow", "next week")
-    approximate_date_match = re.search(r"(tomorrow|next week|day after tomorrow|in \d+ days)", query)
-    if approximate_date_match:
-        parsed_date = parse_approximate_date(approximate_date_match.group())
-        if parsed_date:
-            year, month, day = parsed_date.year, parsed_date.month, parsed_date.day
-        else:
-            day = today.day
-    else:
-        # ✅ Extract Specific Day (If Mentioned)
-            # ✅ Extract Specific Day (If Mentioned)
-        day_match = re.search(r"\b([1-9]|[12][0-9]|3[01])\b", query)
-        day = int(day_match.group()) if day_match else None
-
-        # ✅ If a Day Name (Friday, etc.) Exists, Align with the Correct Date
-    if day_name:
-        current_date = datetime.date(year, month, 1)  # Start from the 1st of the month
-        while current_date.weekday() != days_map[day_name.lower()]:
-            current_date += datetime.timedelta(days=1)  # Move to the next day
-            day = current_date.day  # ✅ Assign the correct day based on the weekday name
-
-        # ✅ If no specific day is found, default to today’s date
-            # ✅ If no specific day is found, default to TODAY’s date
-    if day is None:
-        today = datetime.date.today()  # ✅ Get today’s date
-        if month == today.month and year == today.year:
-            day = today.day  # ✅ Keep today's actual date
-        else:
-            # ✅ If the user entered a different month/year, use today’s day but in that month/year
-            try:
-                day = min(today.day, (datetime.date(year, month, 1) + datetime.timedelta(days=31)).day)
-            except ValueError:
-                day = 1  # ✅ Handle invalid cases (e.g., February 30)
-
-    # ✅ Get Correct Day Name
-    day_of_week = datetime.date(year, month, day).weekday()
-    day_name = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][day_of_week]
 
 
 
-    # ✅ Convert to Day of the Week (Numeric)
-    if day:
-        day_of_week = datetime.date(year, month, day).weekday()
-    else:
-        day_of_week = today.weekday()
-        day_name = today.strftime("%A")  # Default to today’s name if missing
-
-    current_hour = datetime.datetime.now().hour 
-
-    time_match = re.search(r'\b([0-9]{1,2}):?([0-9]{2})?\s?(a\.?m\.?|p\.?m\.?|am|pm)?\b', query)
-    if time_match:
-        hour = int(time_match.group(1))
-        period = time_match.group(3)  # AM/PM format
-        if period:
-            period = period.replace(".", "").lower()  # Normalize "a.m." -> "am"
-            if period == "pm" and hour < 12:
-                hour += 12
-            elif period == "am" and hour == 12:
-                hour = 0  # Midnight case
-    else:
-        time_match = re.search(r'\b(morning|afternoon|evening|night)\b', query)
-        hour_range = time_of_day_to_hour(time_match.group()) if time_match else None
-        hour = hour_range[0] if hour_range else current_hour  # Default to system hour if missing
-
-    # ✅ Determine Time of Day
-    if 6 <= hour <= 10:
-        time_of_day = "morning"
-    elif 11 <= hour <= 15:
-        time_of_day = "afternoon"
-    elif 16 <= hour <= 19:
-        time_of_day = "evening"
-    elif 20 <= hour <= 23 or hour == 0:
-        time_of_day = "night"
-    else:
-        time_of_day = "unspecified"
-
-
-
-
-    # ✅ Extract Locality Properly
-    locality = None
-    for loc in valid_localities:
-        if loc.lower() in query:
-            locality = loc
-            break  # Stop at first match
-    
-    # ✅ Handle Locality Aliases (Bundala -> Bundala NP General)
-    if not locality:
-        for alias, correct_loc in {
-            "bundala": "Bundala NP General",
-            "yala": "Yala National Park General",
-            "tissa": "Tissa Lake",
-            "debara": "Debarawewa Lake",
-            "kalametiya": "Kalametiya Bird Sanctuary"
-        }.items():
-            if alias in query:
-                locality = correct_loc
-                break
-
-    # ✅ Extract Bird Name Properly
-    bird_name = None
-    for bird in valid_bird_names:
-        if bird.lower() in query:
-            bird_name = bird
-            break
-    
-    # ✅ Handle Bird Aliases (blue bird -> Blue-tailed Bee-eater)
-    if not bird_name:
-        for alias, correct_name in bird_aliases.items():
-            if alias in query:
-                bird_name = correct_name
-                break
-
+# ✅ Function: Response Body for One Query
+def presence_response(features, present):
     return {
-        "year": year,
-        "month": month,
-        "day_of_week": day_of_week,  # ✅ Still keeping the number
-        "day_name": day_name,  # ✅ Now storing the actual day name
-        "hour": hour,
-        "time_of_day": time_of_day,
-        "locality": locality if locality else "Unknown Location",
-        "bird_name": bird_name if bird_name else "Unknown Bird"
+        "Response": (
+            f"The {features['bird_name']} is {'likely' if present else 'unlikely'} "
+            f"to be present at {features['locality']} on {features['day_name']}, {features['month']}/{features['year']} "
+            f"in the {features['time_of_day']}."
+        )
     }
 
 
+# ✅ Function: Cube Lookup or Forest Prediction -> Response Body
+def presence_prediction(model_data, features, locality_encoded, bird_name_encoded):
+    rf_model = model_data['rf_final']
+    selected_features = model_data['selected_features']
+
+    # ✅ Look Up the Precomputed Cube; the Forest Answers Anything outside Its Grid
+    cube = model_data.get('presence_cube')
+    probability = cube and cube.lookup(features["year"], features["month"], features["day_of_week"],
+                                       features["hour"], locality_encoded, bird_name_encoded)
+    if probability is None:
+        # ✅ Prepare Input Data (reused float32 buffer, columns in selected_features order)
+        input_data = feature_assembler.for_features(selected_features).assemble({
+            "Year": features["year"], "Month": features["month"], "Day_of_Week": features["day_of_week"],
+            "Hour": features["hour"], "LOCALITY_ENCODED": locality_encoded,
+            "COMMON NAME_ENCODED": bird_name_encoded,
+        })
+
+        # ✅ Make Prediction (shares one call with concurrent requests when micro-batching is on)
+        probability = micro_batch.submit("rf_final", "predict_proba", rf_model, input_data).result()[:, 1][0]
+    prediction = int(probability >= 0.5)
+
+    # ✅ Construct Response with Day Name
+    return presence_response(features, prediction == 1)
+
+
+# ✅ Function: Feature Cache, Else One Model Call Shared by Identical Concurrent Requests
+def cached_presence_prediction(model_data, features):
+    label_registry = model_data['label_registry']
+
+    # ✅ Other Phrasings of the Same Features Share One Entry
+    feature_key = (model_data['model_version'], response_cache.canonical(features))
+    response = feature_cache.get(feature_key)
+    if response is not None:
+        return response
+
+    # ✅ Encode Locality & Bird Name
+    locality_encoded = label_registry.encode('LOCALITY', features["locality"])
+    bird_name_encoded = label_registry.encode('COMMON NAME', features["bird_name"])
+
+    # ✅ The Leader Fills the Feature Cache
+    return flight.do(feature_key, lambda: feature_cache.put(
+        feature_key, presence_prediction(model_data, features, locality_encoded, bird_name_encoded)))
+
 
 # ✅ API Route: Prediction
 @app.route("/predict_presence", methods=["POST"])
+@model_loader.require_model(model)
 def predict():
     try:
+        model_data = model.get()
+
         data = request.get_json()
         query = data.get("query", "").strip()
         logger.info(f"🔍 Received Query: {query}")
 
-        if not query:
-            return jsonify({"error": "No query provided"}), 400
+        if "features" in data:
+            # ✅ Features Parsed Upstream (structured_request.py) -> No Query Parsing Here
+            query_key = None
+            try:
+                features = batch.structured_features(data["features"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            if not query:
+                return jsonify({"error": "No query provided"}), 400
+
+            # ✅ Same Query Text Since the Last Full Hour -> Cached Response
+            query_key = (model_data['model_version'], query.lower())
+            response = query_cache.get(query_key)
+            if response is not None:
+                return jsonify(response), 200
 
-        features = extract_query_features_bird_presence(query)
+            features = extract_query_features_bird_presence(query)
 
         # ✅ Check if Locality is Missing
         if features["locality"] == "Unknown Location":
@@ -291,36 +174,108 @@ def predict():
                 "valid_bird_names": valid_bird_names
             })
 
-        # ✅ Encode Locality & Bird Name
-        locality_encoded = label_encoders['LOCALITY'].transform([features["locality"]])[0]
-        bird_name_encoded = label_encoders['COMMON NAME'].transform([features["bird_name"]])[0]
+        response = cached_presence_prediction(model_data, features)
+        if query_key:
+            query_cache.put(query_key, response, expires_at=response_cache.next_hour())
 
-        # ✅ Prepare Input Data
-        input_data = pd.DataFrame([[features["year"], features["month"], features["day_of_week"],
-                                    features["hour"], locality_encoded, bird_name_encoded]], 
-                                   columns=selected_features)
+        return jsonify(response), 200
 
-        # ✅ Make Prediction
-        probability = rf_model.predict_proba(input_data)[:, 1][0]
-        prediction = int(probability >= 0.5)
+    except UnknownLabelError as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify(e.to_dict()), 400
 
-        # ✅ Construct Response
-        # ✅ Construct Response with Day Name
-        response = {
-         
-            "Response": (
-                f"The {features['bird_name']} is {'likely' if 1 else 'unlikely'} "
-                f"to be present at {features['locality']} on {features['day_name']}, {features['month']}/{features['year']} "
-                f"in the {features['time_of_day']}."
-            )
-        }
+    except Exception as e:
+        logger.error(f"❌ Error in Prediction: {e}")
+        return jsonify({"error": "Prediction error occurred"}), 500
 
+# ✅ Form Schema (typed fields, compiled once; see request_schema.py)
+fields_schema = request_schema.form_schema(valid_bird_names, valid_localities + locality_vocabulary)
+
+
+# ✅ API Route: Field Types and Choices (the form fills its inputs from these)
+@app.route("/predict_presence/fields", methods=["GET"])
+def presence_fields_schema():
+    return jsonify(fields_schema.describe()), 200
 
-        return jsonify(response), 200
+
+# ✅ API Route: Prediction from Typed Fields (the web form; no query parsing)
+@app.route("/predict_presence/fields", methods=["POST"])
+@model_loader.require_model(model)
+def predict_fields():
+    try:
+        features = request_schema.to_features(fields_schema.validate(request.get_json(silent=True)))
+        return jsonify(cached_presence_prediction(model.get(), features)), 200
+
+    except (request_schema.SchemaError, UnknownLabelError) as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify(e.to_dict()), 400
 
     except Exception as e:
         logger.error(f"❌ Error in Prediction: {e}")
         return jsonify({"error": "Prediction error occurred"}), 500
 
+# ✅ Function: Check & Encode One Batch Item (a query string or a feature object)
+def prepare_presence_item(item, label_registry):
+    if isinstance(item, str):
+        if not item.strip():
+            raise ValueError("No query provided")
+        features = extract_query_features_bird_presence(item.strip())
+    else:
+        features = batch.structured_features(item)
+    if features["locality"] == "Unknown Location":
+        raise ValueError("The query you entered didn't contain a location.")
+    if features["bird_name"] == "Unknown Bird":
+        raise ValueError("The query you entered didn't contain a bird species.")
+    row = {
+        "Year": features["year"], "Month": features["month"], "Day_of_Week": features["day_of_week"],
+        "Hour": features["hour"], "LOCALITY_ENCODED": label_registry.encode('LOCALITY', features["locality"]),
+        "COMMON NAME_ENCODED": label_registry.encode('COMMON NAME', features["bird_name"]),
+    }
+    return features, row
+
+
+# ✅ API Route: Batch Prediction (one predict_proba call for the whole batch)
+@app.route("/predict_presence/batch", methods=["POST"])
+@model_loader.require_model(model)
+def predict_batch():
+    try:
+        model_data = model.get()
+        rf_model = model_data['rf_final']
+        label_registry = model_data['label_registry']
+        assembler = feature_assembler.for_features(model_data['selected_features'])
+        cube = model_data.get('presence_cube')
+
+        items = batch.read_items(request.get_json(silent=True))
+        logger.info(f"🔍 Received Batch of {len(items)} Items")
+
+        def predict_rows(rows):
+            if cube is None:
+                return feature_assembler.predict_proba_distinct(rf_model, assembler.assemble_rows(rows))[:, 1]
+            probabilities, inside = cube.lookup_many([[row[axis] for axis in presence_cube.AXES] for row in rows])
+            if not inside.all():
+                outside = [row for row, hit in zip(rows, inside) if not hit]
+                probabilities[~inside] = feature_assembler.predict_proba_distinct(
+                    rf_model, assembler.assemble_rows(outside))[:, 1]
+            return probabilities
+
+        def respond(features, probability):
+            present = bool(probability >= 0.5)
+            return {
+                **presence_response(features, present),
+                "probability": round(float(probability), 4),
+                "present": present,
+            }
+
+        return jsonify(batch.run(items, lambda item: prepare_presence_item(item, label_registry),
+                                 predict_rows, respond)), 200
+
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
+
+    except Exception as e:
+        logger.error(f"❌ Error in Batch Prediction: {e}")
+        return jsonify({"error": "Prediction error occurred"}), 500
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import time
+import logging
+import datetime
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+import lazy_imports
+import model_store
+import feature_assembler
+
+np = lazy_imports.lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+# ✅ The presence model's whole input space is small and discrete:
+# year × month × day_of_week × hour × LOCALITY_ENCODED × COMMON NAME_ENCODED.
+# The cube holds P(present) for every cell, so /predict_presence is an array lookup.
+#   uint8   : round(p * 255). 0.5 falls exactly on the rounding boundary, so `>= 0.5` decisions are exact
+#   float16 : finer probabilities, nudged below 0.5 wherever p < 0.5 so decisions stay exact too
+
+MODEL_NAME = "migration_prediction_model.pkl"
+AXES = ["Year", "Month", "Day_of_Week", "Hour", "LOCALITY_ENCODED", "COMMON NAME_ENCODED"]
+CUBE_DTYPE = os.environ.get("BIRD_PRESENCE_CUBE_DTYPE", "uint8")
+CHUNK_ROWS = 250_000
+
+
+def default_years():
+    this_year = datetime.date.today().year
+    return this_year - 1, this_year + 1
+
+
+def cube_paths(version, dtype):
+    base = os.path.join(model_store.STORE_DIR, "cubes", f"{version}.{dtype}")
+    return f"{base}.npy", f"{base}.json"
+
+
+def _quantize(proba, dtype):
+    if dtype == "uint8":
+        return np.rint(proba * 255).astype(np.uint8)
+    values = proba.astype(np.float16)
+    flipped = (proba < 0.5) & (values >= 0.5)
+    values[flipped] = np.nextafter(np.float16(0.5), np.float16(0))
+    return values
+
+
+# ✅ Function: Evaluate rf_final over the Whole Grid (chunked, written straight into a .npy memmap)
+def build_cube(model_data, path, years=None, dtype=None, version=None, workers=None):
+    dtype = dtype or CUBE_DTYPE
+    first_year, last_year = years or default_years()
+    encoders = model_data["label_encoders"]
+    sizes = {
+        "Year": last_year - first_year + 1, "Month": 12, "Day_of_Week": 7, "Hour": 24,
+        "LOCALITY_ENCODED": len(encoders["LOCALITY"].classes_),
+        "COMMON NAME_ENCODED": len(encoders["COMMON NAME"].classes_),
+    }
+    offsets = {"Year": first_year, "Month": 1}
+    shape = tuple(sizes[axis] for axis in AXES)
+
+    rf_model = model_data["rf_final"]
+    offset_row = np.array([offsets.get(axis, 0) for axis in AXES], dtype=np.float32)
+    order = [AXES.index(name) for name in model_data["selected_features"]]
+
+    def fill(chunk_start):
+        # Same feature_assembler path the live route uses. A chunk's trees may be summed in a different
+        # order across threads, so a probability can differ from the live one in its last bits (far
+        # below the cube's quantization step)
+        chunk_end = min(chunk_start + CHUNK_ROWS, total)
+        cells = np.stack(np.unravel_index(np.arange(chunk_start, chunk_end), shape), axis=1)
+        rows = (cells.astype(np.float32) + offset_row)[:, order]
+        flat_cube[chunk_start:chunk_end] = _quantize(feature_assembler.predict_proba(rf_model, rows)[:, 1], dtype)
+        return chunk_end
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.npy"
+    start = time.perf_counter()
+    try:
+        cube = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=shape)
+        flat_cube = cube.reshape(-1)
+        total = flat_cube.size
+        # Tree traversal releases the GIL, so chunks spread over all cores
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            for chunk_end in pool.map(fill, range(0, total, CHUNK_ROWS)):
+                logger.info(f"🧊 Presence cube {chunk_end / total:.0%} ({chunk_end}/{total} cells)")
+        cube.flush()
+        del cube, flat_cube
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+    meta = {
+        "model": MODEL_NAME, "version": version, "dtype": dtype, "axes": AXES,
+        "shape": list(shape), "first_year": first_year, "last_year": last_year,
+        "build_s": round(time.perf_counter() - start, 2), "size_bytes": os.path.getsize(path),
+        "built_at": time.time(),
+    }
+    return meta
+
+
+class PresenceCube:
+    """Memory-mapped P(present) grid; lookups outside the grid return None (use the forest)."""
+
+    def __init__(self, path, meta):
+        self.meta = meta
+        self.cube = np.load(path, mmap_mode="r")
+        self.first_year = meta["first_year"]
+        self.shape = tuple(meta["shape"])
+        self.scale = 255.0 if meta["dtype"] == "uint8" else 1.0
+
+    def _index(self, year, month, day_of_week, hour, locality_encoded, bird_name_encoded):
+        index = (year - self.first_year, month - 1, day_of_week, hour, locality_encoded, bird_name_encoded)
+        for value, size in zip(index, self.shape):
+            if not (isinstance(value, (int, np.integer)) and 0 <= value < size):
+                return None
+        return index
+
+    def lookup(self, year, month, day_of_week, hour, locality_encoded, bird_name_encoded):
+        index = self._index(year, month, day_of_week, hour, locality_encoded, bird_name_encoded)
+        if index is None:
+            return None
+        return float(self.cube[index]) / self.scale
+
+    def lookup_many(self, rows):
+        """rows: (n, 6) ints in AXES order -> (probabilities, inside-grid mask)."""
+        index = np.asarray(rows, dtype=np.int64) - np.array([self.first_year, 1, 0, 0, 0, 0])
+        inside = np.all((index >= 0) & (index < np.array(self.shape)), axis=1)
+        probabilities = np.zeros(len(index), dtype=np.float64)
+        probabilities[inside] = self.cube[tuple(index[inside].T)] / self.scale
+        return probabilities, inside
+
+
+# ✅ Function: Load the Cube Built for This Model Version (None if there isn't one)
+def load_cube(version, dtype=None):
+    path, meta_path = cube_paths(version, dtype or CUBE_DTYPE)
+    if not version or not os.path.exists(path):
+        return None
+    with open(meta_path) as file:
+        meta = json.load(file)
+    logger.info(f"🧊 Using presence cube {os.path.basename(path)} ({meta['first_year']}-{meta['last_year']})")
+    return PresenceCube(path, meta)
+
+
+# ✅ Function: Hook for BackgroundModel — attach the matching cube to a freshly loaded bundle
+def attach(model_data, version):
+    model_data["presence_cube"] = load_cube(version)
+    return model_data
+
+
+# ✅ Function: Build (or Reuse) the Cube for the Stored Presence Model
+def ensure_cube(years=None, dtype=None, rebuild=False):
+    dtype = dtype or CUBE_DTYPE
+    model_store.fetch_model(MODEL_NAME)
+    version = model_store.current_version(MODEL_NAME)
+    path, meta_path = cube_paths(version, dtype)
+    if os.path.exists(path) and not rebuild:
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if years is None or (meta["first_year"], meta["last_year"]) == tuple(years):
+            return path, meta
+    model_data = model_store.load_model(MODEL_NAME, mmap=False, backend="sklearn", model_format="pickle")
+    meta = build_cube(model_data, path, years, dtype, version)
+    model_store._write_json_atomic(meta_path, meta)
+    logger.info(f"✅ Presence cube built in {meta['build_s']}s ({meta['size_bytes'] / 1e6:.1f}MB): {path}")
+    return path, meta
+
+
+if __name__ == "__main__":
+    # Usage: python presence_cube.py [first year] [last year] [uint8|float16]
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    cube_years = (int(args[0]), int(args[1])) if len(args) >= 2 else None
+    cube_dtype = args[2] if len(args) >= 3 else None
+    cube_path, cube_meta = ensure_cube(cube_years, cube_dtype, rebuild=True)
+    print(json.dumps(cube_meta, indent=2))
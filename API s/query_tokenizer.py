@@ -0,0 +1,233 @@
+import re
+import datetime
+from collections import namedtuple
+
+import entity_matcher
+
+# ✅ One compiled pattern per service walks the lowercased query once and emits the date and time
+# tokens the parsers need, with their spans: year, month, day, weekday, clock time, part of day,
+# season and relative date. Birds and localities come from one pass of the service's entity matcher
+# (entity_matcher.py). Vocabulary phrases (names, aliases, month / day words...) must start at a word
+# start but, like the substring checks they replace, may run into the next word.
+
+Token = namedtuple("Token", ["kind", "value", "start", "end", "whole_word", "rank"], defaults=(True, 0))
+
+MONTHS = {name: i + 1 for i, name in enumerate([
+    "january", "february", "march", "april", "may", "june", "july",
+    "august", "september", "october", "november", "december"
+])}
+WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+PARTS_OF_DAY = {"morning": 6, "afternoon": 11, "evening": 16, "night": 20}  # First hour of each part
+SEASONS = ["summer", "winter", "spring", "autumn"]
+RELATIVE_DATES = {"tomorrow": 1, "day after tomorrow": 2, "next week": 7}  # Days from today
+KINDS = ("year", "month", "day", "weekday", "clock", "part_of_day", "season", "relative_date", "bird", "locality")
+
+# Literal starts with the regex that follows them: "in 3 days" (and "within 3 days", which the old
+# substring search also read as "in 3 days"; the count is the only group a match can capture) and digit runs
+IN_DAYS = {"in ": r"(\d+) days", "within ": r"(\d+) days"}
+DIGITS = {digit: r"\d*" for digit in "0123456789"}
+CLOCK = re.compile(r'\b([0-9]{1,2}):?([0-9]{2})?\s?(a\.?m\.?|p\.?m\.?|am|pm)?\b')
+AT = re.compile(r'(?:^|\W)at\s+$')  # "at 7": the one place a bare number is an hour
+
+
+def _whole_word(query, start, end):
+    before, after = query[start - 1:start] if start else "", query[end:end + 1]
+    return not (before.isalnum() or before == "_" or after.isalnum() or after == "_")
+
+
+def _trie_regex(entries):
+    """One regex for every literal (-> regex to match after it, "" for none) with shared prefixes factored
+    out; longer literals are tried first, and a literal starting with a letter must start a word."""
+    trie = {}
+    for literal, tail in entries.items():
+        node = trie
+        for char in literal:
+            node = node.setdefault(char, {})
+        node[None] = tail
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char is not None]
+        if node.get(None):
+            branches.append(node[None])
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if node.get(None) == "" else body
+
+    # Every alternative starts with a plain character, so re skips positions no literal starts at; the
+    # word-start check therefore looks back from after that character, over the letter before it
+    return "|".join(
+        re.escape(char) + ("" if char.isdigit() else rf"(?<![^\W\d_]{re.escape(char)})") + build(child)
+        for char, child in trie.items()
+    )
+
+
+# ✅ Function: Hour → Part of Day (the buckets every service reports)
+def time_of_day(hour):
+    if 6 <= hour <= 10:
+        return "morning"
+    if 11 <= hour <= 15:
+        return "afternoon"
+    if 16 <= hour <= 19:
+        return "evening"
+    if 20 <= hour <= 23 or hour == 0:
+        return "night"
+    return "unspecified"
+
+
+class QueryTokenizer:
+    """Compiled once per service from its bird / locality vocabulary; tokenize() is one finditer pass
+    plus one entity-matcher pass. `kinds` limits the tokens to the ones a service reads (the rest are
+    neither compiled nor parsed); `locality_vocabulary` adds localities beyond the service's own list."""
+
+    def __init__(self, birds=(), bird_aliases=None, localities=(), locality_aliases=None, kinds=KINDS,
+                 locality_vocabulary=()):
+        self.kinds = frozenset(kinds)
+        self.phrases = {}  # lowercased date / time phrase -> (kind, value, rank); the first registration wins
+        tables = [
+            ("month", MONTHS), ("weekday", WEEKDAYS), ("part_of_day", {name: name for name in PARTS_OF_DAY}),
+            ("season", {name: name for name in SEASONS}), ("relative_date", RELATIVE_DATES),
+        ]
+        for kind, table in tables:
+            for phrase, value in table.items():
+                if kind in self.kinds:
+                    self.phrases.setdefault(phrase, (kind, value, 0))
+        # Birds and localities: canonical names rank before aliases, each in list order (the order the old
+        # loops checked), then the locality vocabulary. Vocabulary names only match whole words, so the
+        # export's stray entries ("Nov", "Sw") are not read out of "november" or "swamp"
+        self.entities = entity_matcher.EntityMatcher()
+        for kind, names, aliases, vocabulary in (("bird", birds, bird_aliases, ()),
+                                                 ("locality", localities, locality_aliases, locality_vocabulary)):
+            if kind not in self.kinds:
+                continue
+            entries = [(name, name, False) for name in names]
+            entries += [(alias, name, False) for alias, name in (aliases or {}).items()]
+            entries += [(name, name, True) for name in vocabulary]
+            for rank, (phrase, value, whole_word) in enumerate(entries):
+                self.entities.add(phrase.lower(), (kind, value, rank), whole_word)
+        self.entities.build()
+
+        # Phrases, "in N days" and digit runs are folded into one character trie, so a query position
+        # costs a character lookup instead of one attempt per phrase
+        entries = dict.fromkeys(self.phrases, "")
+        if "relative_date" in self.kinds:
+            entries.update(IN_DAYS)
+        if self.kinds & {"year", "day", "clock"}:
+            entries.update(DIGITS)
+        self.pattern = re.compile(_trie_regex(entries))
+
+    def _numbers(self, query, start, end, whole_word, tokens):
+        """A digit run can be a year, a day of the month and the start of a clock time at once."""
+        if whole_word:
+            value = int(query[start:end])
+            if end - start == 4 and value // 100 == 20 and "year" in self.kinds:  # "20xx"
+                tokens.append(Token("year", value, start, end))
+            if ((end - start == 1 and value) or (end - start == 2 and 10 <= value <= 31)) and "day" in self.kinds:
+                tokens.append(Token("day", value, start, end))
+        clock = CLOCK.match(query, start) if "clock" in self.kinds else None
+        if clock:
+            hour, minutes, period = clock.groups()
+            hour = int(hour)
+            if period:
+                period = period.replace(".", "")  # Normalize "a.m." -> "am"
+                if period == "pm" and hour < 12:
+                    hour += 12
+                elif period == "am" and hour == 12:
+                    hour = 0  # Midnight case
+            # A clock time has a colon or am/pm, or is a bare number after "at": "2025" is a year, not 20:25,
+            # and "31 march" or "on 15" a date
+            if hour <= 23 and (":" in clock.group() or period
+                               or (minutes is None and AT.search(query[max(start - 8, 0):start]))):
+                tokens.append(Token("clock", hour, start, clock.end()))
+
+    # ✅ Tokenize a Query (the tokens of each kind come out in query order)
+    def tokenize(self, query):
+        query = query.lower()
+        tokens = []
+        for match in self.pattern.finditer(query):
+            start, end = match.span()
+            phrase = self.phrases.get(match.group())
+            if phrase:
+                kind, value, rank = phrase
+                tokens.append(Token(kind, value, start, end, _whole_word(query, start, end), rank))
+            elif match.lastindex:  # In N days
+                tokens.append(Token("relative_date", int(match.group(match.lastindex)), start, end,
+                                    _whole_word(query, start, end)))
+                self._numbers(query, *match.span(match.lastindex), True, tokens)
+            else:
+                self._numbers(query, start, end, _whole_word(query, start, end), tokens)
+        for start, end, (kind, value, rank) in self.entities.find(query):
+            tokens.append(Token(kind, value, start, end, _whole_word(query, start, end), rank))
+        return tokens
+
+
+# ✅ Function: First Token of Each Kind, and First Token of Each Kind Standing as a Word of Its Own
+def firsts(tokens):
+    found, whole_words = {}, {}
+    for token in tokens:
+        if token.kind not in found:
+            found[token.kind] = token
+        if token.whole_word and token.kind not in whole_words:
+            whole_words[token.kind] = token
+    return found, whole_words
+
+
+# ✅ Function: Bird / Locality with the Best Rank (canonical names before aliases)
+def best(tokens, kind):
+    match = None
+    for token in tokens:
+        if token.kind == kind and (match is None or token.rank < match.rank):
+            match = token
+    return match.value if match else None
+
+
+# ✅ Function: Date & Hour Features Shared by /predict_presence and /predict_location
+def date_time_features(tokens, today=None, now=None):
+    today = today or datetime.date.today()
+    found, whole_words = firsts(tokens)
+
+    year = found["year"].value if "year" in found else today.year
+    month = whole_words["month"].value if "month" in whole_words else today.month
+    weekday_token = whole_words.get("weekday")
+
+    if "relative_date" in found:
+        parsed_date = today + datetime.timedelta(days=found["relative_date"].value)
+        year, month, day = parsed_date.year, parsed_date.month, parsed_date.day
+    else:
+        day = found["day"].value if "day" in found else None
+
+    # ✅ A day name moves the date to that weekday's first occurrence in the month (as the old loop
+    # did, the day stays as parsed when the 1st already is that weekday)
+    if weekday_token:
+        offset = (weekday_token.value - datetime.date(year, month, 1).weekday()) % 7
+        if offset:
+            day = 1 + offset
+
+    if day is None:
+        if month == today.month and year == today.year:
+            day = today.day
+        else:
+            # ✅ Another month/year: today's day number in that month
+            try:
+                day = min(today.day, (datetime.date(year, month, 1) + datetime.timedelta(days=31)).day)
+            except ValueError:
+                day = 1
+
+    day_of_week = datetime.date(year, month, day).weekday()
+
+    if "clock" in found:
+        hour = found["clock"].value
+    elif "part_of_day" in whole_words:
+        hour = PARTS_OF_DAY[whole_words["part_of_day"].value]
+    else:
+        hour = (now or datetime.datetime.now()).hour  # Default to the system hour if the query has neither
+
+    return {
+        "year": year,
+        "month": month,
+        "day_of_week": day_of_week,
+        "day_name": DAY_NAMES[day_of_week],
+        "hour": hour,
+        "time_of_day": time_of_day(hour),
+    }
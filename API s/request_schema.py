@@ -0,0 +1,145 @@
+import datetime
+from collections import namedtuple
+
+from query_tokenizer import DAY_NAMES, PARTS_OF_DAY, SEASONS, time_of_day
+
+# ✅ Typed JSON bodies for the form endpoints (/predict_presence/fields, /predict_location/fields,
+# /predict_best_time/fields). Each service compiles its schema once at startup into one check per
+# field, with the type, range and choices bound in, so validating a request is a few dict lookups and
+# no query text is parsed. Names must be one of the choices (any case); unknown fields are refused,
+# and every problem in a request is reported at once.
+
+Field = namedtuple("Field", ["type", "required", "choices", "low", "high"], defaults=(False, None, None, None))
+
+
+class SchemaError(ValueError):
+    """The request body does not match the schema (answered with 400)."""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(f"{name}: {error}" for name, error in errors.items()))
+        self.errors = errors
+
+    def to_dict(self):
+        return {"error": "Invalid request fields", "fields": self.errors}
+
+
+def _integer(field):
+    low, high = field.low, field.high
+
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, int):
+            raise ValueError(f"must be a whole number, got {value!r}")
+        if not low <= value <= high:
+            raise ValueError(f"must be between {low} and {high}, got {value}")
+        return value
+    return check
+
+
+def _date(field):
+    def check(value):
+        try:
+            return datetime.date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"must be a date as YYYY-MM-DD, got {value!r}") from None
+    return check
+
+
+def _string(field):
+    canonical = None
+    if field.choices is not None:
+        canonical = {}
+        for choice in field.choices:
+            canonical.setdefault(choice.lower(), choice)  # The first spelling listed is the one returned
+    listed = f": one of {', '.join(field.choices)}" if field.choices is not None and len(field.choices) <= 12 else ""
+
+    def check(value):
+        if not isinstance(value, str):
+            raise ValueError(f"must be a string, got {value!r}")
+        if canonical is None:
+            return value
+        match = canonical.get(value.strip().lower())
+        if match is None:
+            raise ValueError(f"unknown value {value!r}{listed}")
+        return match
+    return check
+
+
+_COMPILERS = {"integer": _integer, "date": _date, "string": _string}
+
+
+class Schema:
+    """{field name: Field} compiled into a list of (name, required, check) once."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self._names = frozenset(fields)
+        self._checks = [(name, field.required, _COMPILERS[field.type](field)) for name, field in fields.items()]
+
+    def validate(self, data):
+        """Request body -> {field: checked value}; raises SchemaError listing every problem."""
+        if not isinstance(data, dict):
+            raise SchemaError({"body": "send a JSON object"})
+        errors = {name: "unknown field" for name in data if name not in self._names}
+        values = {}
+        for name, required, check in self._checks:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    errors[name] = "required"
+                continue
+            try:
+                values[name] = check(value)
+            except ValueError as e:
+                errors[name] = str(e)
+        if errors:
+            raise SchemaError(errors)
+        return values
+
+    # ✅ Field Types and Choices (the form fills its inputs from this)
+    def describe(self):
+        return {
+            name: {key: value for key, value in (("type", field.type), ("required", field.required),
+                                                 ("choices", field.choices), ("min", field.low), ("max", field.high))
+                   if value is not None}
+            for name, field in self.fields.items()
+        }
+
+
+# ✅ Function: The Form Schema Shared by the Services (locality / season only where the model uses them)
+def form_schema(birds, localities=None, seasons=False):
+    fields = {
+        "bird_name": Field("string", True, list(birds)),
+        "date": Field("date"),
+        "hour": Field("integer", low=0, high=23),
+        "time_of_day": Field("string", choices=list(PARTS_OF_DAY)),
+    }
+    if localities is not None:
+        fields["locality"] = Field("string", True, list(dict.fromkeys(localities)))
+    if seasons:
+        fields["season"] = Field("string", choices=list(SEASONS))
+    return Schema(fields)
+
+
+# ✅ Function: Checked Fields -> the Same Feature Dict the Query Parsers Return
+def to_features(values, today=None, now=None):
+    """No date: today; no hour: the time_of_day's first hour, else the current hour (as for query text).
+    Given both, the hour wins."""
+    date = values.get("date") or today or datetime.date.today()
+    part_of_day = values.get("time_of_day")
+    if "hour" in values:
+        hour = values["hour"]
+    elif part_of_day is not None:
+        hour = PARTS_OF_DAY[part_of_day]
+    else:
+        hour = (now or datetime.datetime.now()).hour
+    day_of_week = date.weekday()
+    return {
+        "year": date.year,
+        "month": date.month,
+        "day_of_week": day_of_week,
+        "day_name": DAY_NAMES[day_of_week],
+        "hour": hour,
+        "time_of_day": time_of_day(hour),  # From the hour, as the query parsers report it
+        "locality": values.get("locality", "Unknown Location"),
+        "bird_name": values["bird_name"],
+    }
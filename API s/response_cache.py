@@ -0,0 +1,98 @@
+import os
+import time
+import datetime
+import threading
+import collections
+
+from flask import jsonify
+
+# ✅ In-process response caches, two tiers per service:
+#   query tier   : (model version, lowercased query) -> response. The parsers fill in "today",
+#                  "tomorrow", the current season and (presence/location) the current hour from the
+#                  clock, so these entries expire at the next hour or the next midnight.
+#   feature tier : (model version, canonical feature tuple) -> response. Every phrasing that resolves
+#                  to the same features shares one entry; they are absolute, so only the TTL applies.
+# A new model version changes every key, so a hot reload never serves old answers.
+
+CACHE_SIZE = int(os.environ.get("BIRD_CACHE_SIZE", "10000"))  # 0 turns the caches off
+CACHE_TTL = float(os.environ.get("BIRD_CACHE_TTL", "3600"))
+
+
+def next_hour(now=None):
+    now = datetime.datetime.fromtimestamp(time.time() if now is None else now)
+    return (now.replace(minute=0, second=0, microsecond=0) + datetime.timedelta(hours=1)).timestamp()
+
+
+def next_midnight(now=None):
+    now = datetime.datetime.fromtimestamp(time.time() if now is None else now)
+    return datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time()).timestamp()
+
+
+# ✅ Function: Hashable, Order-Independent Key for an Extracted Feature Dict
+def canonical(features):
+    return tuple(sorted(features.items()))
+
+
+class ResponseCache:
+    """Thread-safe LRU with a per-entry expiry time and hit/miss/eviction counters."""
+
+    def __init__(self, name, maxsize=None, ttl=None):
+        self.name = name
+        self.maxsize = CACHE_SIZE if maxsize is None else maxsize
+        self.ttl = CACHE_TTL if ttl is None else ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, value, expires_at=None):
+        if self.maxsize <= 0:
+            return value
+        expires_at = min(time.time() + self.ttl, expires_at or float("inf"))
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return value
+
+    # ✅ Cached Value, or compute() It and Keep It until expires_at (and at most the TTL)
+    def get_or_compute(self, key, compute, expires_at=None):
+        value = self.get(key)
+        if value is None:
+            value = self.put(key, compute(), expires_at)
+        return value
+
+    def clear(self):
+        """Drop every entry and zero the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self):
+        with self._lock:
+            stats = {"cache": self.name, "size": len(self._entries), "maxsize": self.maxsize, **self._stats}
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+
+# ✅ Function: Add /cache/stats (counters of every cache and single-flight group of the service)
+def register_cache_routes(app, *caches):
+    @app.route("/cache/stats", methods=["GET"])
+    def cache_stats():
+        return jsonify({"caches": [cache.stats() for cache in caches]}), 200
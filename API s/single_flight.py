@@ -0,0 +1,70 @@
+import os
+import threading
+
+# ✅ Single-flight: concurrent requests for the same key wait on one in-flight computation and
+# share its result (or its exception) instead of each running the model. Bursts of identical
+# queries from retries or a popular bird then cost one model call.
+
+ENABLED = os.environ.get("BIRD_SINGLE_FLIGHT", "1") == "1"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """do(key, fn): run fn once per key at a time; callers that arrive meanwhile get the same result."""
+
+    def __init__(self, name, enabled=None):
+        self.name = name
+        self.enabled = ENABLED if enabled is None else enabled
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0, "max_waiters": 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key) if self.enabled else None
+            leader = call is None
+            if leader:
+                call = _Call()
+                if self.enabled:
+                    self._calls[key] = call
+                self._stats["executions"] += 1
+            else:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                self._stats["max_waiters"] = max(self._stats["max_waiters"], call.waiters)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def reset(self):
+        with self._lock:
+            self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self):
+        with self._lock:
+            stats = {"flight": self.name, "in_flight": len(self._calls), **self._stats}
+        stats["coalescing_ratio"] = round(stats["coalesced"] / stats["calls"], 4) if stats["calls"] else None
+        return stats
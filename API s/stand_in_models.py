@@ -0,0 +1,138 @@
+import os
+import sys
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import model_store
+from vocabulary import valid_localities, valid_bird_names, locality_aliases, locality_vocabulary
+
+logger = logging.getLogger(__name__)
+
+# ✅ Stand-in model bundles for offline tests and benchmarks (GitHub out of reach, CI). Each bundle has
+# the layout its notebook saves (same keys, selected_features, estimator types and label encoders) and
+# is trained on the CSVs in Migration model/data. "full" uses the notebooks' hyperparameters, "small"
+# a few shallow trees so a test session builds all three in seconds. Their answers are not the
+# production models'; serve them with local_model_server.py, or import them with
+# `python model_store.py import`.
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Migration model", "data")
+
+PRESENCE_FEATURES = ["Year", "Month", "Day_of_Week", "Hour", "LOCALITY_ENCODED", "COMMON NAME_ENCODED"]
+LOCATION_FEATURES = ["Year", "Month", "Day_of_Week", "Hour", "LATITUDE", "OBSERVATION", "LONGITUDE",
+                     "COMMON NAME_ENCODED"]
+TIME_FEATURES = ["OBSERVATION", "Year", "Day_of_Week", "LOCALITY_ENCODED", "COMMON NAME_ENCODED",
+                 "Is_Summer", "Is_Winter", "Is_Spring", "Is_Autumn",
+                 "Is_Morning", "Is_Afternoon", "Is_Evening", "Is_Night"]
+
+SIZES = {
+    "full": {
+        "presence": {"n_estimators": 200, "max_depth": 16, "min_samples_split": 12, "min_samples_leaf": 5,
+                     "max_features": 0.6, "max_samples": 0.75},
+        "location": {"n_estimators": 100, "max_depth": 15, "min_samples_split": 10, "min_samples_leaf": 5,
+                     "max_features": 0.7, "min_impurity_decrease": 0.0001},
+        "time": {"n_estimators": 300, "max_depth": 8, "learning_rate": 0.05, "subsample": 0.8,
+                 "colsample_bytree": 0.8},
+    },
+    "small": {
+        "presence": {"n_estimators": 12, "max_depth": 8},
+        "location": {"n_estimators": 8, "max_depth": 8},
+        "time": {"n_estimators": 20, "max_depth": 4},
+    },
+}
+
+
+def _encoders(df):
+    """LabelEncoders over the CSV's names plus every name the services accept, so no vocabulary entry
+    is answered with an unknown-label 400."""
+    from sklearn.preprocessing import LabelEncoder
+
+    localities = set(df["LOCALITY"].dropna()) | set(valid_localities) | set(locality_vocabulary)
+    localities |= set(locality_aliases.values())
+    birds = set(df["COMMON NAME"].dropna()) | set(valid_bird_names)
+    return {"COMMON NAME": LabelEncoder().fit(sorted(birds)), "LOCALITY": LabelEncoder().fit(sorted(localities))}
+
+
+def _read(csv_name, encoders=None):
+    df = pd.read_csv(os.path.join(DATA_DIR, csv_name)).dropna(subset=["LOCALITY", "COMMON NAME", "Month", "Hour"])
+    encoders = encoders or _encoders(df)
+    df["LOCALITY_ENCODED"] = encoders["LOCALITY"].transform(df["LOCALITY"])
+    df["COMMON NAME_ENCODED"] = encoders["COMMON NAME"].transform(df["COMMON NAME"])
+    return df, encoders
+
+
+# ✅ Function: Presence Bundle (rf_final: RandomForestClassifier, OBSERVATION 0/1)
+def presence_bundle(size="full", seed=42):
+    from sklearn.ensemble import RandomForestClassifier
+
+    df, encoders = _read("migration_data.csv")
+    rf_final = RandomForestClassifier(class_weight="balanced", random_state=seed, n_jobs=-1,
+                                      **SIZES[size]["presence"])
+    rf_final.fit(df[PRESENCE_FEATURES].to_numpy(np.float32), df["OBSERVATION"].astype(int))
+    rf_final.n_jobs = None
+    return {"rf_final": rf_final, "selected_features": PRESENCE_FEATURES, "label_encoders": encoders}
+
+
+# ✅ Function: Location Bundle (location_model: RandomForestClassifier over LOCALITY codes)
+def location_bundle(size="full", seed=42):
+    from sklearn.ensemble import RandomForestClassifier
+
+    df, encoders = _read("migration_data.csv")
+    location_model = RandomForestClassifier(class_weight="balanced", random_state=seed, n_jobs=-1,
+                                            **SIZES[size]["location"])
+    location_model.fit(df[LOCATION_FEATURES].to_numpy(np.float32), df["LOCALITY_ENCODED"])
+    location_model.n_jobs = None
+    return {"location_model": location_model, "selected_features": LOCATION_FEATURES, "label_encoders": encoders}
+
+
+# ✅ Function: Time Bundle (month_model / hour_model: XGBRegressor, SelectKBest feature_selector;
+# fused=True adds the multi-output time_model as the notebook's last cells do)
+def time_bundle(size="full", seed=42, fused=False):
+    from sklearn.feature_selection import SelectKBest, f_regression
+    from xgboost import XGBRegressor
+
+    df, encoders = _read("time_data.csv")
+    X = df[TIME_FEATURES]
+    selector = SelectKBest(score_func=f_regression, k=min(20, len(TIME_FEATURES))).fit(X, df["Month"])
+    selected_features = list(X.columns[selector.get_support()])
+    X = X[selected_features].to_numpy(np.float32)
+    params = {**SIZES[size]["time"], "random_state": seed}
+    bundle = {
+        "month_model": XGBRegressor(**params).fit(X, df["Month"]),
+        "hour_model": XGBRegressor(**params).fit(X, df["Hour"]),
+        "selected_features": selected_features,
+        "feature_selector": selector,
+        "label_encoders": encoders,
+    }
+    if fused:
+        bundle["time_model"] = XGBRegressor(**params, tree_method="hist", multi_strategy="multi_output_tree").fit(
+            X, df[["Month", "Hour"]])
+    return bundle
+
+
+BUNDLES = {
+    "migration_prediction_model.pkl": presence_bundle,
+    "location_prediction_model.pkl": location_bundle,
+    "time_prediction_model.pkl": time_bundle,
+}
+
+
+# ✅ Function: Write All Three Bundles into a Models Folder (as served from GitHub)
+def write_bundles(directory, size="full", names=None):
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name in names or model_store.MODEL_NAMES:
+        paths[name] = os.path.join(directory, name)
+        joblib.dump(BUNDLES[name](size), paths[name])
+        logger.info(f"🧪 Stand-in {name} ({size}) written to {paths[name]}")
+    return paths
+
+
+if __name__ == "__main__":
+    # Usage: python stand_in_models.py <models dir> [full|small]
+    #        python local_model_server.py <models dir> 8765 & BIRD_MODEL_BASE_URL=http://127.0.0.1:8765 python presence.py
+    logging.basicConfig(level=logging.INFO)
+    write_bundles(sys.argv[1] if len(sys.argv) > 1 else "stand_in_models",
+                  sys.argv[2] if len(sys.argv) > 2 else "full")
@@ -0,0 +1,59 @@
+import datetime
+
+import fuzzy_resolver
+import query_tokenizer
+import vocabulary
+
+# ✅ Parse once, route many: the Rasa action server (or a gateway) parses the user's text once and sends
+# {"query": text, "features": {...}}; a service given "features" reads them with batch.structured_features
+# and skips query parsing entirely. The feature object is the one /batch already accepts:
+#   bird_name, locality       canonical names (left out when the query names none)
+#   year, month, day_of_week  the date the query refers to (day_of_week 0 = Monday)
+#   hour                      only when the query gives a clock time
+#   time_of_day               morning / afternoon / evening / night, only when named and no clock time
+#   time                      what the time service reads instead: {"year", "day_of_week"} as named in the
+#                             query (else today's), and every "seasons" / "parts_of_day" named, in order
+# Without hour / time_of_day the services use the current hour, as they do for query text.
+# Flask- and model-free, so actions.py can import it with this folder on its path.
+
+
+class QueryParser:
+    """Every feature the three services read from a query, from one tokenizer pass over the union of
+    their vocabularies (the names, aliases and locality export in vocabulary.py)."""
+
+    def __init__(self, birds=vocabulary.valid_bird_names, bird_aliases=vocabulary.bird_aliases,
+                 localities=vocabulary.valid_localities, locality_aliases=vocabulary.locality_aliases,
+                 locality_vocabulary=vocabulary.locality_vocabulary):
+        self.tokenizer = query_tokenizer.QueryTokenizer(birds, bird_aliases, localities, locality_aliases,
+                                                        locality_vocabulary=locality_vocabulary)
+        self.bird_resolver = fuzzy_resolver.FuzzyResolver(birds, bird_aliases)
+        self.locality_resolver = fuzzy_resolver.FuzzyResolver(list(localities) + list(locality_vocabulary),
+                                                              locality_aliases)
+
+    # ✅ Query Text -> Structured Feature Object (JSON-ready)
+    def parse(self, query, today=None, now=None):
+        tokens = self.tokenizer.tokenize(query)
+        found, whole_words = query_tokenizer.firsts(tokens)
+        today = today or datetime.date.today()
+        dates = query_tokenizer.date_time_features(tokens, today, now)
+        features = {"year": dates["year"], "month": dates["month"], "day_of_week": dates["day_of_week"]}
+        if "clock" in found:
+            features["hour"] = found["clock"].value
+        elif "part_of_day" in whole_words:
+            features["time_of_day"] = whole_words["part_of_day"].value
+        # The time service ignores relative dates and month words, and flags every season / part of day named
+        features["time"] = {
+            "year": found["year"].value if "year" in found else today.year,
+            "day_of_week": whole_words["weekday"].value if "weekday" in whole_words else today.weekday(),
+            "seasons": [token.value for token in tokens if token.kind == "season"],
+            "parts_of_day": [token.value for token in tokens if token.kind == "part_of_day"],
+        }
+
+        # Nothing spelled exactly: the closest name misspelled in the query, if one is close enough
+        bird = query_tokenizer.best(tokens, "bird") or self.bird_resolver.best_in(query)
+        locality = query_tokenizer.best(tokens, "locality") or self.locality_resolver.best_in(query)
+        if bird:
+            features["bird_name"] = bird
+        if locality:
+            features["locality"] = locality
+        return features
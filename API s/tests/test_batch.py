@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import batch
+
+
+@pytest.mark.parametrize("value", [float("inf"), float("-inf"), float("nan"), 1e400, 7.5, "7", True])
+def test_a_number_that_is_not_a_whole_number_is_refused(value):
+    with pytest.raises(ValueError, match="'hour' must be a whole number"):
+        batch.structured_features({"bird_name": "Red-vented Bulbul", "hour": value})
+
+
+@pytest.mark.parametrize("script, route", [("presence.py", "/predict_presence/batch"),
+                                           ("location.py", "/predict_location/batch"),
+                                           ("time.py", "/predict_best_time/batch")])
+def test_an_infinite_field_fails_its_item_not_the_batch(script, route):
+    from conftest import load_service
+
+    client = load_service(script).app.test_client()
+    good = {"bird_name": "Red-vented Bulbul", "locality": "Tissa Lake", "year": 2025, "month": 3}
+    # JSON Infinity and 1e400 both arrive as float("inf")
+    body = '{"items": [%s, {"bird_name": "Red-vented Bulbul", "year": Infinity}, {"bird_name": "Red-vented Bulbul", "day_of_week": 1e400}]}'
+    response = client.post(route, data=body % json.dumps(good), content_type="application/json")
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert response.get_json()["errors"] == 2
+    assert "error" not in results[0]
+    assert "whole number" in results[1]["error"] and "whole number" in results[2]["error"]
+
+
+@pytest.mark.parametrize("script, route", [("presence.py", "/predict_presence"), ("location.py", "/predict_location"),
+                                           ("time.py", "/predict_best_time")])
+def test_a_batch_answers_each_item_as_a_single_request_would(script, route):
+    import benchmarks
+    from conftest import load_service
+
+    client = load_service(script).app.test_client()
+    queries = benchmarks._sample_queries(30, seed=1)
+    results = client.post(route + "/batch", json={"items": queries}).get_json()["results"]
+    for index, (query, result) in enumerate(zip(queries, results)):
+        single = client.post(route, json={"query": query}).get_json()
+        assert result["index"] == index
+        assert {key: result[key] for key in single} == single, query
+        if "present" in result:
+            assert result["present"] == (result["probability"] >= 0.5) == (" is likely " in result["Response"])
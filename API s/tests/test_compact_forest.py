@@ -0,0 +1,21 @@
+import pytest
+
+import benchmarks
+import compact_forest
+import model_store
+
+
+@pytest.mark.parametrize("name", model_store.MODEL_NAMES)
+def test_the_compact_bundle_predicts_like_the_pickle(name, bundle, training_rows, tmp_path):
+    compact_path = compact_forest.save_compact(bundle(name), str(tmp_path / f"{name}.npz"))
+    model_data = compact_forest.load_compact(compact_path)
+    datasets = {key: training_rows(name, model_data["selected_features"]) for key in benchmarks.MODEL_KEYS[name]}
+    report = compact_forest.validate_compact(model_store.fetch_model(name), compact_path, datasets)
+    assert report["valid"], report["models"]
+
+
+def test_entries_with_no_compact_encoding_are_kept(bundle, tmp_path):
+    original = bundle("time_prediction_model.pkl")
+    model_data = compact_forest.load_compact(compact_forest.save_compact(original, str(tmp_path / "time.npz")))
+    assert type(model_data["feature_selector"]) is type(original["feature_selector"])
+    assert (model_data["feature_selector"].get_support() == original["feature_selector"].get_support()).all()
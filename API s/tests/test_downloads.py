@@ -0,0 +1,104 @@
+import os
+import time
+import hashlib
+
+import pytest
+import requests
+
+import local_model_server
+import model_store
+
+NAME = "synthetic_model.pkl"
+SIZE = 2 * 1024 * 1024
+
+
+def write_file(path, seed):
+    data = hashlib.sha256(str(seed).encode()).digest() * (SIZE // 32)
+    with open(path, "wb") as file:
+        file.write(data)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seed * 1_000_000_000))  # A new ETag every version
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def served(tmp_path, monkeypatch):
+    """A synthetic file behind local_model_server.py with injectable faults, and an empty store."""
+    served_dir = tmp_path / "served"
+    served_dir.mkdir()
+    monkeypatch.setattr(model_store, "STORE_DIR", str(tmp_path / "store"))
+    faults = local_model_server.Faults()
+    server, base_url = local_model_server.start_server(str(served_dir), faults=faults)
+    yield str(served_dir / NAME), f"{base_url}/{NAME}", faults
+    server.shutdown()
+
+
+def test_a_cut_download_resumes_to_the_right_digest(served):
+    path, url, faults = served
+    expected = write_file(path, 1)
+    faults.cut_after_bytes = [300_000, 900_000]
+    sha256, stored, _ = model_store._download_to_store(NAME, url, retries=3, segments=1)
+    assert sha256 == expected == model_store.file_sha256(stored)
+    ranges = [r for r, _, _ in faults.requests]
+    assert ranges[0] is None and len(ranges) == 3
+    offsets = [int(r[len("bytes="):-1]) for r in ranges[1:]]
+    assert 0 < offsets[0] <= 300_000 < offsets[1] <= 1_200_000  # Only the bytes already on disk are skipped
+    assert all(if_range for r, _, if_range in faults.requests if r)
+
+
+def test_the_next_start_resumes_what_a_failed_one_left(served):
+    path, url, faults = served
+    expected = write_file(path, 1)
+    faults.cut_after_bytes = [500_000]
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        model_store._download_to_store(NAME, url, retries=0, segments=1)
+    kept = os.path.getsize(model_store._partial_paths(NAME)[0])
+    sha256, _, _ = model_store._download_to_store(NAME, url, retries=0, segments=1)
+    assert sha256 == expected
+    assert kept and faults.requests[-1][0] == f"bytes={kept}-"
+
+
+def test_a_changed_file_restarts_the_download_instead_of_splicing_it(served):
+    path, url, faults = served
+    write_file(path, 1)
+    faults.cut_after_bytes = [500_000]
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        model_store._download_to_store(NAME, url, retries=0, segments=1)
+    expected = write_file(path, 2)
+    sha256, _, _ = model_store._download_to_store(NAME, url, retries=0, segments=1)
+    assert sha256 == expected
+
+
+def test_a_changed_file_restarts_a_download_in_ranges(served, monkeypatch):
+    monkeypatch.setattr(model_store, "SEGMENT_MIN_BYTES", 1)
+    path, url, faults = served
+    write_file(path, 1)
+    faults.cut_after_bytes = [None, 100_000]  # The first response only plans the ranges
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        model_store._download_to_store(NAME, url, retries=0, segments=4)
+    expected = write_file(path, 2)
+    sha256, _, _ = model_store._download_to_store(NAME, url, retries=0, segments=4)
+    assert sha256 == expected
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_a_503_is_retried(served, monkeypatch, segments):
+    monkeypatch.setattr(model_store, "SEGMENT_MIN_BYTES", 1)
+    path, url, faults = served
+    expected = write_file(path, 1)
+    faults.statuses = [503]
+    sha256, _, _ = model_store._download_to_store(NAME, url, retries=1, segments=segments)
+    assert sha256 == expected
+
+
+def test_a_failed_range_stops_the_others(served, monkeypatch):
+    monkeypatch.setattr(model_store, "SEGMENT_MIN_BYTES", 1)
+    path, url, faults = served
+    write_file(path, 1)
+    plan = model_store._download_single(NAME, url, None, 64 * 1024, model_store._Progress(None), 4)
+    faults.bytes_per_second = 256 * 1024  # Each 512KB range would take 2s
+    faults.statuses = [404]
+    start = time.perf_counter()
+    with pytest.raises(requests.HTTPError):
+        model_store._download_segments(NAME, plan, 64 * 1024, model_store._Progress(None), retries=0)
+    assert time.perf_counter() - start < 1.5
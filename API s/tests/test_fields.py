@@ -0,0 +1,59 @@
+import pytest
+
+SERVICES = [("presence.py", "/predict_presence"), ("location.py", "/predict_location"),
+            ("time.py", "/predict_best_time")]
+
+
+@pytest.mark.parametrize("script, route", SERVICES)
+def test_the_web_form_may_call_every_fields_endpoint_from_another_origin(script, route):
+    from conftest import load_service
+
+    client = load_service(script).app.test_client()
+    headers = {"Origin": "http://localhost:8000"}
+    assert client.get(route + "/fields", headers=headers).headers.get("Access-Control-Allow-Origin")
+    preflight = client.options(route + "/fields", headers={**headers, "Access-Control-Request-Method": "POST",
+                                                            "Access-Control-Request-Headers": "Content-Type"})
+    assert preflight.headers.get("Access-Control-Allow-Origin")
+
+
+def test_every_invalid_field_is_reported_at_once():
+    import request_schema
+
+    schema = request_schema.form_schema(["Red-vented Bulbul"], ["Tissa Lake"], seasons=True)
+    with pytest.raises(request_schema.SchemaError) as error:
+        schema.validate({"bird_name": "Dodo", "date": "14/03/2025", "hour": True, "time_of_day": "dusk",
+                         "season": 3, "colour": "red"})
+    assert set(error.value.errors) == {"bird_name", "date", "hour", "time_of_day", "season", "colour", "locality"}
+    assert error.value.errors["locality"] == "required" and error.value.errors["colour"] == "unknown field"
+    with pytest.raises(request_schema.SchemaError, match="between 0 and 23"):
+        schema.validate({"bird_name": "Red-vented Bulbul", "locality": "Tissa Lake", "hour": 24})
+
+
+def test_names_are_matched_in_any_case_and_returned_as_listed():
+    import datetime
+    import request_schema
+
+    schema = request_schema.form_schema(["Red-vented Bulbul"], ["Tissa Lake"])
+    values = schema.validate({"bird_name": " red-VENTED bulbul ", "locality": "tissa lake", "date": "2025-03-14"})
+    assert values == {"bird_name": "Red-vented Bulbul", "locality": "Tissa Lake", "date": datetime.date(2025, 3, 14)}
+
+
+@pytest.mark.parametrize("script, route", SERVICES)
+def test_fields_requests_answer_like_the_same_question_as_text(script, route):
+    import datetime
+    from conftest import load_service
+
+    service = load_service(script)
+    client = service.app.test_client()
+    schema = client.get(route + "/fields").get_json()
+    assert schema["bird_name"]["required"] and "Red-vented Bulbul" in schema["bird_name"]["choices"]
+    for day, part in ((3, "morning"), (40, "evening"), (200, "night")):
+        date = datetime.date(2025, 1, 1) + datetime.timedelta(days=day)
+        body = {"bird_name": "Red-vented Bulbul", "date": date.isoformat(), "time_of_day": part}
+        if "locality" in schema:
+            body["locality"] = "Tissa Lake"
+        # The text names the month and weekday, which the parser reads as the first such weekday of the month
+        text = f"Can I see a Red-vented Bulbul at {body.get('locality', 'a good spot')} on {date:%A %B %Y} in the {part}?"
+        fields = client.post(route + "/fields", json=body)
+        assert fields.status_code == 200
+        assert fields.get_json() == client.post(route, json={"query": text}).get_json()
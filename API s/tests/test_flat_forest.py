@@ -0,0 +1,24 @@
+import pytest
+
+import benchmarks
+import flat_forest
+import model_store
+
+
+@pytest.mark.parametrize("name", model_store.MODEL_NAMES)
+def test_flattened_models_predict_exactly_like_the_originals(name, bundle, training_rows):
+    model_data = bundle(name)
+    X = training_rows(name, model_data["selected_features"])
+    for key in benchmarks.MODEL_KEYS[name]:
+        parity = flat_forest.check_parity(model_data[key], flat_forest.flatten(model_data[key]), X)
+        assert parity["identical"], f"{name} [{key}]: max diff {parity['max_abs_diff']}"
+
+
+@pytest.mark.parametrize("name", model_store.MODEL_NAMES)
+def test_saved_node_arrays_load_memory_mapped_with_the_same_outputs(name, bundle, training_rows, tmp_path):
+    model_data = bundle(name)
+    X = training_rows(name, model_data["selected_features"])[:500]
+    for key in benchmarks.MODEL_KEYS[name]:
+        flat = flat_forest.flatten(model_data[key])
+        flat_forest.save(flat, str(tmp_path), key)
+        assert flat_forest.check_parity(model_data[key], flat_forest.load(str(tmp_path), key), X)["identical"]
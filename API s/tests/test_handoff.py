@@ -0,0 +1,78 @@
+import os
+import importlib.util
+
+import pytest
+
+import structured_request
+
+ACTIONS = os.path.join(os.path.dirname(__file__), "..", "..", "Migration model", "Other", "actions.py")
+
+
+@pytest.fixture(scope="module")
+def actions():
+    pytest.importorskip("rasa_sdk")
+    spec = importlib.util.spec_from_file_location("bird_actions", ACTIONS)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_action_payload_carries_the_parsed_features(actions):
+    query = "Can I see a Red-vented Bulbul at Tissa Lake on friday in march in the morning?"
+    payload = actions.build_payload(query)
+    assert payload["query"] == query
+    assert payload["features"] == structured_request.QueryParser().parse(query)
+
+
+def test_action_payload_falls_back_to_the_text_when_the_date_does_not_exist(actions):
+    assert actions.build_payload("bulbul at tissa lake on february 30") == {"query": "bulbul at tissa lake on february 30"}
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return structured_request.QueryParser()
+
+
+def test_a_day_of_the_month_is_not_read_as_an_hour(parser):
+    features = parser.parse("Can I see a bulbul at Tissa Lake on 31 march?")
+    assert "hour" not in features and features["month"] == 3
+    assert parser.parse("bulbul at yala on 24 june at 7am")["hour"] == 7
+
+
+@pytest.mark.parametrize("script", ["presence.py", "location.py", "time.py"])
+def test_feature_requests_answer_like_text_requests(script, parser):
+    from conftest import load_service
+    import benchmarks
+
+    service = load_service(script)
+    route = benchmarks.SERVICES[script][1]
+    client = service.app.test_client()
+    for query in benchmarks._sample_queries(40, seed=6) + benchmarks.HANDOFF_EDGE_QUERIES:
+        text = client.post(route, json={"query": query})
+        features = client.post(route, json={"query": query, "features": parser.parse(query)})
+        assert (features.status_code, features.get_json()) == (text.status_code, text.get_json()), query
+
+
+def test_time_service_reads_the_same_features_from_either_path(time_service, parser):
+    import benchmarks
+
+    for query in benchmarks._time_queries(300) + benchmarks.HANDOFF_EDGE_QUERIES:
+        structured = time_service.structured_time_features(parser.parse(query))
+        assert structured == time_service.extract_query_features_time(query), query
+
+
+def test_time_service_ignores_the_month_and_hour_it_predicts(time_service):
+    features = time_service.structured_time_features({"bird_name": "Red-vented Bulbul", "hour": 31, "month": 13})
+    assert features["bird_name"] == "Red-vented Bulbul"
+
+
+def test_the_hour_decides_the_part_of_day_when_both_are_sent():
+    import batch
+    import request_schema
+
+    features = batch.structured_features({"bird_name": "Red-vented Bulbul", "hour": 7, "time_of_day": "evening"})
+    assert (features["hour"], features["time_of_day"]) == (7, "morning")
+    assert request_schema.to_features({"bird_name": "Red-vented Bulbul", "hour": 21, "time_of_day": "morning"})[
+        "time_of_day"] == "night"
+    with pytest.raises(ValueError, match="time_of_day"):
+        batch.structured_features({"bird_name": "Red-vented Bulbul", "hour": 7, "time_of_day": "dusk"})
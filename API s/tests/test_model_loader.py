@@ -0,0 +1,21 @@
+import time
+
+import model_loader
+
+
+def test_the_first_load_is_warmed_before_it_is_served(monkeypatch):
+    model = model_loader.BackgroundModel("time_prediction_model.pkl", max_attempts=1)
+    warmed = []
+    real_warm_up = model_loader.warm_up
+
+    def warm_up(model_data):
+        warmed.append(model.ready)
+        real_warm_up(model_data)
+
+    monkeypatch.setattr(model_loader, "warm_up", warm_up)
+    model.start()
+    deadline = time.monotonic() + 60
+    while not model.ready and model.status()["state"] != "failed" and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert model.ready, model.status()
+    assert warmed == [False]
@@ -0,0 +1,14 @@
+import benchmarks
+
+
+def test_the_answer_follows_the_decision_for_single_and_batch_requests(presence):
+    client = presence.app.test_client()
+    for cache in (presence.query_cache, presence.feature_cache):
+        cache.clear()
+    queries = benchmarks._sample_queries(60, seed=3)
+    results = client.post("/predict_presence/batch", json={"items": queries}).get_json()["results"]
+    assert {result["present"] for result in results} == {True, False}, "the sample should cover both decisions"
+    for query, result in zip(queries, results):
+        assert (" is likely " in result["Response"]) == result["present"]
+        assert (" is unlikely " in result["Response"]) != result["present"]
+        assert client.post("/predict_presence", json={"query": query}).get_json() == {"Response": result["Response"]}
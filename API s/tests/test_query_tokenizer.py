@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+import benchmarks
+import query_tokenizer
+
+PARSERS = [("presence.py", "extract_query_features_bird_presence"), ("location.py", "extract_query_features"),
+           ("time.py", "extract_query_features_time")]
+
+
+@pytest.mark.parametrize("script, parse", PARSERS)
+def test_the_tokenizer_reads_the_features_the_regex_parsers_read(script, parse):
+    from conftest import load_service
+
+    service = load_service(script)
+    rng = np.random.default_rng(4)
+    extras = ["tomorrow", "day after tomorrow", "next week", "in 3 days", "at 6:30 pm", "on 15", "summer", "winter"]
+    for query in benchmarks._sample_queries(500, seed=4):
+        query += f" {rng.choice(extras)}" if rng.random() < 0.5 else ""
+        expected = benchmarks._legacy_parse(service, query)
+        parsed = getattr(service, parse)(query)
+        assert {key: parsed[key] for key in expected} == expected, query
+
+
+def test_names_and_date_words_start_at_a_word_start():
+    tokenizer = query_tokenizer.QueryTokenizer()
+    kinds = {token.kind for token in tokenizer.tokenize("in a fortnight") if token.whole_word}
+    assert "part_of_day" not in kinds
+    assert [token.value for token in tokenizer.tokenize("at night") if token.kind == "part_of_day"] == ["night"]
+
+
+@pytest.mark.parametrize("query, hour", [("at 7am", 7), ("at 12 am", 0), ("at 6:30 pm", 18), ("at 12pm", 12),
+                                         ("at 23", 23), ("on 31 march", None), ("on 15", None), ("at 31", None),
+                                         ("in march 2025 in the morning", None), ("at 2025", None)])
+def test_clock_times(query, hour):
+    found, _ = query_tokenizer.firsts(query_tokenizer.QueryTokenizer().tokenize(query))
+    assert (found["clock"].value if "clock" in found else None) == hour
@@ -0,0 +1,61 @@
+import time
+
+import response_cache
+
+
+def test_the_key_ignores_feature_order():
+    a = {"year": 2025, "month": 3, "hour": 7, "bird_name": "Red-vented Bulbul"}
+    b = dict(reversed(list(a.items())))
+    assert response_cache.canonical(a) == response_cache.canonical(b)
+    assert response_cache.canonical(a) != response_cache.canonical({**a, "hour": 8})
+    assert hash(response_cache.canonical(a)) == hash(response_cache.canonical(b))
+
+
+def test_least_recently_used_entries_are_evicted_first():
+    cache = response_cache.ResponseCache("test", maxsize=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_at_the_ttl_or_their_own_expiry(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = response_cache.ResponseCache("test", maxsize=10, ttl=60)
+    cache.put("ttl", 1)
+    cache.put("hour", 2, expires_at=now[0] + 10)
+    now[0] += 11
+    assert (cache.get("ttl"), cache.get("hour")) == (1, None)
+    now[0] += 50
+    assert cache.get("ttl") is None
+    assert cache.stats()["expired"] == 2
+
+
+def test_size_zero_turns_the_cache_off():
+    cache = response_cache.ResponseCache("test", maxsize=0)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.get("a") is None and cache.stats()["size"] == 0
+
+
+def test_phrasings_of_the_same_features_share_one_entry(presence):
+    client = presence.app.test_client()
+    for cache in (presence.query_cache, presence.feature_cache):
+        cache.clear()
+    first = client.post("/predict_presence", json={"query": "Can I see a Red-vented Bulbul at Tissa Lake on friday in march 2025 in the morning?"})
+    second = client.post("/predict_presence", json={"query": "red-vented bulbul, tissa, morning, march 2025, friday"})
+    assert first.get_json() == second.get_json()
+    stats = presence.feature_cache.stats()
+    assert (stats["size"], stats["hits"]) == (1, 1)
+
+
+def test_a_new_model_version_never_reads_the_old_entries(presence):
+    presence.feature_cache.clear()
+    model_data = presence.model.get()
+    features = presence.extract_query_features_bird_presence("Red-vented Bulbul at Tissa Lake in march 2025 at 7am")
+    presence.cached_presence_prediction(model_data, features)
+    presence.cached_presence_prediction({**model_data, "model_version": "next"}, features)
+    stats = presence.feature_cache.stats()
+    assert (stats["size"], stats["hits"]) == (2, 0)
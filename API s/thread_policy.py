@@ -0,0 +1,135 @@
+import os
+import logging
+import threading
+import contextlib
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# ✅ Model-internal threads per call, sized for the whole box. Every gunicorn worker would otherwise
+# let sklearn (joblib) and XGBoost (OpenMP) start one thread per core on every predict, so W workers
+# run W x cores threads and p99 explodes. Single-row requests use BIRD_SINGLE_ROW_THREADS (1) and
+# calls with at least BIRD_BATCH_MIN_ROWS rows use BIRD_MODEL_THREADS, by default cores / workers.
+
+CPU_COUNT = os.cpu_count() or 1
+WORKERS = int(os.environ.get("BIRD_WORKERS", os.environ.get("WEB_CONCURRENCY", "1")))
+BATCH_THREADS = int(os.environ.get("BIRD_MODEL_THREADS", "0")) or max(1, CPU_COUNT // max(WORKERS, 1))
+SINGLE_ROW_THREADS = int(os.environ.get("BIRD_SINGLE_ROW_THREADS", "1"))
+BATCH_MIN_ROWS = int(os.environ.get("BIRD_BATCH_MIN_ROWS", "64"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# XGBoost reads nthread from the booster, and set_param on a booster other threads are predicting
+# with is not safe, so each thread count gets its own booster copy
+_boosters = weakref.WeakKeyDictionary()
+_boosters_lock = threading.Lock()
+
+
+# ✅ Function: How Many Model Threads a Call on `rows` Rows May Use
+def threads_for(rows):
+    return BATCH_THREADS if rows >= BATCH_MIN_ROWS else SINGLE_ROW_THREADS
+
+
+def _limit_native_pools(threads):
+    """Cap OpenMP/BLAS pools process-wide (threadpoolctl ships with scikit-learn)."""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+    threadpool_limits(limits=threads)
+
+
+# ✅ Function: Apply the Policy to a Freshly Loaded Bundle (runs on every load and reload)
+def attach(model_data):
+    """sklearn forests drop their pickled n_jobs (often -1 = every core) so the per-call joblib
+    setting applies; XGBoost boosters start at the single-row thread count."""
+    for estimator in list(model_data.values()):
+        if hasattr(estimator, "kind"):  # flat_forest / compact_forest models never start threads
+            continue
+        if hasattr(estimator, "estimators_") and hasattr(estimator, "n_jobs"):
+            estimator.n_jobs = None
+        if hasattr(estimator, "get_booster"):
+            estimator.get_booster().set_param({"nthread": SINGLE_ROW_THREADS})
+    _limit_native_pools(BATCH_THREADS)  # Pools of libraries that loaded with the models
+    return model_data
+
+
+def booster(estimator, threads):
+    """The estimator's booster with nthread=threads (a cached copy unless it is the single-row count)."""
+    base = estimator.get_booster()
+    if threads == SINGLE_ROW_THREADS:
+        return base
+    with _boosters_lock:
+        copies = _boosters.setdefault(estimator, {})
+        if threads not in copies:
+            copy = base.copy()
+            copy.set_param({"nthread": threads})
+            copies[threads] = copy
+        return copies[threads]
+
+
+def pool():
+    """Shared pool that batch calls split an sklearn forest's trees across (tree predict releases the GIL)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix="model-threads")
+        return _pool
+
+
+# ✅ Context Manager: joblib Thread Count for sklearn Calls That Go Through predict_proba/predict
+@contextlib.contextmanager
+def joblib_threads(threads):
+    try:
+        from joblib import parallel_config
+    except ImportError:  # joblib < 1.3
+        yield
+        return
+    with parallel_config(backend="threading", n_jobs=threads):
+        yield
+
+
+# ✅ Function: Change the Thread Settings at Runtime (benchmarks; new pools and booster copies)
+def configure(workers=None, batch_threads=None, single_row_threads=None, batch_min_rows=None):
+    global WORKERS, BATCH_THREADS, SINGLE_ROW_THREADS, BATCH_MIN_ROWS, _pool
+    with _pool_lock:
+        WORKERS = WORKERS if workers is None else workers
+        if batch_threads is not None or workers is not None:
+            BATCH_THREADS = batch_threads or max(1, CPU_COUNT // max(WORKERS, 1))
+        SINGLE_ROW_THREADS = SINGLE_ROW_THREADS if single_row_threads is None else single_row_threads
+        BATCH_MIN_ROWS = BATCH_MIN_ROWS if batch_min_rows is None else batch_min_rows
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+    with _boosters_lock:
+        _boosters.clear()
+    _limit_native_pools(BATCH_THREADS)
+
+
+def settings():
+    return {
+        "cpu_count": CPU_COUNT,
+        "workers": WORKERS,
+        "batch_threads": BATCH_THREADS,
+        "single_row_threads": SINGLE_ROW_THREADS,
+        "batch_min_rows": BATCH_MIN_ROWS,
+        "threads_total": WORKERS * BATCH_THREADS,
+    }
+
+
+# ✅ Function: Add /runtime/threads (the worker x thread settings this process runs with)
+def register_settings_route(app):
+    @app.route("/runtime/threads", methods=["GET"])
+    def runtime_threads():
+        return jsonify(settings()), 200
+
+
+# OpenMP/BLAS read these when they load; pools that loaded before this module are capped in attach()
+for _variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_variable, str(BATCH_THREADS))
+if WORKERS * BATCH_THREADS > CPU_COUNT:
+    logger.warning(f"⚠️ {WORKERS} workers x {BATCH_THREADS} model threads exceeds {CPU_COUNT} cores")
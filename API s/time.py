@@ -1,51 +1,44 @@
 from flask import Flask, request, jsonify
-import joblib
-import pandas as pd
-import numpy as np
-import re
+from flask_cors import CORS
 import datetime
-from difflib import get_close_matches
-from rapidfuzz import process
-import requests
-import io
 import logging
 
+import batch
+import fuzzy_resolver
+import feature_assembler
+import micro_batch
+import query_tokenizer
+import request_schema
+import response_cache
+import single_flight
+import thread_policy
+from label_registry import UnknownLabelError
+from vocabulary import valid_localities, valid_bird_names, bird_aliases, locality_aliases, locality_vocabulary
+
+import model_loader
+
 app = Flask(__name__)
+CORS(app)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ✅ Load Model & Encoders from GitHub
-MODEL_URL = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/time_prediction_model.pkl"
-
-def load_model():
-    response = requests.get(MODEL_URL)
-    response.raise_for_status()
-    return joblib.load(io.BytesIO(response.content))
-
-model_data = load_model()
-month_model = model_data['month_model']
-hour_model = model_data['hour_model']
-selected_features = model_data['selected_features']
-label_encoders = model_data['label_encoders']
-
-# ✅ Define Valid Localities and Bird Names
-valid_localities = [
-    "Buckingham Place Hotel Tangalle", "Bundala NP General", "Bundala National Park",
-    "Kalametiya", "Tissa Lake", "Yala National Park General", "Debarawewa Lake"
-]
-valid_bird_names = ["Blue-tailed Bee-eater", "Red-vented Bulbul", "White-throated Kingfisher"]
-
-bird_aliases = {
-    "blue tailed bird": "Blue-tailed Bee-eater",
-    "bee eater": "Blue-tailed Bee-eater",
-    "blue bird": "Blue-tailed Bee-eater",
-    "red bird": "Red-vented Bulbul",
-    "bulbul": "Red-vented Bulbul",
-    "white bird": "White-throated Kingfisher",
-    "kingfisher": "White-throated Kingfisher"
-}
+# ✅ Load Model & Encoders in the Background (the app serves /healthz and /readyz while it loads)
+MODEL_NAME = "time_prediction_model.pkl"
+
+model = model_loader.BackgroundModel(MODEL_NAME).start()
+model_loader.register_health_routes(app, model)
+model_loader.register_admin_routes(app, model)
+
+# ✅ Response Caches (the parser reads the date but never the hour, so query entries expire at midnight)
+query_cache = response_cache.ResponseCache("time-query")
+feature_cache = response_cache.ResponseCache("time-features")
+flight = single_flight.SingleFlight("time-model")
+response_cache.register_cache_routes(app, query_cache, feature_cache, flight)
+micro_batch.register_stats_route(app)
+thread_policy.register_settings_route(app)
 
+# ✅ Season & Part-of-Day Flag Columns
 season_aliases = {"summer": "Is_Summer", 
                   "winter": "Is_Winter", 
                   "spring": "Is_Spring", 
@@ -56,55 +49,21 @@ time_period_aliases = {"morning": "Is_Morning",
                        "evening": "Is_Evening", 
                        "night": "Is_Night"}
 
+# ✅ Localities the Model Can Be Asked About (service list + cleaned eBird export)
+known_localities = set(valid_localities) | set(locality_vocabulary)
+
+# ✅ Typo-Tolerant Lookups (trigram index over the names, aliases and locality vocabulary in vocabulary.py)
+bird_resolver = fuzzy_resolver.FuzzyResolver(valid_bird_names, bird_aliases)
+locality_resolver = fuzzy_resolver.FuzzyResolver(valid_localities + locality_vocabulary, locality_aliases)
+
 # ✅ Helper Function: Correct Bird Name
 def correct_bird_name(name):
-    name = name.lower()
-    if name in bird_aliases:
-        return bird_aliases[name]
-    matches = get_close_matches(name, [b.lower() for b in valid_bird_names], n=1, cutoff=0.3)
-    return next((b for b in valid_bird_names if b.lower() == matches[0]), "Unknown Bird")
-
-# ✅ Helper Function: Convert Day Name to Integer
-def day_name_to_int(day_name):
-    days_map = {
-        "monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3,
-        "friday": 4, "saturday": 5, "sunday": 6
-    }
-    return days_map.get(day_name.lower(), None)
+    return bird_resolver.best(name) or "Unknown Bird"
 
 # ✅ Helper Function: Correct Locality
 def correct_locality(user_input):
-    user_input = user_input.lower()
-    for loc in valid_localities:
-        if user_input == loc.lower():
-            return loc
-        if user_input in loc.lower():
-            return loc  
-        
-    manual_mappings = {
-        "bundala": "Bundala NP General",
-        "yala": "Yala National Park General",
-        "tissa": "Tissa Lake",
-        "debara": "Debarawewa Lake",
-        "kalametiya": "Kalametiya Bird Sanctuary"
-    }
-    return manual_mappings.get(user_input, "Unknown Location")
-
+    return locality_resolver.best(user_input) or "Unknown Location"
 
-def parse_approximate_date(expression):
-    today = datetime.date.today()
-    date_mappings = {
-        "tomorrow": today + datetime.timedelta(days=1),
-        "day after tomorrow": today + datetime.timedelta(days=2),
-        "next week": today + datetime.timedelta(weeks=1)
-        
-    }
-    if expression in date_mappings:
-        return date_mappings[expression]
-    match = re.search(r"in (\d+) days", expression)
-    if match:
-        return today + datetime.timedelta(days=int(match.group(1)))
-    return None  
 
 def get_current_season():
     """Returns the current season based on the current month."""
@@ -118,101 +77,186 @@ def get_current_season():
     else:  # September, October, November
         return "Is_Autumn"
 
+# ✅ Query Tokenizer (compiled once from the names, aliases and locality vocabulary in vocabulary.py)
+tokenizer = query_tokenizer.QueryTokenizer(valid_bird_names, bird_aliases, valid_localities, locality_aliases,
+                                           kinds=("year", "weekday", "part_of_day", "season", "bird", "locality"),
+                                           locality_vocabulary=locality_vocabulary)
+
 # ✅ Extract Features from Query
 def extract_query_features_time(query):
-    query = query.lower()
+    tokens = tokenizer.tokenize(query)
+    found, whole_words = query_tokenizer.firsts(tokens)
     today = datetime.date.today()
-    
-    # ✅ Extract Year (Defaults to Current Year)
-    year_match = re.search(r'\b(20[0-9]{2})\b', query)
-    year = int(year_match.group()) if year_match else today.year
-    
-
-    
-    
-    day_name_match = re.search(r'\b(monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b', query)
-    day_of_week = day_name_to_int(day_name_match.group()) if day_name_match else datetime.datetime.today().weekday()
-    
-    day_name = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"][day_of_week]
-
-    
-
-    locality = None
-    for loc in valid_localities:
-        if loc.lower() in query:
-            locality = loc
-            break  # Stop at first match
-    
-    # ✅ Handle Locality Aliases (Bundala -> Bundala NP General)
-    if not locality:
-        for alias, correct_loc in {
-            "bundala": "Bundala NP General",
-            "yala": "Yala National Park General",
-            "tissa": "Tissa Lake",
-            "debara": "Debarawewa Lake",
-            "kalametiya": "Kalametiya Bird Sanctuary"
-        }.items():
-            if alias in query:
-                locality = correct_loc
-                break
-            
-    bird_name = None
-    for bird in valid_bird_names:
-        if bird.lower() in query:
-            bird_name = bird
-            break
-    
-    # ✅ Handle Bird Aliases (blue bird -> Blue-tailed Bee-eater)
-    if not bird_name:
-        for alias, correct_name in bird_aliases.items():
-            if alias in query:
-                bird_name = correct_name
-                break
-
-    season_flags = {season: 0 for season in season_aliases.values()}
-    found_season = False
-
-    for season, flag in season_aliases.items():
-        if season in query:
-            season_flags[flag] = 1
-            found_season = True
-
-    if not found_season:  # ✅ If no season found, use the current season
-        current_season_flag = get_current_season()
-        season_flags[current_season_flag] = 1
-    
-    time_period_flags = {time: 0 for time in time_period_aliases.values()}
-
-    for season, flag in season_aliases.items():
-        if season in query:
-            season_flags[flag] = 1
-
-    for time, flag in time_period_aliases.items():
-        if time in query:
-            time_period_flags[flag] = 1
+
+    # ✅ Year and Day Name (Default to Today)
+    year = found["year"].value if "year" in found else today.year
+    day_of_week = whole_words["weekday"].value if "weekday" in whole_words else today.weekday()
+    day_name = query_tokenizer.DAY_NAMES[day_of_week]
+
+    # ✅ Every Season / Part of Day Mentioned (No Season: the Current One)
+    seasons = [token.value for token in tokens if token.kind == "season"]
+    parts_of_day = [token.value for token in tokens if token.kind == "part_of_day"]
 
     return {
         "year": year,
         "day_of_week": day_of_week,
-        "locality": locality,
-        "bird_name": bird_name,
+        # Nothing spelled exactly: the closest name misspelled in the query, if one is close enough
+        "locality": query_tokenizer.best(tokens, "locality") or locality_resolver.best_in(query),
+        "bird_name": query_tokenizer.best(tokens, "bird") or bird_resolver.best_in(query),
         "day_name": day_name,
-        **season_flags,
-        **time_period_flags
+        **time_flags(seasons, parts_of_day)
+    }
+
+# ✅ Function: Model Input Row for One Query
+def time_row(features, locality_encoded, bird_name_encoded):
+    return {
+        "OBSERVATION": 1, "Year": features["year"], "Day_of_Week": features["day_of_week"],
+        "LOCALITY_ENCODED": locality_encoded, "COMMON NAME_ENCODED": bird_name_encoded,
+        **{flag: features[flag] for flag in (*season_aliases.values(), *time_period_aliases.values())},
+    }
+
+
+# ✅ Function: Response Body from the Predicted Month & Hour
+def time_response(features, predicted_month, predicted_hour):
+    months_map = {1: "January", 2: "February", 3: "March", 4: "April", 5: "May", 6: "June",
+                  7: "July", 8: "August", 9: "September", 10: "October", 11: "November", 12: "December"}
+    month_name = months_map.get(predicted_month, f"Unknown ({predicted_month})")
+
+    am_pm = "a.m." if predicted_hour < 12 else "p.m."
+    formatted_hour = predicted_hour if predicted_hour <= 12 else predicted_hour - 12
+    if formatted_hour == 0:
+        formatted_hour = 12
+
+    return {
+        "Response": (
+            f"The {features['bird_name']} can be seen "
+            f"at {features['locality']} on a {features['day_name']}, "
+            f"at {formatted_hour}:00 {am_pm} "
+            f"in {month_name}."
+        )
+    }
+
+
+# ✅ Function: Season & Part-of-Day Flags (only those named; no season named: the current one)
+def time_flags(seasons=(), parts_of_day=()):
+    for kind, names, aliases in (("season", seasons, season_aliases), ("time_of_day", parts_of_day, time_period_aliases)):
+        if not isinstance(names, (list, tuple)):
+            raise ValueError(f"{kind} must be a list of names, got {names!r}")
+        for name in names:
+            if name not in aliases:
+                raise ValueError(f"Unknown {kind}: {name!r}")
+    flags = {flag: int(season in seasons) for season, flag in season_aliases.items()}
+    if not seasons:
+        flags[get_current_season()] = 1
+    flags.update({flag: int(part in parts_of_day) for part, flag in time_period_aliases.items()})
+    return flags
+
+
+# ✅ Function: Dated Features (batch.py / request_schema.py) -> the Keys extract_query_features_time Returns
+def time_features(features, seasons=(), parts_of_day=()):
+    return {
+        "year": features["year"],
+        "day_of_week": features["day_of_week"],
+        "locality": features["locality"],
+        "bird_name": features["bird_name"],
+        "day_name": features["day_name"],
+        **time_flags(seasons, parts_of_day)
     }
 
+
+# ✅ Function: Time Features for a Structured Batch Item
+def structured_time_features(item):
+    """structured_request.py sends the query's reading for this service under "time" (the named year and
+    day, every season and part of day named); plain feature objects give one season / time_of_day."""
+    reading = item.get("time", {}) if isinstance(item, dict) else {}
+    if not isinstance(reading, dict):
+        raise ValueError(f"time must be an object, got {reading!r}")
+    # The month and hour are what this service predicts, so they are neither read nor validated
+    item = {key: value for key, value in item.items() if key not in ("month", "hour")}
+    features = batch.structured_features({**item, **reading} if reading else item)
+    seasons = reading.get("seasons", [item["season"]] if item.get("season") else [])
+    parts_of_day = reading.get("parts_of_day", [item["time_of_day"]] if item.get("time_of_day") else [])
+    return time_features(features, seasons, parts_of_day)
+
+
+# ✅ Function: Month & Hour for Every Row (one traversal when the bundle has the multi-output time_model)
+def predict_month_hour(model_data, input_data, distinct=False):
+    if 'time_model' in model_data:
+        (outputs,) = feature_assembler.predict_each([model_data['time_model']], input_data, distinct)
+        return outputs[:, 0], outputs[:, 1]
+    return feature_assembler.predict_each([model_data['month_model'], model_data['hour_model']],
+                                          input_data, distinct)
+
+
+# ✅ Function: Month & Hour Models -> Response Body
+def time_prediction(model_data, features, locality_encoded, bird_name_encoded):
+    input_data = feature_assembler.for_features(model_data['selected_features']).assemble(
+        time_row(features, locality_encoded, bird_name_encoded))
+
+    if not micro_batch.ENABLED:
+        months, hours = predict_month_hour(model_data, input_data)
+    elif 'time_model' in model_data:
+        outputs = micro_batch.submit("time_model", "predict", model_data['time_model'], input_data).result()
+        months, hours = outputs[:, 0], outputs[:, 1]
+    else:
+        # Both queued before waiting on either, so the two models' batches run back to back
+        month_rows = micro_batch.submit("month_model", "predict", model_data['month_model'], input_data)
+        hour_rows = micro_batch.submit("hour_model", "predict", model_data['hour_model'], input_data)
+        months, hours = month_rows.result(), hour_rows.result()
+    predicted_month = int(round(float(months[0])))
+    predicted_hour = int(round(float(hours[0])))
+
+    return time_response(features, predicted_month, predicted_hour)
+
+
+# ✅ Function: Feature Cache, Else One Model Call Shared by Identical Concurrent Requests
+def cached_time_prediction(model_data, features):
+    label_registry = model_data['label_registry']
+
+    # ✅ Other Phrasings of the Same Features Share One Entry
+    feature_key = (model_data['model_version'], response_cache.canonical(features))
+    response = feature_cache.get(feature_key)
+    if response is not None:
+        return response
+
+    # ✅ Encode Locality & Bird Name
+    locality_encoded = label_registry.encode('LOCALITY', features["locality"])
+    bird_name_encoded = label_registry.encode('COMMON NAME', features["bird_name"])
+
+    # ✅ The Leader Fills the Feature Cache
+    return flight.do(feature_key, lambda: feature_cache.put(
+        feature_key, time_prediction(model_data, features, locality_encoded, bird_name_encoded)))
+
+
 # ✅ API Endpoint for Rasa Chatbot
 @app.route('/predict_best_time', methods=['POST'])
+@model_loader.require_model(model)
 def predict_best_time():
     try:
+        model_data = model.get()
+
         data = request.get_json()
         query = data.get("query", "").strip()
         logger.info(f"🔍 Received Query: {query}")
 
-        if not query:
-            return jsonify({"error": "No query provided"}), 400
-
-        features = extract_query_features_time(query)
+        if "features" in data:
+            # ✅ Features Parsed Upstream (structured_request.py) -> No Query Parsing Here
+            query_key = None
+            try:
+                features = structured_time_features(data["features"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            if not query:
+                return jsonify({"error": "No query provided"}), 400
+
+            # ✅ Same Query Text Since Midnight -> Cached Response
+            query_key = (model_data['model_version'], query.lower())
+            response = query_cache.get(query_key)
+            if response is not None:
+                return jsonify(response), 200
+
+            features = extract_query_features_time(query)
 
         # ✅ Ensure Locality and Bird Name Are Not Missing Before Encoding
         if features["locality"] == "Unknown Location" or features["locality"] is None:
@@ -232,55 +276,108 @@ def predict_best_time():
                 "valid_bird_names": valid_bird_names
             }), 400  # ✅ Ensure we return and STOP execution
 
-        # ✅ Encode Locality & Bird Name
+        # ✅ Check Locality & Bird Name, Then Encode (cached features passed these checks already)
         try:
-            if features["locality"] not in valid_localities:
+            if features["locality"] not in known_localities:
                 raise ValueError(f"Invalid locality: {features['locality']}")
 
             if features["bird_name"] not in valid_bird_names:
                 raise ValueError(f"Invalid bird name: {features['bird_name']}")
 
-            locality_encoded = label_encoders['LOCALITY'].transform([features["locality"]])[0]
-            bird_name_encoded = label_encoders['COMMON NAME'].transform([features["bird_name"]])[0]
+            response = cached_time_prediction(model_data, features)
+
+        except UnknownLabelError as e:
+            logger.error(f"Encoding Error: {e}")
+            return jsonify(e.to_dict()), 400
 
         except ValueError as e:
             logger.error(f"Encoding Error: {e}")
             return jsonify({"error": f"Invalid input detected: {str(e)}"}), 400  # ✅ Return proper error message
 
+        if query_key:
+            query_cache.put(query_key, response, expires_at=response_cache.next_midnight())
+
+        return jsonify(response), 200
+
 
+    except Exception as e:
+        return jsonify({"error": f"Prediction error: {str(e)}", "status": "failure"})
 
-        input_data = pd.DataFrame([[1, features["year"], features["day_of_week"],
-                                    locality_encoded, bird_name_encoded,
-                                    features["Is_Summer"], features["Is_Winter"], features["Is_Spring"], features["Is_Autumn"],
-                                    features["Is_Morning"], features["Is_Afternoon"], features["Is_Evening"], features["Is_Night"]]],
-                                columns=selected_features)
+# ✅ Form Schema (typed fields, compiled once; see request_schema.py)
+fields_schema = request_schema.form_schema(valid_bird_names, valid_localities + locality_vocabulary, seasons=True)
 
-        predicted_month = int(round(month_model.predict(input_data)[0]))
-        predicted_hour = int(round(hour_model.predict(input_data)[0]))
 
-        months_map = {1: "January", 2: "February", 3: "March", 4: "April", 5: "May", 6: "June",
-                      7: "July", 8: "August", 9: "September", 10: "October", 11: "November", 12: "December"}
-        month_name = months_map.get(predicted_month, f"Unknown ({predicted_month})")
+# ✅ API Route: Field Types and Choices (the form fills its inputs from these)
+@app.route('/predict_best_time/fields', methods=['GET'])
+def time_fields_schema():
+    return jsonify(fields_schema.describe()), 200
 
-        am_pm = "a.m." if predicted_hour < 12 else "p.m."
-        formatted_hour = predicted_hour if predicted_hour <= 12 else predicted_hour - 12
-        if formatted_hour == 0:
-            formatted_hour = 12
 
-        response = {
-            "Response": (
-                f"The {features['bird_name']} can be seen "
-                f"at {features['locality']} on a {features['day_name']}, "
-                f"at {formatted_hour}:00 {am_pm} "
-                f"in {month_name}."
-            )
-        }
+# ✅ API Route: Best Time from Typed Fields (the web form; no query parsing)
+@app.route('/predict_best_time/fields', methods=['POST'])
+@model_loader.require_model(model)
+def predict_best_time_fields():
+    try:
+        values = fields_schema.validate(request.get_json(silent=True))
+        features = time_features(request_schema.to_features(values), [values["season"]] if "season" in values else [],
+                                 [values["time_of_day"]] if "time_of_day" in values else [])
+        return jsonify(cached_time_prediction(model.get(), features)), 200
 
-        return jsonify(response), 200
+    except (request_schema.SchemaError, UnknownLabelError) as e:
+        logger.warning(f"⚠️ {e}")
+        return jsonify(e.to_dict()), 400
+
+    except Exception as e:
+        logger.error(f"❌ Error in Prediction: {e}")
+        return jsonify({"error": "Prediction error occurred"}), 500
+
+# ✅ Function: Check & Encode One Batch Item (a query string or a feature object)
+def prepare_time_item(item, label_registry):
+    if isinstance(item, str):
+        if not item.strip():
+            raise ValueError("No query provided")
+        features = extract_query_features_time(item.strip())
+    else:
+        features = structured_time_features(item)
+    if features["locality"] in (None, "Unknown Location"):
+        raise ValueError("The query you entered didn't contain a location.")
+    if features["bird_name"] in (None, "Unknown Bird"):
+        raise ValueError("The query you entered didn't contain a bird species.")
+    row = time_row(features, label_registry.encode('LOCALITY', features["locality"]),
+                   label_registry.encode('COMMON NAME', features["bird_name"]))
+    return features, row
+
+
+# ✅ API Endpoint for Batches: one predict call per model for the whole batch
+@app.route('/predict_best_time/batch', methods=['POST'])
+@model_loader.require_model(model)
+def predict_best_time_batch():
+    try:
+        model_data = model.get()
+        label_registry = model_data['label_registry']
+        assembler = feature_assembler.for_features(model_data['selected_features'])
 
+        items = batch.read_items(request.get_json(silent=True))
+        logger.info(f"🔍 Received Batch of {len(items)} Items")
+
+        def predict_rows(rows):
+            input_data = assembler.assemble_rows(rows)
+            months, hours = predict_month_hour(model_data, input_data, distinct=True)
+            return [(int(round(float(month))), int(round(float(hour)))) for month, hour in zip(months, hours)]
+
+        def respond(features, prediction):
+            return time_response(features, *prediction)
+
+        return jsonify(batch.run(items, lambda item: prepare_time_item(item, label_registry),
+                                 predict_rows, respond)), 200
+
+    except batch.BatchError as e:
+        return jsonify({"error": str(e)}), 400
 
     except Exception as e:
-        return jsonify({"error": f"Prediction error: {str(e)}", "status": "failure"})
+        logger.error(f"❌ Error in Batch Prediction: {e}")
+        return jsonify({"error": f"Prediction error: {str(e)}", "status": "failure"}), 500
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5002, debug=True)
@@ -0,0 +1,32 @@
+import entity_matcher
+
+# ✅ Bird and locality names every service (and the Rasa action server, see structured_request.py) reads
+# queries with. Plain data, no Flask or model imports, so the action server can import it too.
+
+valid_localities = [
+    "Buckingham Place Hotel Tangalle", "Bundala NP General", "Bundala National Park",
+    "Kalametiya", "Tissa Lake", "Yala National Park General", "Debarawewa Lake"
+]
+
+valid_bird_names = ["Blue-tailed Bee-eater", "Red-vented Bulbul", "White-throated Kingfisher"]
+
+bird_aliases = {
+    "blue tailed bird": "Blue-tailed Bee-eater",
+    "blue bird": "Blue-tailed Bee-eater",
+    "bee eater": "Blue-tailed Bee-eater",
+    "red bird": "Red-vented Bulbul",
+    "bulbul": "Red-vented Bulbul",
+    "white bird": "White-throated Kingfisher",
+    "kingfisher": "White-throated Kingfisher"
+}
+
+locality_aliases = {
+    "bundala": "Bundala NP General",
+    "yala": "Yala National Park General",
+    "tissa": "Tissa Lake",
+    "debara": "Debarawewa Lake",
+    "kalametiya": "Kalametiya Bird Sanctuary"
+}
+
+# ✅ Every Locality in the Cleaned eBird Export (matched after the names and aliases above)
+locality_vocabulary = entity_matcher.load_localities()
@@ -1,3 +1,5 @@
+import os
+import sys
 import requests
 import logging
 from rasa_sdk import Action, Tracker
@@ -10,12 +12,35 @@ RANGE_PREDICTION_API = "http://127.0.0.1:5000/predict_presence"
 LOCATION_API = "http://127.0.0.1:5001/predict_location"
 TIME_PREDICTION_API = "http://127.0.0.1:5002/predict_best_time"
 
+# ✅ Parse Once Here, Send Structured Features (the services then skip their own query parsing).
+# BIRD_STRUCTURED_REQUESTS=0 sends only the raw text, as before; BIRD_API_DIR points at the `API s` folder
+API_DIR = os.environ.get("BIRD_API_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API s"))
+query_parser = None
+if os.environ.get("BIRD_STRUCTURED_REQUESTS", "1") == "1":
+    sys.path.append(API_DIR)  # Appended: its time.py must not shadow the stdlib module
+    try:
+        import structured_request
+        query_parser = structured_request.QueryParser()
+    except ImportError as e:
+        logger.warning(f"⚠️ Structured requests off, sending raw text ({e})")
+
+# ✅ Function: Request Body for Any of the Three APIs
+def build_payload(query):
+    payload = {"query": query}
+    if query_parser is not None:
+        try:
+            payload["features"] = query_parser.parse(query)
+        except ValueError as e:
+            # A date that does not exist ("february 30"): send the text alone and let the service answer it
+            logger.warning(f"⚠️ Could not parse {query!r} ({e}), sending raw text")
+    return payload
+
 # ✅ Function: Call Range Prediction API
 def handle_range_prediction(query, dispatcher):
-    payload = {"query": query}
     headers = {"Content-Type": "application/json"}
 
     try:
+        payload = build_payload(query)
         response = requests.post(RANGE_PREDICTION_API, json=payload, headers=headers)
         json_response = response.json()
 
@@ -42,10 +67,10 @@ def handle_range_prediction(query, dispatcher):
 
 # ✅ Function: Call Location Prediction API
 def handle_location_prediction(query, dispatcher):
-    payload = {"query": query}
     headers = {"Content-Type": "application/json"}
 
     try:
+        payload = build_payload(query)
         response = requests.post(LOCATION_API, json=payload, headers=headers)
         json_response = response.json()
 
@@ -62,10 +87,10 @@ def handle_location_prediction(query, dispatcher):
 
 # ✅ Function: Call Time Prediction API
 def handle_time_prediction(query, dispatcher):
-    payload = {"query": query}
     headers = {"Content-Type": "application/json"}
 
     try:
+        payload = build_payload(query)
         response = requests.post(TIME_PREDICTION_API, json=payload, headers=headers)
 
         if response.status_code != 200:
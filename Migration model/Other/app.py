@@ -18,46 +18,20 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ✅ Load Model from GitHub
-import requests
-import joblib
-import io
+# ✅ Load Models from the Shared Local Model Store (API s/model_store.py)
 import os
+import sys
 
-MODEL_URL1 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/migration_prediction_model.pkl"
-
-# ✅ Define a local model path
-MODEL_PATH1 = "migration_prediction_model.pkl"
-
-# ✅ Function: Download Large Model in Chunks
-def download_model(url, save_path, chunk_size=1024 * 1024):  # 1MB chunks
-    if os.path.exists(save_path):  # ✅ Skip download if file exists
-        print(f"📁 Using cached model: {save_path}")
-        return save_path
-
-    print("📥 Downloading model. Please wait...")
-    
-    with requests.get(url, stream=True) as response:
-        response.raise_for_status()  # ✅ Check for errors
-        total_size = int(response.headers.get("content-length", 0))  # ✅ Get file size
-        downloaded = 0
-        
-        with open(save_path, "wb") as file:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    file.write(chunk)
-                    downloaded += len(chunk)
-                    print(f"🔄 Downloaded: {downloaded / total_size:.2%}", end="\r")  # ✅ Show progress
+# Appended: its time.py must not shadow the stdlib module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API s"))
+import model_store
 
-    print("\n✅ Model downloaded successfully.")
-    return save_path
+# ✅ Download all three models concurrently (resumable, verified); the loads below then read from disk
+model_store.fetch_models(model_store.MODEL_NAMES)
 
-# ✅ Download model if not cached
-model_file_path = download_model(MODEL_URL1, MODEL_PATH1)
+MODEL_NAME1 = "migration_prediction_model.pkl"
 
-# ✅ Load Model
-with open(model_file_path, "rb") as model_file:
-    model_data1 = joblib.load(model_file)
+model_data1 = model_store.load_model(MODEL_NAME1)
 
 rf_model = model_data1['rf_final']
 label_encoders1 = model_data1['label_encoders']
@@ -383,46 +357,9 @@ logger = logging.getLogger(__name__)
 # label_encoders = model_data['label_encoders']
 
 
-import requests
-import joblib
-import io
-import os
+MODEL_NAME2 = "location_prediction_model.pkl"
 
-# ✅ Model URL
-MODEL_URL2 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/location_prediction_model.pkl"
-
-# ✅ Define a local model path
-MODEL_PATH2 = "location_prediction_model.pkl"
-
-# ✅ Function: Download Large Model in Chunks
-def download_model(url, save_path, chunk_size=1024 * 1024):  # 1MB chunks
-    if os.path.exists(save_path):  # ✅ Skip download if file exists
-        print(f"📁 Using cached model: {save_path}")
-        return save_path
-
-    print("📥 Downloading model. Please wait...")
-    
-    with requests.get(url, stream=True) as response:
-        response.raise_for_status()  # ✅ Check for errors
-        total_size = int(response.headers.get("content-length", 0))  # ✅ Get file size
-        downloaded = 0
-        
-        with open(save_path, "wb") as file:
-            for chunk in response.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    file.write(chunk)
-                    downloaded += len(chunk)
-                    print(f"🔄 Downloaded: {downloaded / total_size:.2%}", end="\r")  # ✅ Show progress
-
-    print("\n✅ Model downloaded successfully.")
-    return save_path
-
-# ✅ Download model if not cached
-model_file_path2 = download_model(MODEL_URL2, MODEL_PATH2)
-
-# ✅ Load Model
-with open(model_file_path2, "rb") as model_file2:
-    model_data2 = joblib.load(model_file2)
+model_data2 = model_store.load_model(MODEL_NAME2)
 
 location_model2 = model_data2['location_model']
 selected_features2 = model_data2['selected_features']
@@ -679,46 +616,10 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# ✅ Load Model & Encoders from GitHub
-import requests
-import joblib
-import io
-import os
-
-MODEL_URL3 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/time_prediction_model.pkl"
-
-# ✅ Define a local model path
-MODEL_PATH3 = "time_prediction_model.pkl"
+# ✅ Load Model & Encoders from the Shared Local Model Store
+MODEL_NAME3 = "time_prediction_model.pkl"
 
-# ✅ Function: Download Large Model in Chunks
-def download_model(url3, save_path3, chunk_size=1024 * 1024):  # 1MB chunks
-    if os.path.exists(save_path3):  # ✅ Skip download if file exists
-        print(f"📁 Using cached model: {save_path3}")
-        return save_path3
-
-    print("📥 Downloading model. Please wait...")
-    
-    with requests.get(url3, stream=True) as response3:
-        response3.raise_for_status()  # ✅ Check for errors
-        total_size = int(response3.headers.get("content-length", 0))  # ✅ Get file size
-        downloaded = 0
-        
-        with open(save_path3, "wb") as file:
-            for chunk in response3.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    file.write(chunk)
-                    downloaded += len(chunk)
-                    print(f"🔄 Downloaded: {downloaded / total_size:.2%}", end="\r")  # ✅ Show progress
-
-    print("\n✅ Model downloaded successfully.")
-    return save_path3
-
-# ✅ Download model if not cached
-model_file_path3 = download_model(MODEL_URL3, MODEL_PATH3)
-
-# ✅ Load Model
-with open(model_file_path3, "rb") as model_file3:
-    model_data3 = joblib.load(model_file3)
+model_data3 = model_store.load_model(MODEL_NAME3)
 
 month_model = model_data3['month_model']
 hour_model = model_data3['hour_model']
@@ -4,20 +4,15 @@ import numpy as np
 import re
 import datetime
 from difflib import get_close_matches
-import joblib
-import requests
-import io
-
-
-url2 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/location_prediction_model.pkl"
-
+import os
+import sys
 
-# Download the file
-response2 = requests.get(url2)
-response2.raise_for_status()  # Ensure we notice bad responses
+# Appended: its time.py must not shadow the stdlib module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API s"))
+import model_store
 
-# Load the model from memory
-model_data2 = joblib.load(io.BytesIO(response2.content))
+# ✅ Load the model from the shared local model store (downloads from GitHub only once)
+model_data2 = model_store.load_model("location_prediction_model.pkl")
 
 location_model = model_data2['location_model']
 selected_features2 = model_data2['selected_features']
@@ -6,19 +6,15 @@ import datetime
 from difflib import get_close_matches
 from rapidfuzz import process
 
-import requests
-import io
+import os
+import sys
 
+# Appended: its time.py must not shadow the stdlib module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API s"))
+import model_store
 
-url3 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/time_prediction_model.pkl"
-
-
-# Download the file
-response3 = requests.get(url3)
-response3.raise_for_status()  # Ensure we notice bad responses
-
-# Load the model from memory
-model_data3 = joblib.load(io.BytesIO(response3.content))
+# ✅ Load the model from the shared local model store (downloads from GitHub only once)
+model_data3 = model_store.load_model("time_prediction_model.pkl")
 
 month_model = model_data3['month_model']
 hour_model = model_data3['hour_model']
@@ -6,19 +6,15 @@ from difflib import get_close_matches
 from rapidfuzz import process
 import datetime
 
-import joblib
-import requests
-import io
-
-# Raw GitHub URL (change "blob/main" to "raw/main")
-url1 = "https://raw.githubusercontent.com/Deshan-Senanayake/Bird-Range-Prediction/main/Migration%20model/models/migration_prediction_model.pkl"
+import os
+import sys
 
-# Download the file
-response1 = requests.get(url1)
-response1.raise_for_status()  # Ensure we notice bad responses
+# Appended: its time.py must not shadow the stdlib module
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "API s"))
+import model_store
 
-# Load the model from memory
-model_data1 = joblib.load(io.BytesIO(response1.content))
+# ✅ Load the model from the shared local model store (downloads from GitHub only once)
+model_data1 = model_store.load_model("migration_prediction_model.pkl")
 
 # Extract trained model and features
 rf_model = model_data1['rf_final']